@@ -0,0 +1,46 @@
+"""add tariffs
+
+Revision ID: 3c9a1f4e7b21
+Revises: 57fd6e8ab3c4
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '3c9a1f4e7b21'
+down_revision = '57fd6e8ab3c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+	op.create_table(
+		'tariffs',
+		sa.Column('id', sa.Integer(), nullable=False),
+		sa.Column('parcel_type_id', sa.Integer(), nullable=True),
+		sa.Column('company_id', sa.Integer(), nullable=True),
+		sa.Column('weight_coefficient', sa.Float(), nullable=False),
+		sa.Column('value_coefficient', sa.Float(), nullable=False),
+		sa.Column('min_charge_usd', sa.Float(), nullable=False,
+		          server_default='0'),
+		sa.ForeignKeyConstraint(['parcel_type_id'], ['parcel_types.id']),
+		sa.ForeignKeyConstraint(['company_id'], ['company.id']),
+		sa.PrimaryKeyConstraint('id')
+	)
+
+	op.create_table(
+		'tariff_weight_brackets',
+		sa.Column('id', sa.Integer(), nullable=False),
+		sa.Column('tariff_id', sa.Integer(), nullable=False),
+		sa.Column('weight_from', sa.Float(), nullable=False),
+		sa.Column('weight_coefficient', sa.Float(), nullable=False),
+		sa.ForeignKeyConstraint(['tariff_id'], ['tariffs.id'],
+		                        ondelete='CASCADE'),
+		sa.PrimaryKeyConstraint('id')
+	)
+
+
+def downgrade() -> None:
+	op.drop_table('tariff_weight_brackets')
+	op.drop_table('tariffs')
@@ -0,0 +1,25 @@
+"""unique parcel name per session
+
+Revision ID: 8d2e6b0f4a17
+Revises: 3c9a1f4e7b21
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+
+revision = '8d2e6b0f4a17'
+down_revision = '3c9a1f4e7b21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+	op.create_unique_constraint(
+		'uq_parcels_session_id_name',
+		'parcels',
+		['session_id', 'name']
+	)
+
+
+def downgrade() -> None:
+	op.drop_constraint('uq_parcels_session_id_name', 'parcels', type_='unique')
@@ -0,0 +1,58 @@
+"""add company_stats aggregates and company keyset index
+
+Revision ID: a5c7e9b1d3f4
+Revises: f2b8d4a6c913
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'a5c7e9b1d3f4'
+down_revision = 'f2b8d4a6c913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+	op.create_index(
+		'ix_parcels_company_id_id',
+		'parcels',
+		['company_id', 'id']
+	)
+	op.create_index(
+		'ix_parcels_session_id_company_id_id',
+		'parcels',
+		['session_id', 'company_id', 'id']
+	)
+
+	# FLOAT(53) — DOUBLE в MySQL: суммы пополняются приращениями, и ошибка
+	# округления одинарной точности накапливалась бы в агрегатах
+	op.create_table(
+		'company_stats',
+		sa.Column('company_id', sa.Integer(), nullable=False),
+		sa.Column('parcel_count', sa.Integer(), nullable=False),
+		sa.Column('total_weight', sa.Float(precision=53), nullable=False),
+		sa.Column('priced_count', sa.Integer(), nullable=False),
+		sa.Column(
+			'total_delivery_price', sa.Float(precision=53), nullable=False),
+		sa.ForeignKeyConstraint(
+			['company_id'], ['company.id'], ondelete='CASCADE'),
+		sa.PrimaryKeyConstraint('company_id')
+	)
+
+	# Начальные агрегаты по уже привязанным посылкам; дальше их
+	# поддерживают привязка и расчёт стоимости доставки
+	op.execute(
+		'INSERT INTO company_stats (company_id, parcel_count, total_weight, '
+		'priced_count, total_delivery_price) '
+		'SELECT company_id, COUNT(*), SUM(weight), COUNT(delivery_price), '
+		'COALESCE(SUM(delivery_price), 0) '
+		'FROM parcels WHERE company_id IS NOT NULL GROUP BY company_id'
+	)
+
+
+def downgrade() -> None:
+	op.drop_table('company_stats')
+	op.drop_index('ix_parcels_session_id_company_id_id', table_name='parcels')
+	op.drop_index('ix_parcels_company_id_id', table_name='parcels')
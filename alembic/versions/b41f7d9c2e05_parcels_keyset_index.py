@@ -0,0 +1,25 @@
+"""parcels keyset pagination index
+
+Revision ID: b41f7d9c2e05
+Revises: 8d2e6b0f4a17
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+
+revision = 'b41f7d9c2e05'
+down_revision = '8d2e6b0f4a17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+	op.create_index(
+		'ix_parcels_session_id_created_at_id',
+		'parcels',
+		['session_id', 'created_at', 'id']
+	)
+
+
+def downgrade() -> None:
+	op.drop_index('ix_parcels_session_id_created_at_id', table_name='parcels')
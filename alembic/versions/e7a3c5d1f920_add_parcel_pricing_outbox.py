@@ -0,0 +1,37 @@
+"""add parcel pricing outbox
+
+Revision ID: e7a3c5d1f920
+Revises: b41f7d9c2e05
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'e7a3c5d1f920'
+down_revision = 'b41f7d9c2e05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+	op.create_table(
+		'parcel_pricing_outbox',
+		sa.Column('parcel_id', sa.Integer(), nullable=False),
+		sa.Column('created_at', sa.DateTime(), nullable=False,
+		          server_default=sa.func.now()),
+		sa.ForeignKeyConstraint(['parcel_id'], ['parcels.id'],
+		                        ondelete='CASCADE'),
+		sa.PrimaryKeyConstraint('parcel_id'),
+	)
+	op.create_index(
+		'ix_parcel_pricing_outbox_created_at',
+		'parcel_pricing_outbox',
+		['created_at']
+	)
+
+
+def downgrade() -> None:
+	op.drop_index('ix_parcel_pricing_outbox_created_at',
+	              table_name='parcel_pricing_outbox')
+	op.drop_table('parcel_pricing_outbox')
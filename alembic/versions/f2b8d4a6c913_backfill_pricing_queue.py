@@ -0,0 +1,27 @@
+"""backfill pricing queue with unpriced parcels
+
+Revision ID: f2b8d4a6c913
+Revises: e7a3c5d1f920
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+
+revision = 'f2b8d4a6c913'
+down_revision = 'e7a3c5d1f920'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+	# parcel_pricing_outbox становится единственным источником посылок
+	# для пересчёта: ставим в очередь все посылки, созданные до outbox
+	op.execute(
+		'INSERT IGNORE INTO parcel_pricing_outbox (parcel_id, created_at) '
+		'SELECT id, created_at FROM parcels WHERE delivery_price IS NULL'
+	)
+
+
+def downgrade() -> None:
+	# Строки очереди без цены остаются валидными и после отката
+	pass
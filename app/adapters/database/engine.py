@@ -0,0 +1,225 @@
+import logging
+import time
+
+from prometheus_client import REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+	AsyncEngine,
+	AsyncSession,
+	async_sessionmaker,
+	create_async_engine,
+)
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.adapters.database.query_tracking import record_query
+from app.adapters.database.settings import MySQLSettings
+from app.utils.metrics import DB_QUERY_DURATION
+
+logger = logging.getLogger(__name__)
+
+# Движки, созданные в текущем процессе, по имени точки входа
+_engines: dict[str, AsyncEngine] = {}
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+	"""
+	Асинхронный QueuePool, учитывающий ожидание свободного соединения.
+
+	Ожиданием считается выдача соединения в момент, когда пул исчерпан
+	(все DB_POOL_SIZE + DB_MAX_OVERFLOW соединений заняты).
+	"""
+
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		self.waits = 0
+		self.wait_seconds_total = 0.0
+		self.wait_seconds_max = 0.0
+		self.timeouts = 0
+
+	def _do_get(self):
+		exhausted = (
+			self._max_overflow > -1
+			and self._overflow >= self._max_overflow
+			and self._pool.empty()
+		)
+		if not exhausted:
+			return super()._do_get()
+
+		started = time.perf_counter()
+		try:
+			return super()._do_get()
+		except exc.TimeoutError:
+			self.timeouts += 1
+			raise
+		finally:
+			waited = time.perf_counter() - started
+			self.waits += 1
+			self.wait_seconds_total += waited
+			self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+
+def create_engine(name: str, settings: MySQLSettings | None = None) -> AsyncEngine:
+	"""
+	Создаёт асинхронный движок с пулом соединений по MySQLSettings
+	и регистрирует его для выдачи статистики пула.
+
+	Для SQLite (тесты, локальные прогоны) параметры пула не применяются.
+
+	:param name: Имя точки входа ('api', 'celery', ...)
+	:param settings: Настройки подключения (по умолчанию из окружения)
+	:return: AsyncEngine
+	"""
+	settings = settings or MySQLSettings()
+	url = make_url(settings.DATABASE_URL)
+	if url.get_backend_name() == 'sqlite':
+		engine = create_async_engine(url)
+	else:
+		engine = create_async_engine(
+			url,
+			poolclass=InstrumentedAsyncQueuePool,
+			pool_size=settings.DB_POOL_SIZE,
+			max_overflow=settings.DB_MAX_OVERFLOW,
+			pool_timeout=settings.DB_POOL_TIMEOUT,
+			pool_recycle=settings.DB_POOL_RECYCLE,
+			pool_pre_ping=settings.DB_POOL_PRE_PING,
+		)
+		logger.info(
+			f'Пул соединений {name}: size={settings.DB_POOL_SIZE}, '
+			f'max_overflow={settings.DB_MAX_OVERFLOW}, '
+			f'recycle={settings.DB_POOL_RECYCLE}s, '
+			f'pre_ping={settings.DB_POOL_PRE_PING}')
+	_instrument_queries(name, engine, settings.DB_SLOW_QUERY_SECONDS)
+	_engines[name] = engine
+	return engine
+
+
+def _instrument_queries(
+	name: str,
+	engine: AsyncEngine,
+	slow_query_seconds: float,
+) -> None:
+	"""
+	Подписывает движок на события выполнения запросов: учёт их количества
+	и длительности в метриках и в текущей области учёта (HTTP-запрос,
+	задача), лог медленных запросов.
+	"""
+
+	# Время начала хранится в контексте выполнения, а не в conn.info:
+	# для запроса, завершившегося ошибкой, after_cursor_execute
+	# не вызывается, и значение уходит вместе с контекстом
+	@event.listens_for(engine.sync_engine, 'before_cursor_execute')
+	def before_cursor_execute(conn, cursor, statement, parameters, context,
+	                          executemany):
+		if context is not None:
+			context._query_started = time.perf_counter()
+
+	@event.listens_for(engine.sync_engine, 'after_cursor_execute')
+	def after_cursor_execute(conn, cursor, statement, parameters, context,
+	                         executemany):
+		started = getattr(context, '_query_started', None)
+		if started is None:
+			# Служебные запросы диалекта выполняются без контекста
+			return
+		seconds = time.perf_counter() - started
+		DB_QUERY_DURATION.labels(name).observe(seconds)
+		record_query(
+			statement, parameters, executemany, seconds, slow_query_seconds)
+
+
+def create_session_factory(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+	"""
+	Создаёт фабрику асинхронных сессий для движка.
+	"""
+	return async_sessionmaker(
+		bind=engine,
+		class_=AsyncSession,
+		expire_on_commit=False,
+	)
+
+
+def get_pool_stats() -> dict[str, dict]:
+	"""
+	Возвращает текущую статистику пулов соединений всех движков процесса.
+
+	:return: Словарь {имя движка: статистика пула}
+	"""
+	return {name: _pool_stats(engine) for name, engine in _engines.items()}
+
+
+def _pool_stats(engine: AsyncEngine) -> dict:
+	pool = engine.pool
+	if not isinstance(pool, QueuePool):
+		return {'pool': type(pool).__name__}
+
+	stats = {
+		'pool': type(pool).__name__,
+		'pool_size': pool.size(),
+		'max_overflow': pool._max_overflow,
+		'checked_out': pool.checkedout(),
+		'checked_in': pool.checkedin(),
+		# Отрицательное значение — сколько соединений пула ещё не открыто
+		'overflow': pool.overflow(),
+	}
+	if isinstance(pool, InstrumentedAsyncQueuePool):
+		stats.update(
+			waits=pool.waits,
+			wait_seconds_total=round(pool.wait_seconds_total, 6),
+			wait_seconds_max=round(pool.wait_seconds_max, 6),
+			timeouts=pool.timeouts,
+		)
+	return stats
+
+
+class PoolStatsCollector:
+	"""
+	Коллектор Prometheus, отдающий статистику пулов соединений всех
+	движков процесса на момент опроса /metrics.
+	"""
+
+	def collect(self):
+		checked_out = GaugeMetricFamily(
+			'db_pool_checked_out', 'Занятые соединения пула', labels=['engine'])
+		size = GaugeMetricFamily(
+			'db_pool_size', 'Размер пула соединений', labels=['engine'])
+		overflow = GaugeMetricFamily(
+			'db_pool_overflow',
+			'Соединения сверх размера пула (отрицательное — ещё не открыты)',
+			labels=['engine'])
+		waits = CounterMetricFamily(
+			'db_pool_checkout_waits',
+			'Ожидания свободного соединения при исчерпанном пуле',
+			labels=['engine'])
+		wait_seconds = CounterMetricFamily(
+			'db_pool_checkout_wait_seconds',
+			'Суммарное время ожидания свободного соединения',
+			labels=['engine'])
+		timeouts = CounterMetricFamily(
+			'db_pool_checkout_timeouts',
+			'Ожидания соединения, завершившиеся таймаутом',
+			labels=['engine'])
+
+		for name, stats in get_pool_stats().items():
+			if 'pool_size' not in stats:
+				continue
+			checked_out.add_metric([name], stats['checked_out'])
+			size.add_metric([name], stats['pool_size'])
+			overflow.add_metric([name], stats['overflow'])
+			if 'waits' in stats:
+				waits.add_metric([name], stats['waits'])
+				wait_seconds.add_metric([name], stats['wait_seconds_total'])
+				timeouts.add_metric([name], stats['timeouts'])
+
+		return [checked_out, size, overflow, waits, wait_seconds, timeouts]
+
+
+REGISTRY.register(PoolStatsCollector())
+
+
+async def dispose_engines() -> None:
+	"""
+	Закрывает соединения всех движков процесса (при остановке приложения).
+	"""
+	for engine in _engines.values():
+		await engine.dispose()
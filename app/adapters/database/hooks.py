@@ -0,0 +1,47 @@
+import logging
+from typing import Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+# Ключ в session.info со списком колбэков, выполняемых после коммита
+AFTER_COMMIT_KEY = 'after_commit'
+
+AfterCommitCallback = Callable[[], Awaitable[None]]
+
+
+def add_after_commit(
+	session: AsyncSession,
+	callback: AfterCommitCallback,
+) -> None:
+	"""
+	Регистрирует колбэк, который будет выполнен после успешного коммита
+	транзакции сессии (например, оповещение других процессов).
+	При откате транзакции колбэки отбрасываются.
+
+	:param session: Асинхронная сессия SQLAlchemy
+	:param callback: Корутинная функция без аргументов
+	"""
+	session.info.setdefault(AFTER_COMMIT_KEY, []).append(callback)
+
+
+def discard_after_commit(session: AsyncSession) -> None:
+	"""
+	Отбрасывает зарегистрированные колбэки (при откате транзакции).
+	"""
+	session.info.pop(AFTER_COMMIT_KEY, None)
+
+
+async def run_after_commit(session: AsyncSession) -> None:
+	"""
+	Выполняет колбэки, зарегистрированные через add_after_commit.
+
+	Транзакция к этому моменту уже зафиксирована, поэтому ошибка
+	колбэка только логируется и не прерывает остальные.
+	"""
+	for callback in session.info.pop(AFTER_COMMIT_KEY, []):
+		try:
+			await callback()
+		except Exception:
+			logger.exception('Ошибка в колбэке после коммита')
@@ -1,7 +1,19 @@
 from sqlalchemy.orm import relationship, registry
 
-from app.adapters.database.tables import company, parcels, parcel_types
-from app.applications.dataclasses.dataclasses import Parcel, ParcelType, Company
+from app.adapters.database.tables import (
+    company,
+    parcels,
+    parcel_types,
+    tariffs,
+    tariff_weight_brackets,
+)
+from app.applications.dataclasses.dataclasses import (
+    Parcel,
+    ParcelType,
+    Company,
+    Tariff,
+    WeightBracket,
+)
 
 mapper_registry = registry()
 
@@ -15,3 +27,15 @@ mapper_registry.map_imperatively(
 )
 mapper_registry.map_imperatively(ParcelType, parcel_types)
 mapper_registry.map_imperatively(Company, company)
+mapper_registry.map_imperatively(
+    Tariff,
+    tariffs,
+    properties={
+        'weight_brackets': relationship(
+            WeightBracket,
+            order_by=tariff_weight_brackets.c.weight_from,
+            cascade='all, delete-orphan',
+        ),
+    }
+)
+mapper_registry.map_imperatively(WeightBracket, tariff_weight_brackets)
@@ -0,0 +1,125 @@
+import collections
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+# Сколько одинаковых запросов в одной области считается признаком N+1
+N_PLUS_ONE_THRESHOLD = 5
+# Максимальная длина текста запроса в логах
+STATEMENT_LOG_LENGTH = 500
+
+
+@dataclass
+class QueryUsage:
+	"""
+	Счётчики SQL-запросов, выполненных в одной области учёта
+	(HTTP-запрос, задача Celery, блок теста).
+	"""
+	label: str
+	queries: int = 0
+	seconds: float = 0.0
+	statements: collections.Counter[str] = field(
+		default_factory=collections.Counter)
+
+	def merge(self, other: 'QueryUsage') -> None:
+		self.queries += other.queries
+		self.seconds += other.seconds
+		self.statements.update(other.statements)
+
+
+# Текущая область учёта (None вне области: миграции, служебные запросы)
+_current_usage: ContextVar[QueryUsage | None] = ContextVar(
+	'query_usage', default=None)
+
+
+@contextmanager
+def track_queries(
+	label: str,
+	detect_n_plus_one: bool = False,
+) -> Iterator[QueryUsage]:
+	"""
+	Открывает область учёта SQL-запросов.
+
+	Области вкладываются: при выходе из вложенной области её счётчики
+	добавляются к внешней, поэтому тест может ограничить количество
+	запросов HTTP-запроса, который учитывается собственной областью.
+
+	:param label: Метка области (маршрут, имя задачи)
+	:param detect_n_plus_one: Предупреждать о повторяющихся запросах
+	:return: QueryUsage области
+	"""
+	usage = QueryUsage(label=label)
+	parent = _current_usage.get()
+	token = _current_usage.set(usage)
+	try:
+		yield usage
+	finally:
+		_current_usage.reset(token)
+		if parent is not None:
+			parent.merge(usage)
+		if detect_n_plus_one:
+			_warn_n_plus_one(usage)
+
+
+def record_query(
+	statement: str,
+	parameters,
+	executemany: bool,
+	seconds: float,
+	slow_query_seconds: float,
+) -> None:
+	"""
+	Учитывает выполненный запрос в текущей области и пишет в лог
+	медленные запросы.
+
+	:param statement: Текст запроса
+	:param parameters: Параметры запроса
+	:param executemany: Запрос выполнен для набора параметров
+	:param seconds: Длительность запроса
+	:param slow_query_seconds: Порог медленного запроса (0 — не логировать)
+	"""
+	usage = _current_usage.get()
+	if usage is not None:
+		usage.queries += 1
+		usage.seconds += seconds
+		usage.statements[statement] += 1
+
+	if slow_query_seconds and seconds >= slow_query_seconds:
+		logger.warning(
+			f'Медленный запрос {seconds:.3f}s '
+			f'[{usage.label if usage is not None else "-"}]: '
+			f'{statement[:STATEMENT_LOG_LENGTH]} '
+			f'параметры: {parameters_shape(parameters, executemany)}')
+
+
+def parameters_shape(parameters, executemany: bool = False) -> str:
+	"""
+	Описывает параметры запроса типами, без значений, чтобы в лог
+	не попадали пользовательские данные.
+
+	:param parameters: Параметры запроса (кортеж, словарь или их список)
+	:param executemany: Параметры — набор строк
+	:return: Строка вида '(int, str)' или '1000 x (int, str)'
+	"""
+	if executemany and parameters:
+		return f'{len(parameters)} x {parameters_shape(parameters[0])}'
+	if isinstance(parameters, dict):
+		return '{' + ', '.join(
+			f'{name}: {type(value).__name__}'
+			for name, value in parameters.items()) + '}'
+	if isinstance(parameters, (list, tuple)):
+		return '(' + ', '.join(
+			type(value).__name__ for value in parameters) + ')'
+	return type(parameters).__name__
+
+
+def _warn_n_plus_one(usage: QueryUsage) -> None:
+	for statement, count in usage.statements.items():
+		if count >= N_PLUS_ONE_THRESHOLD:
+			logger.warning(
+				f'Возможный N+1 [{usage.label}]: запрос выполнен {count} раз: '
+				f'{statement[:STATEMENT_LOG_LENGTH]}')
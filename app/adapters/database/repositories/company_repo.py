@@ -1,6 +1,17 @@
-from sqlalchemy import select
+from sqlalchemy import func, select
 
-from app.applications.dataclasses.dataclasses import Company
+from app.adapters.database.hooks import AfterCommitCallback, add_after_commit
+from app.adapters.database.tables import (
+	company,
+	company_stats,
+	parcel_types,
+	parcels,
+)
+from app.applications.dataclasses.dataclasses import (
+	Company,
+	CompanyStats,
+	ParcelRow,
+)
 from app.applications.interfaces.company_interfaces import ICompanyRepositories
 
 
@@ -38,3 +49,75 @@ class CompanyRepo(ICompanyRepositories):
         """
 		result = await self.session.execute(select(Company))
 		return result.scalars().all()
+
+	async def get_stats(self, company_id: int) -> CompanyStats | None:
+		"""
+        Возвращает агрегаты посылок компании из company_stats одним
+        чтением по первичному ключу. Для компании без посылок строки
+        агрегатов нет, и возвращаются нули.
+
+        :param company_id: ID компании
+        :return: CompanyStats или None, если компании нет
+        """
+		stmt = (
+			select(
+				company.c.id,
+				*(func.coalesce(company_stats.c[name], 0) for name in (
+					'parcel_count',
+					'total_weight',
+					'priced_count',
+					'total_delivery_price',
+				)),
+			)
+			.select_from(company)
+			.outerjoin(company_stats, company_stats.c.company_id == company.c.id)
+			.where(company.c.id == company_id)
+		)
+		row = (await self.session.execute(stmt)).first()
+		if row is None:
+			return None
+		return CompanyStats(*row)
+
+	async def list_parcels(
+		self,
+		company_id: int,
+		session_id: str | None,
+		limit: int,
+		after_id: int | None = None,
+	) -> list[tuple[ParcelRow, str]]:
+		"""
+        Возвращает посылки компании в порядке убывания ID (keyset-пагинация
+        по индексу (session_id, company_id, id) или, для всех сессий,
+        (company_id, id)).
+
+        :param company_id: ID компании
+        :param session_id: Сессия пользователя (None — все сессии)
+        :param limit: Ограничение количества результатов
+        :param after_id: ID последней посылки предыдущей страницы; если
+            указан, выборка продолжается строго после него
+        :return: Пары (ParcelRow, название типа посылки)
+        """
+		stmt = (
+			select(
+				*(parcels.c[name] for name in ParcelRow._fields),
+				parcel_types.c.name.label('type_name'),
+			)
+			.join(parcel_types, parcel_types.c.id == parcels.c.type_id)
+			.where(parcels.c.company_id == company_id)
+			.order_by(parcels.c.id.desc())
+			.limit(limit)
+		)
+		if session_id is not None:
+			stmt = stmt.where(parcels.c.session_id == session_id)
+		if after_id is not None:
+			stmt = stmt.where(parcels.c.id < after_id)
+		result = await self.session.execute(stmt)
+		return [(ParcelRow(*row[:-1]), row[-1]) for row in result.all()]
+
+	def after_commit(self, callback: AfterCommitCallback) -> None:
+		"""
+        Регистрирует колбэк, выполняемый после коммита транзакции сессии.
+
+        :param callback: Корутинная функция без аргументов
+        """
+		add_after_commit(self.session, callback)
@@ -1,10 +1,67 @@
 import datetime
+from collections import defaultdict
+from typing import AsyncIterator, Iterable
 
-from sqlalchemy import select, update
+from sqlalchemy import (
+    Float,
+    and_,
+    bindparam,
+    case,
+    delete,
+    func,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.dialects.mysql import insert as mysql_insert
 from sqlalchemy.orm import selectinload
 
-from app.applications.dataclasses.dataclasses import Parcel, ParcelType
+from app.adapters.database.hooks import AfterCommitCallback, add_after_commit
+from app.adapters.database.tables import (
+    company,
+    company_stats,
+    parcel_pricing_outbox,
+    parcels,
+)
+from app.applications.dataclasses.dataclasses import (
+    BulkBindResult,
+    Parcel,
+    ParcelExportRow,
+    ParcelRow,
+    ParcelType,
+)
 from app.applications.interfaces.parcel_interfaces import IParcelRepositories
+from app.utils.constants import PricingConstants
+
+
+def _select_parcel_rows():
+    """
+    SELECT колонок ParcelRow в порядке её полей.
+    """
+    return select(*(getattr(Parcel, name) for name in ParcelRow._fields))
+
+
+# Счётчики company_stats, к которым прибавляются приращения
+_COMPANY_STATS_COUNTERS = (
+    'parcel_count',
+    'total_weight',
+    'priced_count',
+    'total_delivery_price',
+)
+
+
+def _filter_parcels(stmt, type_id: int | None, has_delivery_cost: bool | None):
+    """
+    Применяет к выборке посылок фильтры по типу и наличию цены доставки.
+    """
+    if type_id is not None:
+        stmt = stmt.where(Parcel.type_id == type_id)
+
+    if has_delivery_cost is True:
+        stmt = stmt.where(Parcel.delivery_price.isnot(None))
+    elif has_delivery_cost is False:
+        stmt = stmt.where(Parcel.delivery_price.is_(None))
+    return stmt
 
 
 class ParcelRepo(IParcelRepositories):
@@ -19,6 +76,9 @@ class ParcelRepo(IParcelRepositories):
         :param session: Асинхронная сессия SQLAlchemy.
         """
         self.session = session
+        # Сессии пользователей, посылки которых получили цену
+        # (см. pop_repriced_sessions)
+        self._repriced_sessions: set[str] = set()
 
     async def create_parcel(
         self,
@@ -53,6 +113,87 @@ class ParcelRepo(IParcelRepositories):
         await self.session.flush()
         return parcel.id
 
+    async def get_or_create_parcel(
+        self,
+        name: str,
+        weight: float,
+        type_id: int,
+        content_value_usd: float,
+        session_id: str,
+    ) -> int:
+        """
+        Создаёт посылку или возвращает ID существующей с тем же именем
+        в рамках сессии — одним запросом.
+
+        Опирается на уникальный индекс (session_id, name):
+        INSERT ... ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id)
+        возвращает ID новой или уже существующей строки, поэтому
+        конкурентные повторные запросы не создают дубликатов.
+
+        :param name: Название посылки
+        :param weight: Вес в килограммах
+        :param type_id: ID типа посылки
+        :param content_value_usd: Стоимость содержимого в USD
+        :param session_id: Идентификатор пользовательской сессии
+        :return: ID новой или существующей посылки
+        """
+        stmt = mysql_insert(parcels).values(
+            session_id=session_id,
+            name=name,
+            weight=weight,
+            type_id=type_id,
+            content_value_usd=content_value_usd,
+            created_at=datetime.datetime.now(),
+        )
+        stmt = stmt.on_duplicate_key_update(
+            id=func.last_insert_id(parcels.c.id),
+        )
+        result = await self.session.execute(stmt)
+        return result.lastrowid
+
+    async def get_or_create_parcels(
+        self,
+        session_id: str,
+        parcels_data: list[dict],
+    ) -> dict[str, int]:
+        """
+        Создаёт пакет посылок одним многострочным INSERT и возвращает ID
+        новых и уже существующих посылок.
+
+        Имена внутри пакета должны быть уникальны. Уже существующие в сессии
+        посылки не изменяются (ON DUPLICATE KEY UPDATE без изменений),
+        ID всех посылок читаются одним запросом по индексу (session_id, name).
+
+        :param session_id: Идентификатор пользовательской сессии
+        :param parcels_data: Словари с ключами name, weight, type_id,
+            content_value_usd
+        :return: Словарь {название посылки в том виде, в каком оно хранится
+            в БД: ID}; collation parcels.name не учитывает регистр
+            и пробелы в конце, поэтому название может отличаться от входного
+        """
+        now = datetime.datetime.now()
+        stmt = mysql_insert(parcels).values([
+            {
+                'session_id': session_id,
+                'name': item['name'],
+                'weight': item['weight'],
+                'type_id': item['type_id'],
+                'content_value_usd': item['content_value_usd'],
+                'created_at': now,
+            }
+            for item in parcels_data
+        ])
+        stmt = stmt.on_duplicate_key_update(id=parcels.c.id)
+        await self.session.execute(stmt)
+
+        result = await self.session.execute(
+            select(parcels.c.name, parcels.c.id).where(
+                parcels.c.session_id == session_id,
+                parcels.c.name.in_([item['name'] for item in parcels_data]),
+            )
+        )
+        return dict(result.all())
+
     async def get_by_name_and_session(
         self,
         name: str,
@@ -90,85 +231,571 @@ class ParcelRepo(IParcelRepositories):
         has_delivery_cost: bool | None,
         limit: int,
         offset: int,
-    ) -> list[Parcel]:
+        after: tuple[datetime.datetime, int] | None = None,
+    ) -> list[ParcelRow]:
         """
-        Возвращает отфильтрованный список посылок пользователя.
+        Возвращает отфильтрованный список посылок пользователя,
+        упорядоченный по (created_at, id) от новых к старым, в виде строк
+        ParcelRow без гидратации объектов Parcel.
 
         :param session_id: Сессия пользователя
         :param type_id: Фильтр по типу (если указан)
         :param has_delivery_cost: True/False для фильтрации по цене доставки
         :param limit: Ограничение количества результатов
         :param offset: Смещение для пагинации
-        :return: Список посылок
+        :param after: Ключ (created_at, id) последней посылки предыдущей
+            страницы; если указан, выборка продолжается строго после него
+            по индексу без пропуска offset строк
+        :return: Список ParcelRow
         """
-        stmt = (
-            select(Parcel)
-            .options(selectinload(Parcel.type))
-            .where(Parcel.session_id == session_id)
-        )
-
-        if type_id is not None:
-            stmt = stmt.where(Parcel.type_id == type_id)
+        stmt = _select_parcel_rows().where(Parcel.session_id == session_id)
+        stmt = _filter_parcels(stmt, type_id, has_delivery_cost)
 
-        if has_delivery_cost is True:
-            stmt = stmt.where(Parcel.delivery_price.isnot(None))
-        elif has_delivery_cost is False:
-            stmt = stmt.where(Parcel.delivery_price.is_(None))
+        if after is not None:
+            created_at, parcel_id = after
+            stmt = stmt.where(
+                or_(
+                    Parcel.created_at < created_at,
+                    and_(
+                        Parcel.created_at == created_at,
+                        Parcel.id < parcel_id,
+                    ),
+                )
+            )
 
-        stmt = stmt.order_by(Parcel.created_at.desc())
+        # id — уникальный тай-брейк для посылок с одинаковым created_at
+        stmt = stmt.order_by(Parcel.created_at.desc(), Parcel.id.desc())
         stmt = stmt.limit(limit).offset(offset)
 
         result = await self.session.execute(stmt)
-        return result.scalars().all()
+        return result.all()
+
+    async def stream_by_filters(
+        self,
+        session_id: str | None,
+        type_id: int | None,
+        has_delivery_cost: bool | None,
+        company_id: int | None = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[list[ParcelExportRow]]:
+        """
+        Выдаёт посылки порциями через серверный курсор: в памяти процесса
+        одновременно находится не больше batch_size строк, а следующая
+        порция читается, только когда потребитель забрал предыдущую.
+
+        Посылки упорядочены по id: для одной сессии порядок совпадает
+        с порядком индекса по session_id и не требует сортировки.
+
+        :param session_id: Сессия пользователя (None — все сессии)
+        :param type_id: Фильтр по типу (если указан)
+        :param has_delivery_cost: True/False для фильтрации по цене доставки
+        :param company_id: Фильтр по транспортной компании (если указан)
+        :param batch_size: Количество строк в порции
+        :return: Асинхронный итератор порций ParcelExportRow
+        """
+        stmt = select(
+            *(getattr(Parcel, name) for name in ParcelExportRow._fields))
+        if session_id is not None:
+            stmt = stmt.where(Parcel.session_id == session_id)
+        stmt = _filter_parcels(stmt, type_id, has_delivery_cost)
+        if company_id is not None:
+            stmt = stmt.where(Parcel.company_id == company_id)
+        stmt = stmt.order_by(Parcel.id).execution_options(yield_per=batch_size)
+
+        result = await self.session.stream(stmt)
+        try:
+            async for partition in result.partitions():
+                yield partition
+        finally:
+            # Курсор закрывается и при прерванной передаче ответа
+            await result.close()
 
     async def get_by_id_and_session(
         self,
         parcel_id: int,
         session_id: str,
-    ) -> Parcel | None:
+    ) -> ParcelRow | None:
         """
-        Получает посылку по её ID и сессии пользователя.
+        Получает посылку по её ID и сессии пользователя в виде строки
+        ParcelRow.
 
         :param parcel_id: Уникальный идентификатор посылки
         :param session_id: Идентификатор сессии пользователя
-        :return: Parcel или None
+        :return: ParcelRow или None
         """
         stmt = (
-            select(Parcel)
-            .options(selectinload(Parcel.type))
+            _select_parcel_rows()
             .where(
                 Parcel.id == parcel_id,
                 Parcel.session_id == session_id
             )
         )
         result = await self.session.execute(stmt)
-        return result.scalars().first()
+        return result.first()
+
+    async def summarize_by_type(
+        self,
+        session_id: str,
+    ) -> list[tuple[int, int, int, int, float, float]]:
+        """
+        Сводка посылок сессии по типам одним агрегирующим запросом
+        (GROUP BY type_id по индексу session_id).
+
+        :param session_id: Идентификатор сессии пользователя
+        :return: Кортежи (type_id, parcel_count, priced_count, bound_count,
+            total_weight, total_delivery_price) в порядке type_id
+        """
+        stmt = (
+            select(
+                parcels.c.type_id,
+                func.count(),
+                func.count(parcels.c.delivery_price),
+                func.count(parcels.c.company_id),
+                func.sum(parcels.c.weight),
+                func.coalesce(func.sum(parcels.c.delivery_price), 0.0),
+            )
+            .where(parcels.c.session_id == session_id)
+            .group_by(parcels.c.type_id)
+            .order_by(parcels.c.type_id)
+        )
+        result = await self.session.execute(stmt)
+        return result.all()
 
     async def get_unpriced_parcels(self) -> list[Parcel]:
         """
-        Возвращает все посылки, у которых не рассчитана стоимость доставки.
+        Возвращает все посылки из очереди расчёта, у которых не рассчитана
+        стоимость доставки.
 
         :return: Список посылок без delivery_price
         """
         stmt = (
             select(Parcel)
+            .join(
+                parcel_pricing_outbox,
+                parcel_pricing_outbox.c.parcel_id == Parcel.id,
+            )
             .where(Parcel.delivery_price.is_(None))
             .options(selectinload(Parcel.type))
+            # Привязка к компании ждёт коммита пересчёта, иначе цена
+            # не попадёт в агрегаты company_stats
+            .with_for_update()
         )
         result = await self.session.execute(stmt)
         return result.scalars().all()
 
+    async def get_unpriced_pricing_rows(
+        self,
+        after_id: int,
+        limit: int,
+        id_to: int | None = None,
+        skip_locked: bool = False,
+    ) -> list[tuple[int, float, float, int, int | None]]:
+        """
+        Возвращает очередную порцию посылок из очереди расчёта
+        (parcel_pricing_outbox) в колоночном виде, без гидратации
+        объектов Parcel.
+
+        Используется keyset-пагинация по первичному ключу очереди:
+        выбираются посылки с id > after_id в порядке возрастания id,
+        не более limit штук. Стоимость запроса зависит от размера очереди,
+        а не от размера таблицы посылок. Посылки, уже получившие цену,
+        тоже возвращаются, чтобы их можно было убрать из очереди.
+
+        С skip_locked строки захватываются SELECT ... FOR UPDATE SKIP LOCKED
+        до конца транзакции: строки, уже захваченные другим обработчиком,
+        пропускаются, поэтому параллельные обработчики не пересчитывают
+        одни и те же посылки.
+
+        :param after_id: ID последней обработанной посылки (0 — с начала)
+        :param limit: Максимальный размер порции
+        :param id_to: Верхняя граница ID включительно (опционально)
+        :param skip_locked: Захватить строки, пропуская заблокированные
+        :return: Кортежи (id, weight, content_value_usd, type_id, company_id)
+        """
+        stmt = (
+            select(
+                parcels.c.id,
+                parcels.c.weight,
+                parcels.c.content_value_usd,
+                parcels.c.type_id,
+                parcels.c.company_id,
+            )
+            .select_from(parcel_pricing_outbox)
+            .join(parcels, parcels.c.id == parcel_pricing_outbox.c.parcel_id)
+            .where(parcel_pricing_outbox.c.parcel_id > after_id)
+            .order_by(parcel_pricing_outbox.c.parcel_id)
+            .limit(limit)
+        )
+        if id_to is not None:
+            stmt = stmt.where(parcel_pricing_outbox.c.parcel_id <= id_to)
+        if skip_locked:
+            stmt = stmt.with_for_update(skip_locked=True)
+        result = await self.session.execute(stmt)
+        return result.all()
+
+    async def get_unpriced_ids(self, after_id: int, limit: int) -> list[int]:
+        """
+        Возвращает очередную порцию ID посылок без стоимости доставки
+        прямо из таблицы посылок, независимо от outbox.
+
+        Используется редкой сверкой: таблица просматривается по первичному
+        ключу порциями, каждая порция продолжает просмотр с after_id.
+
+        :param after_id: ID последней просмотренной посылки (0 — с начала)
+        :param limit: Максимальный размер порции
+        :return: ID посылок по возрастанию
+        """
+        stmt = (
+            select(parcels.c.id)
+            .where(
+                parcels.c.id > after_id,
+                parcels.c.delivery_price.is_(None),
+            )
+            .order_by(parcels.c.id)
+            .limit(limit)
+        )
+        result = await self.session.execute(stmt)
+        return list(result.scalars().all())
+
+    async def set_delivery_prices(self, prices: dict[int, float]) -> int:
+        """
+        Записывает рассчитанные стоимости доставки одним UPDATE
+        (CASE по id). Посылки, которым цена уже назначена, не изменяются.
+
+        Цены посылок, привязанных к компаниям, прибавляются к агрегатам
+        company_stats в той же транзакции, а сессии посылок запоминаются
+        для pop_repriced_sessions.
+
+        :param prices: Словарь {ID посылки: стоимость доставки}
+        :return: Количество обновлённых посылок
+        """
+        if not prices:
+            return 0
+        # Посылки без цены блокируются до UPDATE: параллельная привязка
+        # к компании дождётся коммита и учтёт уже записанную цену
+        locked = (await self.session.execute(
+            select(parcels.c.id, parcels.c.company_id, parcels.c.session_id)
+            .where(
+                parcels.c.id.in_(list(prices)),
+                parcels.c.delivery_price.is_(None),
+            )
+            .with_for_update()
+        )).all()
+        if not locked:
+            return 0
+        company_ids = {
+            parcel_id: company_id for parcel_id, company_id, _ in locked}
+        self._repriced_sessions.update(
+            session_id for _, _, session_id in locked)
+
+        stmt = (
+            update(parcels)
+            .where(
+                parcels.c.id.in_(list(company_ids)),
+                parcels.c.delivery_price.is_(None),
+            )
+            .values(delivery_price=case(
+                {parcel_id: prices[parcel_id] for parcel_id in company_ids},
+                value=parcels.c.id,
+            ))
+        )
+        result = await self.session.execute(stmt)
+        await self.add_company_prices(
+            (company_id, prices[parcel_id])
+            for parcel_id, company_id in company_ids.items()
+        )
+        return result.rowcount
+
+    async def add_company_prices(
+        self,
+        company_prices: Iterable[tuple[int | None, float]],
+    ) -> None:
+        """
+        Прибавляет рассчитанные стоимости доставки к агрегатам компаний
+        в company_stats. Посылки без компании пропускаются.
+
+        :param company_prices: Пары (ID компании или None, стоимость доставки)
+        """
+        totals = defaultdict(lambda: [0, 0.0])
+        for company_id, price in company_prices:
+            if company_id is not None:
+                totals[company_id][0] += 1
+                totals[company_id][1] += price
+        await self._add_company_stats([
+            {
+                'company_id': company_id,
+                'parcel_count': 0,
+                'total_weight': 0.0,
+                'priced_count': count,
+                'total_delivery_price': total,
+            }
+            for company_id, (count, total) in totals.items()
+        ])
+
+    async def _add_company_stats(self, deltas: list[dict]) -> None:
+        """
+        Прибавляет приращения к агрегатам company_stats одним
+        INSERT ... ON DUPLICATE KEY UPDATE; строки отсутствующих компаний
+        создаются.
+
+        :param deltas: Приращения по компаниям: company_id и все счётчики
+            _COMPANY_STATS_COUNTERS
+        """
+        if not deltas:
+            return
+        stmt = mysql_insert(company_stats).values(deltas)
+        stmt = stmt.on_duplicate_key_update({
+            name: company_stats.c[name] + stmt.inserted[name]
+            for name in _COMPANY_STATS_COUNTERS
+        })
+        await self.session.execute(stmt)
+
+    def pop_repriced_sessions(self) -> set[str]:
+        """
+        Возвращает сессии, посылки которых получили цену через
+        set_delivery_prices или reprice_unpriced с прошлого вызова,
+        и очищает набор.
+
+        :return: Идентификаторы сессий
+        """
+        sessions, self._repriced_sessions = self._repriced_sessions, set()
+        return sessions
+
+    async def commit_chunk(self) -> None:
+        """
+        Фиксирует транзакцию по обработанной порции и очищает identity map,
+        чтобы объекты предыдущих порций не удерживались сессией.
+        """
+        await self.session.commit()
+        self.session.expunge_all()
+
+    async def get_unpriced_id_bounds(self) -> tuple[int | None, int | None]:
+        """
+        Возвращает минимальный и максимальный ID посылок в очереди расчёта
+        стоимости доставки (по первичному ключу очереди).
+
+        :return: Кортеж (min_id, max_id) или (None, None), если очередь пуста
+        """
+        stmt = select(
+            func.min(parcel_pricing_outbox.c.parcel_id),
+            func.max(parcel_pricing_outbox.c.parcel_id),
+        )
+        result = await self.session.execute(stmt)
+        min_id, max_id = result.one()
+        return min_id, max_id
+
+    async def reprice_unpriced(
+        self,
+        rate: float,
+        id_from: int | None = None,
+        id_to: int | None = None,
+    ) -> int:
+        """
+        Рассчитывает стоимость доставки посылок из очереди расчёта одним
+        UPDATE на стороне БД, без загрузки посылок в приложение, и удаляет
+        рассчитанные посылки из очереди.
+
+        Курс передаётся связанным параметром. Диапазон ID (включительно)
+        позволяет обрабатывать бэклог пакетами. Суммы цен по компаниям
+        считаются тем же выражением до UPDATE и прибавляются к агрегатам
+        company_stats; сессии посылок запоминаются для
+        pop_repriced_sessions.
+
+        :param rate: Курс USD→RUB
+        :param id_from: Нижняя граница ID (опционально)
+        :param id_to: Верхняя граница ID (опционально)
+        :return: Количество обновлённых посылок
+        """
+        price = (
+            Parcel.weight * PricingConstants.WEIGHT_COEFFICIENT.value
+            + Parcel.content_value_usd
+            * PricingConstants.VALUE_COEFFICIENT.value
+        ) * bindparam('rate', value=rate, type_=Float)
+
+        unpriced = [
+            Parcel.id == parcel_pricing_outbox.c.parcel_id,
+            Parcel.delivery_price.is_(None),
+        ]
+        dequeue_stmt = delete(parcel_pricing_outbox).where(
+            parcel_pricing_outbox.c.parcel_id == parcels.c.id,
+            parcels.c.delivery_price.isnot(None),
+        )
+        if id_from is not None:
+            unpriced.append(parcel_pricing_outbox.c.parcel_id >= id_from)
+            dequeue_stmt = dequeue_stmt.where(
+                parcel_pricing_outbox.c.parcel_id >= id_from)
+        if id_to is not None:
+            unpriced.append(parcel_pricing_outbox.c.parcel_id <= id_to)
+            dequeue_stmt = dequeue_stmt.where(
+                parcel_pricing_outbox.c.parcel_id <= id_to)
+
+        # FOR UPDATE блокирует все посылки, которые получат цену, поэтому
+        # суммы совпадают с UPDATE, а параллельная привязка к компании
+        # дождётся коммита
+        totals_stmt = (
+            select(
+                Parcel.company_id,
+                Parcel.session_id,
+                func.count(),
+                func.sum(price),
+            )
+            .where(*unpriced)
+            .group_by(Parcel.company_id, Parcel.session_id)
+            .with_for_update()
+        )
+        stmt = (
+            update(Parcel)
+            .where(*unpriced)
+            .values(delivery_price=price)
+            .execution_options(synchronize_session=False)
+        )
+
+        totals = (await self.session.execute(totals_stmt)).all()
+        result = await self.session.execute(stmt)
+        company_totals = defaultdict(lambda: [0, 0.0])
+        for company_id, session_id, count, total in totals:
+            self._repriced_sessions.add(session_id)
+            if company_id is not None:
+                company_totals[company_id][0] += count
+                company_totals[company_id][1] += total
+        await self._add_company_stats([
+            {
+                'company_id': company_id,
+                'parcel_count': 0,
+                'total_weight': 0.0,
+                'priced_count': count,
+                'total_delivery_price': total,
+            }
+            for company_id, (count, total) in company_totals.items()
+        ])
+        await self.session.execute(dequeue_stmt)
+        return result.rowcount
+
+    async def enqueue_for_pricing(self, parcel_ids: list[int]) -> int:
+        """
+        Добавляет посылки в outbox расчёта стоимости доставки в текущей
+        транзакции. Уже стоящие в очереди ID пропускаются.
+
+        :param parcel_ids: ID посылок
+        :return: Количество посылок, которых ещё не было в outbox
+        """
+        if not parcel_ids:
+            return 0
+        stmt = (
+            mysql_insert(parcel_pricing_outbox)
+            .prefix_with('IGNORE')
+            .values([{'parcel_id': parcel_id} for parcel_id in parcel_ids])
+        )
+        result = await self.session.execute(stmt)
+        return result.rowcount
+
+    async def get_pricing_rows_by_ids(
+        self,
+        parcel_ids: list[int],
+    ) -> list[tuple[int, float, float, int, int | None]]:
+        """
+        Возвращает посылки из списка, у которых ещё нет стоимости доставки,
+        в колоночном виде.
+
+        :param parcel_ids: ID посылок
+        :return: Кортежи (id, weight, content_value_usd, type_id, company_id)
+        """
+        if not parcel_ids:
+            return []
+        stmt = (
+            select(
+                parcels.c.id,
+                parcels.c.weight,
+                parcels.c.content_value_usd,
+                parcels.c.type_id,
+                parcels.c.company_id,
+            )
+            .where(
+                parcels.c.id.in_(parcel_ids),
+                parcels.c.delivery_price.is_(None),
+            )
+        )
+        result = await self.session.execute(stmt)
+        return result.all()
+
+    async def remove_from_pricing_outbox(self, parcel_ids: list[int]) -> int:
+        """
+        Удаляет обработанные посылки из outbox (очереди) расчёта стоимости.
+
+        :param parcel_ids: ID посылок
+        :return: Количество удалённых строк
+        """
+        if not parcel_ids:
+            return 0
+        stmt = delete(parcel_pricing_outbox).where(
+            parcel_pricing_outbox.c.parcel_id.in_(parcel_ids))
+        result = await self.session.execute(stmt)
+        return result.rowcount
+
+    async def get_stale_outbox_ids(
+        self,
+        older_than: datetime.datetime,
+        limit: int,
+    ) -> list[int]:
+        """
+        Возвращает ID посылок, которые стоят в outbox дольше заданного
+        времени (оповещение о них потерялось или не было обработано).
+
+        :param older_than: Граница времени постановки в очередь
+        :param limit: Максимальное количество ID
+        :return: Список ID посылок
+        """
+        stmt = (
+            select(parcel_pricing_outbox.c.parcel_id)
+            .where(parcel_pricing_outbox.c.created_at < older_than)
+            .order_by(parcel_pricing_outbox.c.created_at)
+            .limit(limit)
+        )
+        result = await self.session.execute(stmt)
+        return list(result.scalars().all())
+
+    async def count_pricing_backlog(self) -> int:
+        """
+        Возвращает количество посылок в очереди расчёта стоимости доставки.
+
+        :return: Размер очереди
+        """
+        stmt = select(func.count()).select_from(parcel_pricing_outbox)
+        result = await self.session.execute(stmt)
+        return result.scalar_one()
+
+    def after_commit(self, callback: AfterCommitCallback) -> None:
+        """
+        Регистрирует колбэк, выполняемый после коммита транзакции сессии.
+
+        :param callback: Корутинная функция без аргументов
+        """
+        add_after_commit(self.session, callback)
+
+    async def company_exists(self, company_id: int) -> bool:
+        """
+        Проверяет, что транспортная компания существует.
+
+        :param company_id: ID компании
+        :return: True, если компания найдена
+        """
+        stmt = select(company.c.id).where(company.c.id == company_id)
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none() is not None
+
     async def bind_company_to_parcel(
         self,
         parcel_id: int,
         company_id: int,
-    ) -> bool:
+    ) -> str | None:
         """
-        Привязывает транспортную компанию к посылке.
+        Привязывает транспортную компанию к посылке и прибавляет посылку
+        к агрегатам компании в company_stats в той же транзакции.
 
         :param parcel_id: ID посылки
         :param company_id: ID компании
-        :return: True, если привязка успешна; False, если уже привязана
+        :return: Сессия посылки, если привязка успешна; None, если посылка
+            уже привязана
         """
         stmt = (
             update(Parcel)
@@ -179,4 +806,104 @@ class ParcelRepo(IParcelRepositories):
             .values(company_id=company_id)
         )
         result = await self.session.execute(stmt)
-        return result.rowcount > 0
+        if result.rowcount == 0:
+            return None
+
+        # Строка посылки заблокирована UPDATE: цена, записанная
+        # параллельным пересчётом, уже видна
+        session_id, weight, delivery_price = (await self.session.execute(
+            select(
+                parcels.c.session_id,
+                parcels.c.weight,
+                parcels.c.delivery_price,
+            )
+            .where(parcels.c.id == parcel_id)
+        )).one()
+        await self._add_company_stats([{
+            'company_id': company_id,
+            'parcel_count': 1,
+            'total_weight': weight,
+            'priced_count': int(delivery_price is not None),
+            'total_delivery_price': delivery_price or 0.0,
+        }])
+        return session_id
+
+    async def bind_company_to_parcels(
+        self,
+        parcel_ids: list[int],
+        company_id: int,
+        chunk_size: int,
+    ) -> BulkBindResult:
+        """
+        Привязывает к компании все ещё не привязанные посылки из списка
+        и прибавляет их к агрегатам компании в company_stats в той же
+        транзакции.
+
+        Список обрабатывается порциями по chunk_size ID: одним запросом
+        порция блокируется (SELECT ... FOR UPDATE) и раскладывается
+        на непривязанные, уже привязанные и отсутствующие посылки, затем
+        непривязанные привязываются одним UPDATE. Агрегаты компании
+        обновляются одним запросом на весь список.
+
+        :param parcel_ids: ID посылок (возможны повторы)
+        :param company_id: ID компании
+        :param chunk_size: Количество ID в одном запросе
+        :return: BulkBindResult
+        """
+        result = BulkBindResult()
+        total_weight = 0.0
+        priced_count = 0
+        total_delivery_price = 0.0
+
+        unique_ids = sorted(set(parcel_ids))
+        for start in range(0, len(unique_ids), chunk_size):
+            chunk = unique_ids[start:start + chunk_size]
+            rows = (await self.session.execute(
+                select(
+                    parcels.c.id,
+                    parcels.c.company_id,
+                    parcels.c.session_id,
+                    parcels.c.weight,
+                    parcels.c.delivery_price,
+                )
+                .where(parcels.c.id.in_(chunk))
+                .with_for_update()
+            )).all()
+
+            unbound = []
+            for parcel_id, bound_company_id, session_id, weight, price in rows:
+                if bound_company_id is not None:
+                    result.already_bound.append(parcel_id)
+                    continue
+                unbound.append(parcel_id)
+                result.session_ids.add(session_id)
+                total_weight += weight
+                if price is not None:
+                    priced_count += 1
+                    total_delivery_price += price
+            found = {row[0] for row in rows}
+            result.missing.extend(
+                parcel_id for parcel_id in chunk if parcel_id not in found)
+
+            if unbound:
+                # Строки заблокированы выше, условие по company_id
+                # сохраняется как защита от повторной привязки
+                await self.session.execute(
+                    update(parcels)
+                    .where(
+                        parcels.c.id.in_(unbound),
+                        parcels.c.company_id.is_(None),
+                    )
+                    .values(company_id=company_id)
+                )
+                result.bound.extend(unbound)
+
+        if result.bound:
+            await self._add_company_stats([{
+                'company_id': company_id,
+                'parcel_count': len(result.bound),
+                'total_weight': total_weight,
+                'priced_count': priced_count,
+                'total_delivery_price': total_delivery_price,
+            }])
+        return result
@@ -0,0 +1,29 @@
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from app.applications.dataclasses.dataclasses import Tariff
+from app.applications.interfaces.tariff_interfaces import ITariffRepositories
+
+
+class TariffRepo(ITariffRepositories):
+    """
+    Репозиторий тарифов доставки.
+    """
+
+    def __init__(self, session):
+        """
+        Инициализация репозитория с асинхронной SQLAlchemy-сессией.
+
+        :param session: Асинхронная сессия SQLAlchemy.
+        """
+        self.session = session
+
+    async def get_all_tariffs(self) -> list[Tariff]:
+        """
+        Возвращает все тарифы вместе с весовыми диапазонами.
+
+        :return: Список объектов Tariff
+        """
+        stmt = select(Tariff).options(selectinload(Tariff.weight_brackets))
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
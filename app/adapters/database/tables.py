@@ -6,8 +6,11 @@ from sqlalchemy import (
 	ForeignKey,
 	DateTime,
 	Boolean,
+	Index,
 	MetaData,
 	Table,
+	UniqueConstraint,
+	func,
 )
 from datetime import datetime
 
@@ -33,6 +36,11 @@ parcels = Table(
 	Column('created_at', DateTime, default=datetime.now()),
 	Column('is_processed', Boolean, default=False),
 	Column('company_id', Integer, ForeignKey('company.id'), nullable=True),
+	UniqueConstraint('session_id', 'name', name='uq_parcels_session_id_name'),
+	Index('ix_parcels_session_id_created_at_id', 'session_id', 'created_at', 'id'),
+	Index('ix_parcels_company_id_id', 'company_id', 'id'),
+	Index('ix_parcels_session_id_company_id_id',
+	      'session_id', 'company_id', 'id'),
 )
 
 company = Table(
@@ -41,3 +49,54 @@ company = Table(
 	Column('id', Integer, primary_key=True),
 	Column('name', String(50), nullable=False),
 )
+
+tariffs = Table(
+	'tariffs',
+	metadata,
+	Column('id', Integer, primary_key=True),
+	Column('parcel_type_id', Integer, ForeignKey('parcel_types.id'),
+	       nullable=True),
+	Column('company_id', Integer, ForeignKey('company.id'), nullable=True),
+	Column('weight_coefficient', Float, nullable=False),
+	Column('value_coefficient', Float, nullable=False),
+	Column('min_charge_usd', Float, nullable=False, default=0.0),
+)
+
+tariff_weight_brackets = Table(
+	'tariff_weight_brackets',
+	metadata,
+	Column('id', Integer, primary_key=True),
+	Column('tariff_id', Integer, ForeignKey('tariffs.id', ondelete='CASCADE'),
+	       nullable=False),
+	Column('weight_from', Float, nullable=False),
+	Column('weight_coefficient', Float, nullable=False),
+)
+
+# Транзакционный outbox и очередь расчёта: ID всех посылок, ожидающих расчёта
+# стоимости доставки. Строка добавляется в одной транзакции с посылкой
+# и удаляется после расчёта, поэтому пересчёт читает только эту таблицу
+parcel_pricing_outbox = Table(
+	'parcel_pricing_outbox',
+	metadata,
+	Column('parcel_id', Integer, ForeignKey('parcels.id', ondelete='CASCADE'),
+	       primary_key=True),
+	Column('created_at', DateTime, nullable=False, server_default=func.now(),
+	       index=True),
+)
+
+# Агрегаты посылок по компаниям. Поддерживаются инкрементально в транзакциях
+# привязки посылки к компании и расчёта стоимости доставки, поэтому чтение
+# статистики компании не зависит от числа её посылок. Суммы хранятся
+# с двойной точностью (FLOAT(53) — DOUBLE в MySQL): при одинарной ошибка
+# округления каждого приращения накапливается в агрегате
+company_stats = Table(
+	'company_stats',
+	metadata,
+	Column('company_id', Integer, ForeignKey('company.id', ondelete='CASCADE'),
+	       primary_key=True),
+	Column('parcel_count', Integer, nullable=False, default=0),
+	Column('total_weight', Float(precision=53), nullable=False, default=0.0),
+	Column('priced_count', Integer, nullable=False, default=0),
+	Column('total_delivery_price', Float(precision=53), nullable=False,
+	       default=0.0),
+)
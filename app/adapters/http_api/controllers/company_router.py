@@ -1,11 +1,20 @@
 import logging
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Path, Query, Response, status
+from fastapi.responses import ORJSONResponse
+
+from app.adapters.http_api.responses import fast_json_response
 from app.adapters.http_api.schemas.schemas import (
     CompanyCreateSchema,
     CompanyResponse,
+    CompanyStatsResponse,
+    ParcelListResponse,
+)
+from app.adapters.http_api.settings import (
+    authorize_export,
+    create_company_service,
+    get_or_create_session_id,
 )
-from app.adapters.http_api.settings import create_company_service
 from app.applications.services.company_service import CompanyService
 
 logger = logging.getLogger(__name__)
@@ -29,7 +38,7 @@ async def create_company(
     Возвращает ID и имя зарегистрированной компании.
     """
 	company_id = await company_service.create_company(company_name=company.name)
-	logger.info(f'Компания создана с ID: {company_id}')
+	logger.info('Компания создана с ID: %s', company_id)
 	return CompanyResponse(id=company_id, name=company.name)
 
 
@@ -48,5 +57,67 @@ async def list_companies(
     Получение списка всех транспортных компаний.
     """
 	companies = await company_service.get_all_companies()
-	logger.info(f'Найдено компаний: {len(companies)}')
+	logger.info('Найдено компаний: %d', len(companies))
 	return companies
+
+
+@company_router.get(
+	'/{company_id}/parcels',
+	response_model=list[ParcelListResponse],
+	status_code=status.HTTP_200_OK,
+	summary='Получить посылки компании',
+	description='Возвращает посылки текущей сессии, привязанные'
+	            ' к компании, от новых к старым; с all_sessions=true и'
+	            ' заголовком X-Export-Token — посылки всех сессий. Если'
+	            ' страница заполнена целиком, курсор следующей страницы'
+	            ' возвращается в заголовке X-Next-Cursor.',
+)
+async def list_company_parcels(
+	response: Response,
+	company_id: int = Path(..., ge=1),
+	limit: int = Query(20, ge=1, le=100),
+	cursor: str | None = Query(
+		None, description='Курсор следующей страницы из X-Next-Cursor'
+	),
+	all_sessions: bool = Depends(authorize_export),
+	company_service: CompanyService = Depends(create_company_service),
+	session_id: str = Depends(get_or_create_session_id),
+) -> ORJSONResponse:
+	"""
+    Получение посылок транспортной компании с keyset-пагинацией.
+    """
+	parcels, next_cursor = await company_service.list_company_parcels(
+		company_id=company_id,
+		session_id=None if all_sessions else session_id,
+		limit=limit,
+		cursor=cursor,
+	)
+	if next_cursor is not None:
+		response.headers['X-Next-Cursor'] = next_cursor
+	logger.info(
+		'GET /company/%s/parcels — Посылок найдено: %d (cursor=%s, '
+		'all_sessions=%s, session_id=%s)',
+		company_id, len(parcels), cursor, all_sessions, session_id)
+	return fast_json_response(parcels, response)
+
+
+@company_router.get(
+	'/{company_id}/stats',
+	response_model=CompanyStatsResponse,
+	status_code=status.HTTP_200_OK,
+	summary='Получить статистику компании',
+	description='Возвращает количество, суммарный вес и стоимость доставки'
+	            ' посылок компании по всем сессиям. В отличие от'
+	            ' GET /company/{company_id}/parcels статистика намеренно не'
+	            ' ограничена текущей сессией: она содержит только сводные'
+	            ' числа по компании, без данных отдельных посылок.',
+)
+async def get_company_stats(
+	company_id: int = Path(..., ge=1),
+	company_service: CompanyService = Depends(create_company_service),
+) -> CompanyStatsResponse:
+	"""
+    Получение агрегатов посылок транспортной компании по всем сессиям.
+    """
+	return await company_service.get_company_stats(company_id=company_id)
+
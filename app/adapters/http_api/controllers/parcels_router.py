@@ -1,21 +1,36 @@
 import logging
+from typing import Literal
 
-from fastapi import APIRouter, Depends, status, Response, Query, Path
+from fastapi import APIRouter, Depends, status, Response, Query, Path, Body
+from fastapi.responses import ORJSONResponse, StreamingResponse
 
 from app.adapters.http_api.schemas.schemas import (
 	ParcelCreateSchema,
 	ParcelResponse,
+	ParcelBulkResponse,
 	ParcelTypeResponse,
 	ParcelListResponse,
 	ParcelDetailResponse,
+	ParcelSummaryResponse,
 	BindCompanyResponseSchema,
 	BindCompanySchema,
+	BindCompanyBulkItem,
+	BindCompanyBulkSchema,
+)
+from app.adapters.http_api.responses import (
+	copy_response_headers,
+	fast_json_response,
 )
 from app.adapters.http_api.settings import (
+	authorize_export,
 	create_parcel_service,
+	get_export_settings,
 	get_or_create_session_id,
 )
 from app.applications.services.parcel_services import ParcelService
+from app.utils.constants import BulkConstants
+from app.utils.export import EXPORT_FORMATS
+from app.utils.settings import ExportSettings
 
 logger = logging.getLogger(__name__)
 
@@ -40,9 +55,6 @@ async def create_parcel(
     Создание новой посылки. Повторная запись с тем же именем в рамках одной
     сессии не допускается.
     """
-	logger.info(
-		f'POST /parcels — Регистрация посылки: {parcel.model_dump()} '
-		f'(session_id={session_id})')
 	parcel_id = await parcel_service.create_parcel(
 		name=parcel.name,
 		weight=parcel.weight,
@@ -50,10 +62,41 @@ async def create_parcel(
 		content_value_usd=parcel.content_value_usd,
 		session_id=session_id,
 	)
-	logger.info(f'Посылка зарегистрирована: id={parcel_id}')
+	logger.info(
+		'POST /parcels — Посылка зарегистрирована: id=%s, %s (session_id=%s)',
+		parcel_id, parcel, session_id)
 	return ParcelResponse(parcel_id=parcel_id)
 
 
+@parcel_router.post(
+	'/bulk',
+	response_model=ParcelBulkResponse,
+	status_code=status.HTTP_201_CREATED,
+	summary='Создать посылки пакетом',
+	description='Создаёт до 1000 посылок одним запросом в рамках '
+	            'пользовательской сессии. Для посылок с уже существующими '
+	            'именами возвращаются их ID.'
+)
+async def create_parcels_bulk(
+	response: Response,
+	parcels: list[ParcelCreateSchema] = Body(
+		..., min_length=1, max_length=BulkConstants.MAX_PARCELS.value),
+	parcel_service: ParcelService = Depends(create_parcel_service),
+	session_id: str = Depends(get_or_create_session_id),
+) -> ParcelBulkResponse:
+	"""
+    Пакетное создание посылок. ID возвращаются в порядке входного списка.
+    """
+	parcel_ids = await parcel_service.create_parcels_bulk(
+		parcels=[parcel.model_dump() for parcel in parcels],
+		session_id=session_id,
+	)
+	logger.info(
+		'POST /parcels/bulk — Посылок зарегистрировано: %d (session_id=%s)',
+		len(parcel_ids), session_id)
+	return ParcelBulkResponse(parcel_ids=parcel_ids)
+
+
 @parcel_router.get(
 	'/types',
 	response_model=list[ParcelTypeResponse],
@@ -67,9 +110,8 @@ async def list_parcel_types(
 	"""
     Получение всех типов посылок с идентификаторами и названиями.
     """
-	logger.info('GET /parcels/types — Получение всех типов посылок')
 	types = await parcel_service.get_all_types()
-	logger.info(f'Типов найдено: {len(types)}')
+	logger.info('GET /parcels/types — Типов найдено: %d', len(types))
 	return types
 
 
@@ -79,7 +121,10 @@ async def list_parcel_types(
 	status_code=status.HTTP_200_OK,
 	summary='Получить список посылок',
 	description='Возвращает список посылок пользователя с возможностью'
-	            ' фильтрации и пагинации.',
+	            ' фильтрации и пагинации. Если страница заполнена целиком,'
+	            ' курсор следующей страницы возвращается в заголовке'
+	            ' X-Next-Cursor; его нужно передать в параметре cursor'
+	            ' вместо offset.',
 )
 async def list_parcels(
 	response: Response,
@@ -89,26 +134,116 @@ async def list_parcels(
 	),
 	limit: int = Query(20, ge=1, le=100),
 	offset: int = Query(0, ge=0),
+	cursor: str | None = Query(
+		None, description='Курсор следующей страницы из X-Next-Cursor'
+	),
 	parcel_service: ParcelService = Depends(create_parcel_service),
 	session_id: str = Depends(get_or_create_session_id),
-) -> list[ParcelListResponse]:
+) -> ORJSONResponse:
 	"""
     Получение списка посылок пользователя с возможностью фильтрации по типу
     и наличию цены доставки.
+
+    Сервис собирает ответ из строк БД в форме ParcelListResponse, поэтому
+    он сериализуется без повторной проверки по response_model.
     """
-	logger.info(
-		f'GET /parcels — Список посылок: type_id={type_id}, '
-		f'has_cost={has_delivery_cost}, limit={limit}, '
-		f'offset={offset}, session_id={session_id}')
-	parcels = await parcel_service.list_parcels(
+	parcels, next_cursor = await parcel_service.list_parcels(
 		session_id=session_id,
 		type_id=type_id,
 		has_delivery_cost=has_delivery_cost,
 		limit=limit,
 		offset=offset,
+		cursor=cursor,
 	)
-	logger.info(f'Посылок найдено: {len(parcels)}')
-	return parcels
+	if next_cursor is not None:
+		response.headers['X-Next-Cursor'] = next_cursor
+	logger.info(
+		'GET /parcels — Посылок найдено: %d (type_id=%s, has_cost=%s, '
+		'limit=%s, offset=%s, cursor=%s, session_id=%s)',
+		len(parcels), type_id, has_delivery_cost, limit, offset, cursor,
+		session_id)
+	return fast_json_response(parcels, response)
+
+
+@parcel_router.get(
+	'/export',
+	response_class=StreamingResponse,
+	status_code=status.HTTP_200_OK,
+	summary='Выгрузить посылки',
+	description='Потоково выгружает посылки в NDJSON или CSV без'
+	            ' пагинации. Фильтры совпадают с GET /parcels; по умолчанию'
+	            ' выгружаются посылки текущей сессии, с all_sessions=true и'
+	            ' заголовком X-Export-Token — посылки всех сессий.',
+	responses={200: {'content': {
+		media_type: {} for media_type, _ in EXPORT_FORMATS.values()}}},
+)
+async def export_parcels(
+	response: Response,
+	export_format: Literal['ndjson', 'csv'] = Query(
+		'ndjson', alias='format', description='Формат выгрузки'
+	),
+	type_id: int | None = Query(None, description='Фильтр по типу'),
+	has_delivery_cost: bool | None = Query(
+		None, description='True — только с рассчитанной стоимостью, False — без'
+	),
+	company_id: int | None = Query(
+		None, ge=1, description='Фильтр по транспортной компании'
+	),
+	all_sessions: bool = Depends(authorize_export),
+	export_settings: ExportSettings = Depends(get_export_settings),
+	parcel_service: ParcelService = Depends(create_parcel_service),
+	session_id: str = Depends(get_or_create_session_id),
+) -> StreamingResponse:
+	"""
+    Потоковая выгрузка посылок. Строки читаются из БД серверным курсором
+    по мере того, как клиент принимает ответ.
+    """
+	logger.info(
+		'GET /parcels/export — Выгрузка посылок: format=%s, type_id=%s, '
+		'has_cost=%s, company_id=%s, all_sessions=%s, session_id=%s',
+		export_format, type_id, has_delivery_cost, company_id, all_sessions,
+		session_id)
+	media_type, extension = EXPORT_FORMATS[export_format]
+	streaming_response = StreamingResponse(
+		parcel_service.export_parcels(
+			session_id=None if all_sessions else session_id,
+			type_id=type_id,
+			has_delivery_cost=has_delivery_cost,
+			company_id=company_id,
+			export_format=export_format,
+			batch_size=export_settings.batch_size,
+		),
+		media_type=media_type,
+		headers={
+			'Content-Disposition': f'attachment; filename="parcels.{extension}"',
+		},
+	)
+	# Новая сессия должна получить cookie и в потоковом ответе
+	return copy_response_headers(streaming_response, response)
+
+
+@parcel_router.get(
+	'/summary',
+	response_model=ParcelSummaryResponse,
+	status_code=status.HTTP_200_OK,
+	summary='Сводка посылок сессии',
+	description='Возвращает количество посылок, рассчитанных и привязанных'
+	            ' к компаниям, суммарный вес и стоимость доставки по типам'
+	            ' посылок текущей сессии.',
+)
+async def get_parcels_summary(
+	response: Response,
+	parcel_service: ParcelService = Depends(create_parcel_service),
+	session_id: str = Depends(get_or_create_session_id),
+) -> ORJSONResponse:
+	"""
+    Сводка посылок текущей сессии по типам.
+    """
+	summary = await parcel_service.get_summary(session_id=session_id)
+	logger.info(
+		'GET /parcels/summary — Сводка: %s посылок (session_id=%s)',
+		summary['total']['parcel_count'], session_id)
+	return fast_json_response(summary, response)
 
 
 @parcel_router.get(
@@ -124,19 +259,18 @@ async def get_parcel(
 	parcel_id: int = Path(..., ge=1),
 	parcel_service: ParcelService = Depends(create_parcel_service),
 	session_id: str = Depends(get_or_create_session_id),
-) -> ParcelDetailResponse:
+) -> ORJSONResponse:
 	"""
     Получение полной информации о конкретной посылке по её ID.
     """
-	logger.info(
-		f'GET /parcels/{parcel_id} — Получение посылки '
-		f'(session_id={session_id})')
 	parcel = await parcel_service.get_parcel(
 		parcel_id=parcel_id,
 		session_id=session_id,
 	)
-	logger.info(f'Посылка найдена: id={parcel_id}')
-	return parcel
+	logger.info(
+		'GET /parcels/%s — Посылка найдена (session_id=%s)',
+		parcel_id, session_id)
+	return fast_json_response(parcel, response)
 
 
 @parcel_router.post(
@@ -156,14 +290,40 @@ async def bind_parcel_to_company(
     Привязывает посылку к указанной транспортной компании.
     Возвращает ошибку 409, если посылка уже привязана.
     """
-	logger.info(
-		f'POST /parcels/bind_company — Привязка компании: '
-		f'{company_data.model_dump()}')
 	result = await parcel_service.bind_company_to_parcel(
 		parcel_id=company_data.parcel_id,
 		company_id=company_data.company_id,
 	)
 	logger.info(
-		f'Успешная привязка parcel_id={company_data.parcel_id}'
-		f' к company_id={company_data.company_id}')
+		'POST /parcels/bind_company — Посылка parcel_id=%s привязана'
+		' к company_id=%s', company_data.parcel_id, company_data.company_id)
 	return result
+
+
+@parcel_router.post(
+	'/bind_company/bulk',
+	response_model=list[BindCompanyBulkItem],
+	status_code=status.HTTP_200_OK,
+	summary='Привязать посылки к транспортной компании пакетом',
+	description='Привязывает к компании до 5000 посылок одним запросом.'
+	            ' Уже привязанные посылки не изменяются; для каждой'
+	            ' посылки возвращается результат привязки.',
+)
+async def bind_parcels_to_company(
+	response: Response,
+	bind_data: BindCompanyBulkSchema,
+	parcel_service: ParcelService = Depends(create_parcel_service),
+) -> ORJSONResponse:
+	"""
+    Пакетная привязка посылок к транспортной компании.
+    Результаты возвращаются в порядке входного списка.
+    """
+	results = await parcel_service.bind_company_to_parcels(
+		parcel_ids=bind_data.parcel_ids,
+		company_id=bind_data.company_id,
+	)
+	logger.info(
+		'POST /parcels/bind_company/bulk — Посылок привязано к company_id=%s:'
+		' %d из %d', bind_data.company_id,
+		sum(item['status'] == 'bound' for item in results), len(results))
+	return fast_json_response(results, response)
@@ -28,5 +28,5 @@ async def trigger_update_delivery_prices():
     цены и сохраняет её в базу.
     """
 	task = update_delivery_prices.delay()
-	logger.info(f'Задача Celery отправлена: task_id={task.id}')
+	logger.info('Задача Celery отправлена: task_id=%s', task.id)
 	return {'status': 'submitted', 'task_id': task.id}
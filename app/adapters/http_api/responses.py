@@ -0,0 +1,48 @@
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+
+# Заголовки, которые ответ вычисляет сам по своему телу
+_BODY_HEADERS = {b'content-length', b'content-type'}
+
+
+def fast_json_response(
+	content,
+	response: Response,
+	status_code: int = 200,
+) -> ORJSONResponse:
+	"""
+	Ответ, сериализуемый orjson напрямую, без проверки и сериализации
+	по response_model маршрута.
+
+	Предназначен для данных, которые сервис собирает сам из строк БД
+	в форме схемы ответа: FastAPI не проверяет возвращённый Response
+	повторно, а response_model маршрута по-прежнему описывает ответ
+	в OpenAPI. Заголовки и cookie, установленные зависимостями в response,
+	переносятся в ответ.
+
+	:param content: Тело ответа (dict, list, datetime, числа, строки)
+	:param response: Response, полученный обработчиком как зависимость
+	:param status_code: HTTP-статус ответа
+	:return: ORJSONResponse
+	"""
+	fast_response = ORJSONResponse(content, status_code=status_code)
+	return copy_response_headers(fast_response, response)
+
+
+def copy_response_headers(
+	target: Response,
+	response: Response,
+) -> Response:
+	"""
+	Переносит заголовки и cookie, установленные зависимостями в response,
+	в ответ, который обработчик возвращает сам (например, StreamingResponse).
+
+	:param target: Ответ обработчика
+	:param response: Response, полученный обработчиком как зависимость
+	:return: target
+	"""
+	target.raw_headers.extend(
+		(key, value) for key, value in response.headers.raw
+		if key not in _BODY_HEADERS
+	)
+	return target
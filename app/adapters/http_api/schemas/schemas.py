@@ -2,6 +2,8 @@ from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import Literal
 
+from app.utils.constants import BulkConstants
+
 
 class ParcelTypeBase(BaseModel):
 	"""Базовая модель для типа посылки."""
@@ -38,6 +40,12 @@ class ParcelResponse(BaseModel):
 	parcel_id: int = Field(..., description='ID созданной посылки')
 
 
+class ParcelBulkResponse(BaseModel):
+	"""Ответ после пакетного создания посылок."""
+	parcel_ids: list[int] = Field(
+		..., description='ID посылок в порядке следования во входном списке')
+
+
 class ParcelTypeResponse(BaseModel):
 	"""Схема для отображения типа посылки."""
 	type_id: int = Field(..., description='ID типа посылки')
@@ -84,12 +92,64 @@ class CompanyResponse(CompanyCreateSchema):
 	name: str = Field(..., description='Название компании')
 
 
+class CompanyStatsResponse(BaseModel):
+	"""Схема ответа со статистикой посылок компании."""
+	company_id: int = Field(..., description='ID компании')
+	parcel_count: int = Field(..., description='Количество привязанных посылок')
+	total_weight: float = Field(..., description='Суммарный вес посылок в кг')
+	priced_count: int = Field(
+		..., description='Количество посылок с рассчитанной стоимостью')
+	total_delivery_price: float = Field(
+		..., description='Суммарная стоимость доставки рассчитанных посылок')
+
+
+class ParcelSummaryTotals(BaseModel):
+	"""Итоги по посылкам сессии."""
+	parcel_count: int = Field(..., description='Количество посылок')
+	priced_count: int = Field(
+		..., description='Количество посылок с рассчитанной стоимостью')
+	bound_count: int = Field(
+		..., description='Количество посылок, привязанных к компаниям')
+	total_weight: float = Field(..., description='Суммарный вес посылок в кг')
+	total_delivery_price: float = Field(
+		..., description='Суммарная стоимость доставки рассчитанных посылок')
+
+
+class ParcelTypeSummary(ParcelSummaryTotals):
+	"""Итоги по посылкам сессии одного типа."""
+	type_id: int = Field(..., description='ID типа посылки')
+	type_name: str = Field(..., description='Название типа посылки')
+
+
+class ParcelSummaryResponse(BaseModel):
+	"""Схема ответа со сводкой посылок сессии."""
+	types: list[ParcelTypeSummary] = Field(
+		..., description='Итоги по типам посылок')
+	total: ParcelSummaryTotals = Field(..., description='Итоги по сессии')
+
+
 class BindCompanySchema(BaseModel):
 	"""Запрос на привязку посылки к компании."""
 	parcel_id: int = Field(..., ge=1, description='ID посылки')
 	company_id: int = Field(..., ge=1, description='ID компании')
 
 
+class BindCompanyBulkSchema(BaseModel):
+	"""Запрос на пакетную привязку посылок к компании."""
+	company_id: int = Field(..., ge=1, description='ID компании')
+	parcel_ids: list[int] = Field(
+		..., min_length=1, max_length=BulkConstants.MAX_BIND_PARCELS.value,
+		description='ID посылок')
+
+
+class BindCompanyBulkItem(BaseModel):
+	"""Результат привязки одной посылки."""
+	parcel_id: int = Field(..., description='ID посылки')
+	status: Literal['bound', 'already_bound', 'missing'] = Field(
+		..., description='bound — привязана, already_bound — уже была'
+		                 ' привязана, missing — посылка не найдена')
+
+
 class BindCompanyResponseSchema(BaseModel):
 	"""Ответ на успешную привязку посылки к компании."""
 	message: str = Field(default='Компания успешно привязана к посылке',
@@ -1,78 +1,58 @@
+import hmac
+from functools import lru_cache
 from uuid import uuid4
 
 from redis.asyncio import Redis
 from typing import AsyncGenerator
 
-from fastapi import Depends, Response, Cookie
+from fastapi import Depends, Response, Cookie, Header, HTTPException, Query
+from starlette import status
 
-from sqlalchemy.ext.asyncio import (
-	create_async_engine,
-	AsyncSession,
-	async_sessionmaker,
-)
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.adapters import database
+from app.adapters.database.engine import create_engine, create_session_factory
+from app.adapters.database.hooks import discard_after_commit, run_after_commit
 from app.adapters.database.repositories.parcel_repo import ParcelRepo
 from app.adapters.database.repositories.company_repo import CompanyRepo
+from app.applications.dataclasses.dataclasses import Company, ParcelType
 from app.applications.services.company_service import CompanyService
 from app.applications.services.parcel_services import ParcelService
 from app.utils.constants import CookiesConstants
-from app.utils.settings import RateSettings
+from app.utils.pricing_stream import PricingStream
+from app.utils.reference_cache import ReferenceDataCache, reference_cache
+from app.utils.settings import ExportSettings, RateSettings, SummarySettings
+from app.utils.summary_cache import ParcelSummaryCache
 
 
 class Settings:
 	"""Объединённые настройки приложения."""
 	db = database.settings.MySQLSettings()
-	celery_settings = database.settings.CelerySettings()
 	redis_settings = RateSettings()
 
 
 class DB:
 	"""Основное подключение к БД приложения."""
-	engine = create_async_engine(Settings.db.DATABASE_URL)
-	async_session_factory = async_sessionmaker(
-		bind=engine,
-		class_=AsyncSession,
-		expire_on_commit=False,
-	)
-
-
-class CeleryDB:
-	"""Подключение к БД для задач Celery."""
-	engine = create_async_engine(Settings.celery_settings.DATABASE_URL)
-	async_session_factory = async_sessionmaker(
-		bind=engine,
-		class_=AsyncSession,
-		expire_on_commit=False,
-	)
-
-
-async def get_celery_db_session() -> AsyncGenerator[AsyncSession, None]:
-	"""
-	Асинхронный генератор сессии для задач Celery.
-	Используется из фоновых процессов.
-	"""
-	async with CeleryDB.async_session_factory() as session:
-		try:
-			yield session
-			await session.commit()
-		except:
-			await session.rollback()
-			raise
+	engine = create_engine('api', Settings.db)
+	async_session_factory = create_session_factory(engine)
 
 
 async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
 	"""
 	Асинхронный генератор сессии SQLAlchemy для FastAPI.
 	Открывает транзакцию, коммитит при успешном завершении, иначе откатывает.
+	После коммита выполняет колбэки, зарегистрированные через
+	add_after_commit.
 	"""
 	async with DB.async_session_factory() as session:
 		try:
 			yield session
 			await session.commit()
 		except:
+			discard_after_commit(session)
 			await session.rollback()
 			raise
+		await run_after_commit(session)
 
 
 def create_redis_connection() -> Redis:
@@ -87,6 +67,62 @@ def create_redis_connection() -> Redis:
 	)
 
 
+@lru_cache
+def get_redis() -> Redis:
+	"""
+	Общее подключение к Redis процесса API (пул соединений создаётся
+	один раз и закрывается при остановке приложения).
+	"""
+	return create_redis_connection()
+
+
+def get_pricing_stream() -> PricingStream:
+	"""
+	Провайдер потока оповещений о посылках для расчёта стоимости.
+	"""
+	return PricingStream(get_redis())
+
+
+@lru_cache
+def get_summary_cache() -> ParcelSummaryCache:
+	"""
+	Провайдер кеша сводок посылок по сессиям.
+	"""
+	return ParcelSummaryCache(
+		get_redis(), SummarySettings().cache_ttl_seconds)
+
+
+async def load_reference_data(
+	session: AsyncSession,
+) -> tuple[list[ParcelType], list[Company]]:
+	"""
+	Загружает справочники (типы посылок и компании) из БД.
+	"""
+	parcel_types = await ParcelRepo(session=session).get_all_types()
+	companies = await CompanyRepo(session=session).get_all_companies()
+	return list(parcel_types), list(companies)
+
+
+async def preload_reference_cache() -> None:
+	"""
+	Загружает кеш справочников в отдельной сессии при старте приложения.
+	"""
+	async with DB.async_session_factory() as session:
+		await reference_cache.ensure_loaded(
+			lambda: load_reference_data(session))
+
+
+async def get_reference_cache(
+	session: AsyncSession = Depends(get_db_session),
+) -> ReferenceDataCache:
+	"""
+	Провайдер кеша справочников для FastAPI DI.
+	Если кеш пуст или сброшен — загружает его в сессии текущего запроса.
+	"""
+	await reference_cache.ensure_loaded(lambda: load_reference_data(session))
+	return reference_cache
+
+
 async def create_parcel_repo(
 	session: AsyncSession = Depends(get_db_session)
 ) -> ParcelRepo:
@@ -104,20 +140,29 @@ async def create_company_repo(
 
 def create_company_service(
 	company_repo: CompanyRepo = Depends(create_company_repo),
+	cache: ReferenceDataCache = Depends(get_reference_cache),
 ) -> CompanyService:
 	"""
 	Провайдер репозитория CompanyRepo для FastAPI DI.
 	"""
-	return CompanyService(company_repo=company_repo)
+	return CompanyService(company_repo=company_repo, reference_cache=cache)
 
 
 def create_parcel_service(
 	parcel_repo: ParcelRepo = Depends(create_parcel_repo),
+	cache: ReferenceDataCache = Depends(get_reference_cache),
+	pricing_stream: PricingStream = Depends(get_pricing_stream),
+	summary_cache: ParcelSummaryCache = Depends(get_summary_cache),
 ) -> ParcelService:
 	"""
 	Провайдер бизнес-сервиса для компаний.
 	"""
-	return ParcelService(parcel_repo=parcel_repo)
+	return ParcelService(
+		parcel_repo=parcel_repo,
+		reference_cache=cache,
+		pricing_stream=pricing_stream,
+		summary_cache=summary_cache,
+	)
 
 
 async def get_or_create_session_id(
@@ -144,3 +189,34 @@ async def get_or_create_session_id(
 	return session_id
 
 
+@lru_cache
+def get_export_settings() -> ExportSettings:
+	"""
+	Настройки выгрузки посылок.
+	"""
+	return ExportSettings()
+
+
+def authorize_export(
+	all_sessions: bool = Query(
+		False, description='Выгрузить посылки всех сессий (нужен X-Export-Token)'
+	),
+	export_token: str | None = Header(None, alias='X-Export-Token'),
+	settings: ExportSettings = Depends(get_export_settings),
+) -> bool:
+	"""
+	Разрешает выгрузку посылок всех сессий только с доверенным токеном
+	EXPORT_TOKEN в заголовке X-Export-Token.
+
+	:return: True, если выгружаются посылки всех сессий
+	:raises HTTPException: 403, если токен не задан или не совпадает
+	"""
+	if all_sessions and not (
+		settings.token and export_token
+		and hmac.compare_digest(export_token, settings.token)
+	):
+		raise HTTPException(
+			status_code=status.HTTP_403_FORBIDDEN,
+			detail='Выгрузка всех сессий требует X-Export-Token',
+		)
+	return all_sessions
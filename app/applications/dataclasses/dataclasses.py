@@ -1,5 +1,6 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
+from typing import NamedTuple
 
 
 @dataclass
@@ -21,6 +22,34 @@ class Parcel:
 	company_id: int | None = None
 
 
+class ParcelRow(NamedTuple):
+	"""
+	Колонки посылки для ответов API, выбираемые без гидратации Parcel.
+	"""
+	id: int
+	name: str
+	weight: float
+	type_id: int
+	content_value_usd: float
+	delivery_price: float | None
+	created_at: datetime
+
+
+class ParcelExportRow(NamedTuple):
+	"""
+	Колонки посылки для выгрузки (GET /parcels/export).
+	"""
+	id: int
+	session_id: str
+	name: str
+	weight: float
+	type_id: int
+	content_value_usd: float
+	delivery_price: float | None
+	company_id: int | None
+	created_at: datetime
+
+
 @dataclass
 class ParcelType:
 	"""
@@ -37,3 +66,57 @@ class Company:
 	"""
 	name: str
 	id: int | None = None
+
+
+@dataclass
+class CompanyStats:
+	"""
+	Агрегаты посылок транспортной компании.
+	"""
+	company_id: int
+	parcel_count: int = 0
+	total_weight: float = 0.0
+	priced_count: int = 0
+	total_delivery_price: float = 0.0
+
+
+@dataclass
+class BulkBindResult:
+	"""
+	Итог пакетной привязки посылок к компании: ID привязанных, уже
+	привязанных и несуществующих посылок и сессии привязанных посылок.
+	"""
+	bound: list[int] = field(default_factory=list)
+	already_bound: list[int] = field(default_factory=list)
+	missing: list[int] = field(default_factory=list)
+	session_ids: set[str] = field(default_factory=set)
+
+
+@dataclass
+class WeightBracket:
+	"""
+	Весовой диапазон тарифа: для посылок с весом >= weight_from
+	применяется собственный коэффициент за килограмм.
+	"""
+	weight_from: float
+	weight_coefficient: float
+	tariff_id: int | None = None
+	id: int | None = None
+
+
+@dataclass
+class Tariff:
+	"""
+	Доменная модель тарифа доставки.
+
+	Тариф может быть задан для типа посылки, для компании или для их пары.
+	Стоимость в USD: max(вес * коэффициент_диапазона
+	+ стоимость содержимого * value_coefficient, min_charge_usd).
+	"""
+	weight_coefficient: float
+	value_coefficient: float
+	min_charge_usd: float = 0.0
+	parcel_type_id: int | None = None
+	company_id: int | None = None
+	weight_brackets: list[WeightBracket] = field(default_factory=list)
+	id: int | None = None
@@ -1,5 +1,11 @@
 from abc import ABC, abstractmethod
-from app.applications.dataclasses.dataclasses import Company
+from typing import Awaitable, Callable
+
+from app.applications.dataclasses.dataclasses import (
+    Company,
+    CompanyStats,
+    ParcelRow,
+)
 
 
 class ICompanyRepositories(ABC):
@@ -27,3 +33,41 @@ class ICompanyRepositories(ABC):
         :return: Список объектов Company
         """
         pass
+
+    @abstractmethod
+    async def get_stats(self, company_id: int) -> CompanyStats | None:
+        """
+        Возвращает агрегаты посылок компании.
+
+        :param company_id: ID компании
+        :return: CompanyStats или None, если компании нет
+        """
+        pass
+
+    @abstractmethod
+    async def list_parcels(
+        self,
+        company_id: int,
+        session_id: str | None,
+        limit: int,
+        after_id: int | None = None,
+    ) -> list[tuple[ParcelRow, str]]:
+        """
+        Возвращает посылки компании в порядке убывания ID.
+
+        :param company_id: ID компании
+        :param session_id: Сессия пользователя (None — все сессии)
+        :param limit: Ограничение количества результатов
+        :param after_id: ID последней посылки предыдущей страницы
+        :return: Пары (ParcelRow, название типа посылки)
+        """
+        pass
+
+    @abstractmethod
+    def after_commit(self, callback: Callable[[], Awaitable[None]]) -> None:
+        """
+        Регистрирует колбэк, выполняемый после коммита транзакции.
+
+        :param callback: Корутинная функция без аргументов
+        """
+        pass
@@ -1,5 +1,14 @@
+import datetime
 from abc import ABC, abstractmethod
-from app.applications.dataclasses.dataclasses import Parcel, ParcelType
+from typing import AsyncIterator, Awaitable, Callable, Iterable
+
+from app.applications.dataclasses.dataclasses import (
+    BulkBindResult,
+    Parcel,
+    ParcelExportRow,
+    ParcelRow,
+    ParcelType,
+)
 
 
 class IParcelRepositories(ABC):
@@ -33,6 +42,45 @@ class IParcelRepositories(ABC):
         """
         pass
 
+    @abstractmethod
+    async def get_or_create_parcel(
+        self,
+        name: str,
+        weight: float,
+        type_id: int,
+        content_value_usd: float,
+        session_id: str,
+    ) -> int:
+        """
+        Создаёт посылку или возвращает ID существующей с тем же именем
+        в рамках сессии — одним запросом.
+
+        :param name: Название посылки
+        :param weight: Вес в килограммах
+        :param type_id: ID типа посылки
+        :param content_value_usd: Стоимость содержимого в USD
+        :param session_id: Идентификатор пользовательской сессии
+        :return: ID новой или существующей посылки
+        """
+        pass
+
+    @abstractmethod
+    async def get_or_create_parcels(
+        self,
+        session_id: str,
+        parcels_data: list[dict],
+    ) -> dict[str, int]:
+        """
+        Создаёт пакет посылок одним запросом и возвращает ID новых
+        и уже существующих посылок.
+
+        :param session_id: Идентификатор пользовательской сессии
+        :param parcels_data: Словари с ключами name, weight, type_id,
+            content_value_usd (имена уникальны)
+        :return: Словарь {название посылки, как оно хранится в БД: ID}
+        """
+        pass
+
     @abstractmethod
     async def get_by_name_and_session(
         self,
@@ -65,16 +113,44 @@ class IParcelRepositories(ABC):
         has_delivery_cost: bool | None,
         limit: int,
         offset: int,
-    ) -> list[Parcel]:
+        after: tuple[datetime.datetime, int] | None = None,
+    ) -> list[ParcelRow]:
         """
-        Возвращает отфильтрованный список посылок пользователя.
+        Возвращает отфильтрованный список посылок пользователя,
+        упорядоченный по (created_at, id) от новых к старым, в виде строк
+        ParcelRow без гидратации объектов Parcel.
 
         :param session_id: Сессия пользователя
         :param type_id: Фильтр по типу (если указан)
         :param has_delivery_cost: True/False для фильтрации по цене доставки
         :param limit: Ограничение количества результатов
         :param offset: Смещение для пагинации
-        :return: Список посылок
+        :param after: Ключ (created_at, id) последней посылки предыдущей
+            страницы; если указан, выборка продолжается строго после него
+            по индексу без пропуска offset строк
+        :return: Список ParcelRow
+        """
+        pass
+
+    @abstractmethod
+    def stream_by_filters(
+        self,
+        session_id: str | None,
+        type_id: int | None,
+        has_delivery_cost: bool | None,
+        company_id: int | None = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[list[ParcelExportRow]]:
+        """
+        Выдаёт отфильтрованные посылки порциями по batch_size строк
+        в порядке id, не загружая выборку в память целиком.
+
+        :param session_id: Сессия пользователя (None — все сессии)
+        :param type_id: Фильтр по типу (если указан)
+        :param has_delivery_cost: True/False для фильтрации по цене доставки
+        :param company_id: Фильтр по транспортной компании (если указан)
+        :param batch_size: Количество строк в порции
+        :return: Асинхронный итератор порций ParcelExportRow
         """
         pass
 
@@ -83,36 +159,251 @@ class IParcelRepositories(ABC):
         self,
         parcel_id: int,
         session_id: str,
-    ) -> Parcel | None:
+    ) -> ParcelRow | None:
         """
-        Получает посылку по её ID и сессии пользователя.
+        Получает посылку по её ID и сессии пользователя в виде строки
+        ParcelRow.
 
         :param parcel_id: Уникальный идентификатор посылки
         :param session_id: Идентификатор сессии пользователя
-        :return: Parcel или None
+        :return: ParcelRow или None
+        """
+        pass
+
+    @abstractmethod
+    async def summarize_by_type(
+        self,
+        session_id: str,
+    ) -> list[tuple[int, int, int, int, float, float]]:
+        """
+        Сводка посылок сессии по типам одним агрегирующим запросом.
+
+        :param session_id: Идентификатор сессии пользователя
+        :return: Кортежи (type_id, parcel_count, priced_count, bound_count,
+            total_weight, total_delivery_price) в порядке type_id
         """
         pass
 
     @abstractmethod
     async def get_unpriced_parcels(self) -> list[Parcel]:
         """
-        Возвращает все посылки, у которых не рассчитана стоимость доставки.
+        Возвращает все посылки из очереди расчёта, у которых
+        не рассчитана стоимость доставки.
 
         :return: Список посылок без delivery_price
         """
         pass
 
+    @abstractmethod
+    async def get_unpriced_pricing_rows(
+        self,
+        after_id: int,
+        limit: int,
+        id_to: int | None = None,
+        skip_locked: bool = False,
+    ) -> list[tuple[int, float, float, int, int | None]]:
+        """
+        Возвращает очередную порцию посылок из очереди расчёта стоимости
+        доставки в колоночном виде (keyset-пагинация по id).
+
+        :param after_id: ID последней обработанной посылки (0 — с начала)
+        :param limit: Максимальный размер порции
+        :param id_to: Верхняя граница ID включительно (опционально)
+        :param skip_locked: Захватить строки до конца транзакции,
+            пропуская заблокированные другими обработчиками
+        :return: Кортежи (id, weight, content_value_usd, type_id, company_id)
+        """
+        pass
+
+    @abstractmethod
+    async def get_unpriced_ids(self, after_id: int, limit: int) -> list[int]:
+        """
+        Возвращает очередную порцию ID посылок без стоимости доставки
+        из таблицы посылок (keyset-пагинация по id), независимо от outbox.
+
+        :param after_id: ID последней просмотренной посылки (0 — с начала)
+        :param limit: Максимальный размер порции
+        :return: ID посылок по возрастанию
+        """
+        pass
+
+    @abstractmethod
+    async def set_delivery_prices(self, prices: dict[int, float]) -> int:
+        """
+        Записывает рассчитанные стоимости доставки и прибавляет их
+        к агрегатам компаний.
+
+        :param prices: Словарь {ID посылки: стоимость доставки}
+        :return: Количество обновлённых посылок
+        """
+        pass
+
+    @abstractmethod
+    async def add_company_prices(
+        self,
+        company_prices: Iterable[tuple[int | None, float]],
+    ) -> None:
+        """
+        Прибавляет рассчитанные стоимости доставки к агрегатам компаний.
+        Посылки без компании пропускаются.
+
+        :param company_prices: Пары (ID компании или None, стоимость доставки)
+        """
+        pass
+
+    @abstractmethod
+    def pop_repriced_sessions(self) -> set[str]:
+        """
+        Возвращает сессии, посылки которых получили цену с прошлого
+        вызова, и очищает набор.
+
+        :return: Идентификаторы сессий
+        """
+        pass
+
+    @abstractmethod
+    async def commit_chunk(self) -> None:
+        """
+        Фиксирует обработанную порцию и освобождает загруженные объекты.
+        """
+        pass
+
+    @abstractmethod
+    async def get_unpriced_id_bounds(self) -> tuple[int | None, int | None]:
+        """
+        Возвращает минимальный и максимальный ID посылок в очереди
+        расчёта стоимости доставки.
+
+        :return: Кортеж (min_id, max_id) или (None, None), если очередь пуста
+        """
+        pass
+
+    @abstractmethod
+    async def reprice_unpriced(
+        self,
+        rate: float,
+        id_from: int | None = None,
+        id_to: int | None = None,
+    ) -> int:
+        """
+        Рассчитывает стоимость доставки на стороне БД для посылок из очереди
+        расчёта, прибавляет цены к агрегатам компаний и удаляет посылки
+        из очереди.
+
+        :param rate: Курс USD→RUB
+        :param id_from: Нижняя граница ID (опционально)
+        :param id_to: Верхняя граница ID (опционально)
+        :return: Количество обновлённых посылок
+        """
+        pass
+
+    @abstractmethod
+    async def enqueue_for_pricing(self, parcel_ids: list[int]) -> int:
+        """
+        Добавляет посылки в outbox расчёта стоимости в текущей транзакции.
+
+        :param parcel_ids: ID посылок
+        :return: Количество посылок, которых ещё не было в outbox
+        """
+        pass
+
+    @abstractmethod
+    async def get_pricing_rows_by_ids(
+        self,
+        parcel_ids: list[int],
+    ) -> list[tuple[int, float, float, int, int | None]]:
+        """
+        Возвращает посылки из списка без стоимости доставки в колоночном виде.
+
+        :param parcel_ids: ID посылок
+        :return: Кортежи (id, weight, content_value_usd, type_id, company_id)
+        """
+        pass
+
+    @abstractmethod
+    async def remove_from_pricing_outbox(self, parcel_ids: list[int]) -> int:
+        """
+        Удаляет обработанные посылки из outbox расчёта стоимости.
+
+        :param parcel_ids: ID посылок
+        :return: Количество удалённых строк
+        """
+        pass
+
+    @abstractmethod
+    async def get_stale_outbox_ids(
+        self,
+        older_than: datetime.datetime,
+        limit: int,
+    ) -> list[int]:
+        """
+        Возвращает ID посылок, стоящих в outbox дольше заданного времени.
+
+        :param older_than: Граница времени постановки в очередь
+        :param limit: Максимальное количество ID
+        :return: Список ID посылок
+        """
+        pass
+
+    @abstractmethod
+    async def count_pricing_backlog(self) -> int:
+        """
+        Возвращает количество посылок в очереди расчёта стоимости доставки.
+
+        :return: Размер очереди
+        """
+        pass
+
+    @abstractmethod
+    def after_commit(self, callback: Callable[[], Awaitable[None]]) -> None:
+        """
+        Регистрирует колбэк, выполняемый после коммита транзакции.
+
+        :param callback: Корутинная функция без аргументов
+        """
+        pass
+
+    @abstractmethod
+    async def company_exists(self, company_id: int) -> bool:
+        """
+        Проверяет, что транспортная компания существует.
+
+        :param company_id: ID компании
+        :return: True, если компания найдена
+        """
+        pass
+
     @abstractmethod
     async def bind_company_to_parcel(
         self,
         parcel_id: int,
         company_id: int,
-    ) -> bool:
+    ) -> str | None:
         """
-        Привязывает транспортную компанию к посылке.
+        Привязывает транспортную компанию к посылке и учитывает посылку
+        в агрегатах компании.
 
         :param parcel_id: ID посылки
         :param company_id: ID компании
-        :return: True, если привязка успешна; False, если уже привязана
+        :return: Сессия посылки, если привязка успешна; None, если посылка
+            уже привязана
+        """
+        pass
+
+    @abstractmethod
+    async def bind_company_to_parcels(
+        self,
+        parcel_ids: list[int],
+        company_id: int,
+        chunk_size: int,
+    ) -> BulkBindResult:
+        """
+        Привязывает к компании ещё не привязанные посылки из списка
+        порциями по chunk_size ID и учитывает их в агрегатах компании.
+
+        :param parcel_ids: ID посылок (возможны повторы)
+        :param company_id: ID компании
+        :param chunk_size: Количество ID в одном запросе
+        :return: BulkBindResult
         """
         pass
@@ -0,0 +1,17 @@
+from abc import ABC, abstractmethod
+from app.applications.dataclasses.dataclasses import Tariff
+
+
+class ITariffRepositories(ABC):
+    """
+    Интерфейс репозитория тарифов доставки.
+    """
+
+    @abstractmethod
+    async def get_all_tariffs(self) -> list[Tariff]:
+        """
+        Возвращает все тарифы вместе с весовыми диапазонами.
+
+        :return: Список объектов Tariff
+        """
+        pass
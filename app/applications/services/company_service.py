@@ -1,7 +1,16 @@
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 
-from app.adapters.http_api.schemas.schemas import CompanyResponse
+from fastapi import HTTPException
+from starlette import status
+
+from app.adapters.http_api.schemas.schemas import (
+	CompanyResponse,
+	CompanyStatsResponse,
+)
 from app.applications.interfaces.company_interfaces import ICompanyRepositories
+from app.applications.services.parcel_services import parcel_view
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.reference_cache import ReferenceDataCache
 
 
 @dataclass(frozen=True)
@@ -11,15 +20,22 @@ class CompanyService:
 	"""
 
 	company_repo: ICompanyRepositories
+	reference_cache: ReferenceDataCache | None = None
 
 	async def create_company(self, company_name: str) -> int:
 		"""
 		Создаёт новую транспортную компанию.
 
+		После коммита кеш справочников сбрасывается во всех процессах.
+
 		:param company_name: Название компании
 		:return: ID созданной компании
 		"""
-		return await self.company_repo.create_company(company_name=company_name)
+		company_id = await self.company_repo.create_company(
+			company_name=company_name)
+		if self.reference_cache is not None:
+			self.company_repo.after_commit(self.reference_cache.notify_changed)
+		return company_id
 
 	async def get_all_companies(self) -> list[CompanyResponse]:
 		"""
@@ -27,7 +43,10 @@ class CompanyService:
 
 		:return: Список CompanyResponse
 		"""
-		companies = await self.company_repo.get_all_companies()
+		if self.reference_cache is not None and self.reference_cache.is_loaded:
+			companies = self.reference_cache.get_companies()
+		else:
+			companies = await self.company_repo.get_all_companies()
 		return [
 			CompanyResponse(
 				id=company.id,
@@ -35,3 +54,71 @@ class CompanyService:
 			)
 			for company in companies
 		]
+
+	async def get_company_stats(self, company_id: int) -> CompanyStatsResponse:
+		"""
+		Возвращает статистику посылок компании из инкрементально
+		поддерживаемых агрегатов: стоимость не зависит от числа посылок.
+		Агрегаты общие для всех сессий.
+
+		:param company_id: ID компании
+		:return: CompanyStatsResponse
+		:raises HTTPException: 404, если компании нет
+		"""
+		stats = await self.company_repo.get_stats(company_id)
+		if stats is None:
+			self._raise_not_found(company_id)
+		return CompanyStatsResponse(**asdict(stats))
+
+	async def list_company_parcels(
+		self,
+		company_id: int,
+		session_id: str | None,
+		limit: int,
+		cursor: str | None = None,
+	) -> tuple[list[dict], str | None]:
+		"""
+		Возвращает страницу посылок компании от новых к старым.
+
+		:param company_id: ID компании
+		:param session_id: Сессия пользователя (None — все сессии)
+		:param limit: Ограничение на количество элементов
+		:param cursor: Курсор следующей страницы из предыдущего ответа
+		:return: Список посылок в форме ParcelListResponse и курсор
+			следующей страницы (None, если страница последняя)
+		:raises HTTPException: 400 при повреждённом курсоре, 404, если
+			компании нет
+		"""
+		after_id = None
+		if cursor is not None:
+			try:
+				after_id = int(decode_cursor(cursor)[0])
+			except (TypeError, ValueError, IndexError):
+				raise HTTPException(
+					status_code=status.HTTP_400_BAD_REQUEST,
+					detail='Некорректный курсор',
+				)
+
+		rows = await self.company_repo.list_parcels(
+			company_id=company_id,
+			session_id=session_id,
+			limit=limit,
+			after_id=after_id,
+		)
+		# Пустая страница — либо конец выборки, либо неизвестная компания
+		if not rows and await self.company_repo.get_stats(company_id) is None:
+			self._raise_not_found(company_id)
+
+		next_cursor = None
+		if len(rows) == limit:
+			next_cursor = encode_cursor(rows[-1][0].id)
+		return [
+			parcel_view(parcel, type_name) for parcel, type_name in rows
+		], next_cursor
+
+	@staticmethod
+	def _raise_not_found(company_id: int) -> None:
+		raise HTTPException(
+			status_code=status.HTTP_404_NOT_FOUND,
+			detail=f'Компания {company_id} не найдена',
+		)
@@ -22,3 +22,8 @@ class AppError(Exception):
 class NotFoundError(AppError):
     msg_template = 'Parcel {parcel_id} not found in your session'
     code = 'parcel_service.get_parcel'
+
+
+class CompanyNotFoundError(NotFoundError):
+    msg_template = 'Company {company_id} not found'
+    code = 'parcel_service.bind_company'
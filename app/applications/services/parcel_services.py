@@ -1,21 +1,74 @@
 import logging
 from dataclasses import dataclass
+from datetime import datetime
+from functools import partial
+from typing import AsyncIterator, Iterable
 
 from fastapi import HTTPException
 from starlette import status
 
 from app.adapters.http_api.schemas.schemas import (
+	ParcelSummaryTotals,
 	ParcelTypeResponse,
-	ParcelListResponse,
-	ParcelDetailResponse, BindCompanyResponseSchema,
+	BindCompanyResponseSchema,
+)
+from app.applications.dataclasses.dataclasses import (
+	ParcelExportRow,
+	ParcelRow,
 )
 from app.applications.interfaces.parcel_interfaces import IParcelRepositories
-from app.applications.services.errors.errors import NotFoundError
-from app.utils.constants import ParcelsConstants
+from app.applications.services.errors.errors import (
+	CompanyNotFoundError,
+	NotFoundError,
+)
+from app.utils.constants import BulkConstants, ParcelsConstants
+from app.utils.export import encode_csv, encode_ndjson
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.pricing_stream import PricingStream
+from app.utils.reference_cache import ReferenceDataCache
+from app.utils.summary_cache import ParcelSummaryCache
 
 logger = logging.getLogger(__name__)
 
 
+def parcel_name_key(name: str) -> str:
+	"""
+	Ключ сравнения названий посылок, совпадающий с collation столбца
+	parcels.name в MySQL: регистр и пробелы в конце не учитываются.
+
+	:param name: Название посылки
+	:return: Нормализованное название
+	"""
+	return name.rstrip().casefold()
+
+
+def parcel_view(parcel: ParcelRow, type_name: str) -> dict:
+	"""
+	Собирает посылку в форме ParcelListResponse/ParcelDetailResponse.
+
+	Строки БД уже соответствуют схеме, поэтому словарь отдаётся клиенту
+	без построения и проверки pydantic-моделей (см. fast_json_response).
+
+	:param parcel: Строка посылки
+	:param type_name: Название типа посылки
+	:return: Словарь полей ответа
+	"""
+	return {
+		'parcel_id': parcel.id,
+		'name': parcel.name,
+		'weight': parcel.weight,
+		'type_id': parcel.type_id,
+		'type_name': type_name,
+		'content_value_usd': parcel.content_value_usd,
+		'delivery_price': (
+			parcel.delivery_price
+			if parcel.delivery_price is not None
+			else ParcelsConstants.NOT_MEANT.value
+		),
+		'created_at': parcel.created_at,
+	}
+
+
 @dataclass(frozen=True)
 class ParcelService:
 	"""
@@ -24,6 +77,9 @@ class ParcelService:
 	"""
 
 	parcel_repo: IParcelRepositories
+	reference_cache: ReferenceDataCache | None = None
+	pricing_stream: PricingStream | None = None
+	summary_cache: ParcelSummaryCache | None = None
 
 	async def create_parcel(
 		self,
@@ -44,25 +100,102 @@ class ParcelService:
 		:param session_id: Идентификатор пользовательской сессии
 		:return: ID посылки
 		"""
-		# Проверяем, существует ли уже посылка с таким именем
-		# в рамках сессии пользователя
-		existing = await self.parcel_repo.get_by_name_and_session(
-			name=name,
-			session_id=session_id,
-		)
-		if existing:
-			logger.info(f'Посылка уже существует: id={existing.id}')
-			return existing.id
-
-		# Если не существует — создаём новую посылку
-		parcel = await self.parcel_repo.create_parcel(
+		# Один INSERT ... ON DUPLICATE KEY UPDATE: уникальный индекс
+		# (session_id, name) гарантирует отсутствие дубликатов даже при
+		# конкурентных запросах, а в ответ приходит ID новой или
+		# существующей посылки
+		parcel_id = await self.parcel_repo.get_or_create_parcel(
 			name=name,
 			weight=weight,
 			type_id=type_id,
 			content_value_usd=content_value_usd,
 			session_id=session_id,
 		)
-		return parcel
+		await self._enqueue_pricing([parcel_id])
+		self._invalidate_summaries([session_id])
+		return parcel_id
+
+	async def create_parcels_bulk(
+		self,
+		parcels: list[dict],
+		session_id: str,
+	) -> list[int]:
+		"""
+		Создать пакет посылок в рамках текущей сессии.
+
+		Повторяющиеся в пакете имена схлопываются: сохраняется первая
+		посылка, остальные получают её ID — так же, как при повторной
+		отправке POST /parcels. Уже существующие в сессии посылки
+		не изменяются. Имена сравниваются как в БД (parcel_name_key):
+		'Box', 'box ' и 'BOX' — одна посылка.
+
+		:param parcels: Словари с ключами name, weight, type_id,
+			content_value_usd
+		:param session_id: Идентификатор пользовательской сессии
+		:return: ID посылок в порядке входного списка
+		"""
+		unique_parcels: dict[str, dict] = {}
+		for parcel in parcels:
+			unique_parcels.setdefault(parcel_name_key(parcel['name']), parcel)
+
+		stored_ids = await self.parcel_repo.get_or_create_parcels(
+			session_id=session_id,
+			parcels_data=list(unique_parcels.values()),
+		)
+		# Репозиторий возвращает названия в том виде, в каком они
+		# сохранены в БД, а не во входном
+		ids_by_name = {
+			parcel_name_key(name): parcel_id
+			for name, parcel_id in stored_ids.items()
+		}
+		await self._enqueue_pricing(list(ids_by_name.values()))
+		self._invalidate_summaries([session_id])
+		return [
+			ids_by_name[parcel_name_key(parcel['name'])] for parcel in parcels]
+
+	async def _enqueue_pricing(self, parcel_ids: list[int]) -> None:
+		"""
+		Ставит посылки в очередь расчёта стоимости доставки.
+
+		ID записываются в outbox в той же транзакции, что и посылки,
+		а после коммита публикуются в поток Redis, чтобы потребитель
+		рассчитал стоимость без ожидания периодической задачи.
+
+		:param parcel_ids: ID посылок
+		"""
+		await self.parcel_repo.enqueue_for_pricing(parcel_ids)
+		if self.pricing_stream is not None:
+			self.parcel_repo.after_commit(
+				partial(self.pricing_stream.publish, parcel_ids))
+
+	def _invalidate_summaries(self, session_ids: Iterable[str]) -> None:
+		"""
+		Сбрасывает сводки сессий в кеше после коммита транзакции.
+
+		:param session_ids: Идентификаторы сессий
+		"""
+		if self.summary_cache is not None:
+			self.parcel_repo.after_commit(
+				partial(self.summary_cache.invalidate, session_ids))
+
+	async def _ensure_company_exists(self, company_id: int) -> None:
+		"""
+		Проверяет, что компания существует: по кешу справочников, а если
+		её там нет (кеш не загружен или ещё не обновлён после создания
+		компании) — по БД.
+
+		:param company_id: ID транспортной компании
+		:raises CompanyNotFoundError: Если компании нет
+		"""
+		if (
+			self.reference_cache is not None
+			and self.reference_cache.is_loaded
+			and self.reference_cache.has_company(company_id)
+		):
+			return
+		if not await self.parcel_repo.company_exists(company_id):
+			logger.warning('Компания не найдена: company_id=%s', company_id)
+			raise CompanyNotFoundError(company_id=company_id)
 
 	async def get_all_types(self) -> list[ParcelTypeResponse]:
 		"""
@@ -70,7 +203,10 @@ class ParcelService:
 
 		:return: Список объектов ParcelTypeResponse
 		"""
-		parcel_types = await self.parcel_repo.get_all_types()
+		if self.reference_cache is not None and self.reference_cache.is_loaded:
+			parcel_types = self.reference_cache.get_parcel_types()
+		else:
+			parcel_types = await self.parcel_repo.get_all_types()
 		return [
 			ParcelTypeResponse(
 				type_id=parcel_type.id,
@@ -85,7 +221,8 @@ class ParcelService:
 		has_delivery_cost: bool | None,
 		limit: int,
 		offset: int,
-	) -> list[ParcelListResponse]:
+		cursor: str | None = None,
+	) -> tuple[list[dict], str | None]:
 		"""
 		Получить список посылок текущей сессии с возможностью фильтрации
 		и пагинации.
@@ -95,8 +232,19 @@ class ParcelService:
 		:param has_delivery_cost: Только с/без стоимости доставки (опционально)
 		:param limit: Ограничение на количество элементов
 		:param offset: Смещение для пагинации
-		:return: Список ParcelListResponse
+		:param cursor: Курсор следующей страницы из предыдущего ответа
+		:return: Список посылок в форме ParcelListResponse и курсор
+			следующей страницы (None, если страница последняя)
 		"""
+		after = None
+		if cursor is not None:
+			if offset:
+				raise HTTPException(
+					status_code=status.HTTP_400_BAD_REQUEST,
+					detail='Нельзя использовать cursor вместе с offset',
+				)
+			after = self._parse_cursor(cursor)
+
 		# Получаем посылки из репозитория с применением фильтров
 		parcels = await self.parcel_repo.list_by_filters(
 			session_id=session_id,
@@ -104,32 +252,148 @@ class ParcelService:
 			has_delivery_cost=has_delivery_cost,
 			limit=limit,
 			offset=offset,
+			after=after,
 		)
-		response = []
-		for parcel in parcels:
-			response.append(
-				ParcelListResponse(
-					parcel_id=parcel.id,
-					name=parcel.name,
-					weight=parcel.weight,
-					type_id=parcel.type_id,
-					type_name=parcel.type.name,
-					content_value_usd=parcel.content_value_usd,
-					delivery_price=(
-						parcel.delivery_price
-						if parcel.delivery_price is not None
-						else ParcelsConstants.NOT_MEANT.value
-					),
-					created_at=parcel.created_at,
-				)
+		type_names = await self._get_type_names(
+			{parcel.type_id for parcel in parcels})
+		response = [
+			parcel_view(parcel, type_names[parcel.type_id]) for parcel in parcels
+		]
+
+		next_cursor = None
+		if len(parcels) == limit:
+			last = parcels[-1]
+			next_cursor = encode_cursor(last.created_at, last.id)
+		return response, next_cursor
+
+	async def get_summary(self, session_id: str) -> dict:
+		"""
+		Сводка посылок сессии по типам: количество посылок, рассчитанных
+		и привязанных, суммарный вес и стоимость доставки.
+
+		Сводка считается одним агрегирующим запросом и кешируется
+		в Redis до изменения посылок сессии (не дольше TTL кеша). Версия
+		сессии читается до запроса к БД: если посылки сессии изменились
+		до сохранения сводки, устаревшая сводка в кеш не попадает.
+
+		:param session_id: Идентификатор сессии
+		:return: Сводка в форме ParcelSummaryResponse
+		"""
+		version = None
+		if self.summary_cache is not None:
+			summary, version = await self.summary_cache.get(session_id)
+			if summary is not None:
+				return summary
+
+		rows = await self.parcel_repo.summarize_by_type(session_id)
+		type_names = await self._get_type_names({row[0] for row in rows})
+		fields = ParcelSummaryTotals.model_fields
+		types = [
+			{
+				'type_id': type_id,
+				'type_name': type_names[type_id],
+				**dict(zip(fields, totals)),
+			}
+			for type_id, *totals in rows
+		]
+		summary = {
+			'types': types,
+			'total': {
+				name: sum(item[name] for item in types) for name in fields
+			},
+		}
+
+		if self.summary_cache is not None:
+			await self.summary_cache.set(session_id, summary, version)
+		return summary
+
+	async def export_parcels(
+		self,
+		session_id: str | None,
+		type_id: int | None,
+		has_delivery_cost: bool | None,
+		company_id: int | None,
+		export_format: str,
+		batch_size: int,
+	) -> AsyncIterator[bytes]:
+		"""
+		Выгрузка посылок в NDJSON или CSV фрагментами по batch_size строк.
+
+		Строки читаются из серверного курсора по мере отправки ответа,
+		поэтому объём выгрузки не влияет на память процесса.
+
+		:param session_id: Идентификатор сессии (None — все сессии)
+		:param type_id: Тип посылки (опционально)
+		:param has_delivery_cost: Только с/без стоимости доставки (опционально)
+		:param company_id: Транспортная компания (опционально)
+		:param export_format: 'ndjson' или 'csv'
+		:param batch_size: Строк во фрагменте
+		:return: Асинхронный итератор фрагментов ответа
+		"""
+		fields = ParcelExportRow._fields
+		if export_format == 'csv':
+			yield encode_csv(fields, (), header=True)
+
+		exported = 0
+		async for rows in self.parcel_repo.stream_by_filters(
+			session_id=session_id,
+			type_id=type_id,
+			has_delivery_cost=has_delivery_cost,
+			company_id=company_id,
+			batch_size=batch_size,
+		):
+			exported += len(rows)
+			if export_format == 'csv':
+				yield encode_csv(fields, rows)
+			else:
+				yield encode_ndjson(fields, rows)
+		logger.info(
+			'Выгрузка посылок завершена: %d строк (%s)', exported, export_format)
+
+	async def _get_type_names(self, type_ids: set[int]) -> dict[int, str]:
+		"""
+		Возвращает названия типов посылок по ID из кеша справочников.
+
+		Если кеш не загружен или в нём нет какого-то из типов, кеш
+		сбрасывается и названия читаются из БД.
+
+		:param type_ids: ID типов, которые должны быть в результате
+		:return: Словарь {type_id: название}
+		"""
+		if self.reference_cache is not None and self.reference_cache.is_loaded:
+			type_names = self.reference_cache.get_type_names()
+			if type_ids <= type_names.keys():
+				return type_names
+			logger.warning(
+				'Типы посылок %s не найдены в кеше справочников',
+				type_ids - type_names.keys())
+			self.reference_cache.invalidate()
+
+		parcel_types = await self.parcel_repo.get_all_types()
+		return {parcel_type.id: parcel_type.name for parcel_type in parcel_types}
+
+	@staticmethod
+	def _parse_cursor(cursor: str) -> tuple[datetime, int]:
+		"""
+		Раскодирует курсор страницы в ключ (created_at, id).
+
+		:param cursor: Курсор из заголовка X-Next-Cursor
+		:raises HTTPException: 400, если курсор повреждён
+		"""
+		try:
+			created_at, parcel_id = decode_cursor(cursor)
+			return datetime.fromisoformat(created_at), int(parcel_id)
+		except (TypeError, ValueError):
+			raise HTTPException(
+				status_code=status.HTTP_400_BAD_REQUEST,
+				detail='Некорректный курсор',
 			)
-		return response
 
 	async def get_parcel(
 		self,
 		parcel_id: int,
 		session_id: str,
-	) -> ParcelDetailResponse:
+	) -> dict:
 		"""
 		Получить детальную информацию о посылке по ID и session_id.
 
@@ -137,7 +401,7 @@ class ParcelService:
 
 		:param parcel_id: ID посылки
 		:param session_id: Идентификатор сессии
-		:return: Объект ParcelDetailResponse
+		:return: Посылка в форме ParcelDetailResponse
 		"""
 		# Пытаемся найти посылку по ID и session_id
 		parcel = await self.parcel_repo.get_by_id_and_session(
@@ -148,23 +412,11 @@ class ParcelService:
 		# Если не нашли — логируем и выбрасываем исключение
 		if parcel is None:
 			logger.warning(
-				f'Посылка не найдена: id={parcel_id}, session_id={session_id}')
+				'Посылка не найдена: id=%s, session_id=%s', parcel_id, session_id)
 			raise NotFoundError(parcel_id=parcel_id)
 
-		return ParcelDetailResponse(
-			parcel_id=parcel.id,
-			name=parcel.name,
-			weight=parcel.weight,
-			type_id=parcel.type_id,
-			type_name=parcel.type.name,
-			content_value_usd=parcel.content_value_usd,
-			delivery_price=(
-				parcel.delivery_price
-				if parcel.delivery_price is not None
-				else ParcelsConstants.NOT_MEANT.value
-			),
-			created_at=parcel.created_at,
-		)
+		type_names = await self._get_type_names({parcel.type_id})
+		return parcel_view(parcel, type_names[parcel.type_id])
 
 	async def bind_company_to_parcel(
 		self,
@@ -183,15 +435,50 @@ class ParcelService:
 
 		# Пытаемся выполнить привязку.
 		# Репозиторий вернёт None, если посылка уже привязана.
-		parcel = await self.parcel_repo.bind_company_to_parcel(
+		session_id = await self.parcel_repo.bind_company_to_parcel(
 			parcel_id=parcel_id,
 			company_id=company_id,
 		)
 		# Если привязка не выполнена — значит уже была, возвращаем 409
-		if not parcel:
-			logger.warning(f'Посылка уже привязана: parcel_id={parcel_id}')
+		if session_id is None:
+			logger.warning('Посылка уже привязана: parcel_id=%s', parcel_id)
 			raise HTTPException(
 				status_code=status.HTTP_409_CONFLICT,
 				detail='Посылка уже привязана к компании',
 			)
+		self._invalidate_summaries([session_id])
 		return BindCompanyResponseSchema()
+
+	async def bind_company_to_parcels(
+		self,
+		parcel_ids: list[int],
+		company_id: int,
+	) -> list[dict]:
+		"""
+		Привязать к компании пакет посылок. Уже привязанные посылки
+		не изменяются.
+
+		:param parcel_ids: ID посылок
+		:param company_id: ID транспортной компании
+		:return: Результаты в форме BindCompanyBulkItem в порядке входного
+			списка (повторяющиеся ID схлопываются)
+		:raises CompanyNotFoundError: Если компании нет
+		"""
+		await self._ensure_company_exists(company_id)
+		result = await self.parcel_repo.bind_company_to_parcels(
+			parcel_ids=parcel_ids,
+			company_id=company_id,
+			chunk_size=BulkConstants.BIND_CHUNK_SIZE.value,
+		)
+		if result.session_ids:
+			self._invalidate_summaries(result.session_ids)
+
+		statuses = {
+			**dict.fromkeys(result.bound, 'bound'),
+			**dict.fromkeys(result.already_bound, 'already_bound'),
+			**dict.fromkeys(result.missing, 'missing'),
+		}
+		return [
+			{'parcel_id': parcel_id, 'status': statuses[parcel_id]}
+			for parcel_id in dict.fromkeys(parcel_ids)
+		]
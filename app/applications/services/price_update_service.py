@@ -1,9 +1,15 @@
 import datetime
 import logging
 
+import numpy as np
+
 from app.adapters.database.repositories.parcel_repo import ParcelRepo
 from app.applications.dataclasses.dataclasses import Parcel
+from app.applications.interfaces.tariff_interfaces import ITariffRepositories
+from app.applications.services.tariff_engine import TariffEngine
+from app.utils.metrics import REPRICED_PARCELS
 from app.utils.rate import RateService
+from app.utils.summary_cache import ParcelSummaryCache
 
 logger = logging.getLogger(__name__)
 
@@ -12,24 +18,47 @@ class PriceUpdateService:
     Сервис, который рассчитывает и обновляет стоимость доставки
     для всех посылок, у которых она ещё не задана.
 
-    Формула:
+    Формула по умолчанию:
         (вес * 0.5 + стоимость содержимого * 0.01) * текущий курс USD→RUB
 
+    Индивидуальные тарифы типов посылок и компаний применяются через
+    TariffEngine, который рассчитывает порцию посылок одним векторным вызовом.
+
+    Поддерживаются два движка: порционный пересчёт в приложении
+    (update_in_chunks) и set-based UPDATE на стороне БД (update_in_db).
+
     Курс валюты берётся из внешнего API ЦБ РФ (с кешированием в Redis).
     """
 
-	def __init__(self, parcel_repo: ParcelRepo, rate_service: RateService):
+	def __init__(
+		self,
+		parcel_repo: ParcelRepo,
+		rate_service: RateService,
+		tariff_repo: ITariffRepositories | None = None,
+		summary_cache: ParcelSummaryCache | None = None,
+	):
 		"""
         :param parcel_repo: Репозиторий для работы с посылками
         :param rate_service: Сервис получения актуального курса валют
+        :param tariff_repo: Репозиторий тарифов (без него действует
+            тариф по умолчанию)
+        :param summary_cache: Кеш сводок сессий, сбрасываемый после
+            фиксации каждой порции (опционально)
         """
 		self._parcel_repo = parcel_repo
 		self._rate_service = rate_service
+		self._tariff_repo = tariff_repo
+		self._summary_cache = summary_cache
 
-	async def update_all(self) -> None:
+	async def update_all(self) -> int:
 		"""
         Запускает массовое обновление стоимости доставки
         для всех посылок без установленной цены.
+
+        Все посылки загружаются в память и фиксируются одной транзакцией,
+        поэтому для больших объёмов следует использовать update_in_chunks.
+
+        :return: Количество обновлённых посылок
         """
 		logger.info(
 			'Запуск обновления стоимости доставки для необработанных посылок')
@@ -42,14 +71,263 @@ class PriceUpdateService:
 		parcels: list[Parcel] = await self._parcel_repo.get_unpriced_parcels()
 		logger.info(f'Найдено посылок без цены доставки: {len(parcels)}')
 
+		tariff_engine = await self._load_tariff_engine()
+		prices = tariff_engine.price(
+			weights=np.array([parcel.weight for parcel in parcels]),
+			values=np.array([parcel.content_value_usd for parcel in parcels]),
+			type_ids=np.array([parcel.type_id for parcel in parcels]),
+			company_ids=np.array(
+				[parcel.company_id or 0 for parcel in parcels]),
+			rate=rate,
+		)
+
+		# Проставляем стоимость и обновляем временную метку
+		now = datetime.datetime.now()
+		for parcel, price in zip(parcels, prices.tolist()):
+			parcel.delivery_price = price
+			parcel.updated_at = now
+		updated_count = len(parcels)
+		await self._parcel_repo.add_company_prices(
+			(parcel.company_id, parcel.delivery_price) for parcel in parcels)
+		await self._parcel_repo.remove_from_pricing_outbox(
+			[parcel.id for parcel in parcels])
+		REPRICED_PARCELS.labels('orm').inc(updated_count)
+
+		logger.info(f'Обновление завершено. Обновлено посылок: {updated_count}')
+		return updated_count
+
+	async def update_in_chunks(
+		self,
+		chunk_size: int,
+		id_from: int | None = None,
+		id_to: int | None = None,
+		skip_locked: bool = False,
+	) -> int:
+		"""
+        Потоковое обновление стоимости доставки порциями фиксированного
+        размера.
+
+        Посылки выбираются из очереди расчёта keyset-пагинацией по id
+        и удаляются из неё в транзакции порции; каждая порция
+        фиксируется отдельной транзакцией. Потребление памяти не зависит
+        от размера бэклога, а при сбое теряется не более одной порции.
+
+        Диапазон ID и skip_locked используются подзадачами параллельного
+        пересчёта: каждая порция захватывается FOR UPDATE SKIP LOCKED
+        и освобождается коммитом.
+
+        :param chunk_size: Количество посылок в одной порции
+        :param id_from: Нижняя граница ID включительно (опционально)
+        :param id_to: Верхняя граница ID включительно (опционально)
+        :param skip_locked: Пропускать строки, захваченные другими
+            обработчиками
+        :return: Количество обновлённых посылок
+        """
+		logger.info(
+			f'Запуск порционного обновления стоимости доставки '
+			f'(размер порции: {chunk_size}, '
+			f'диапазон ID: {id_from or "начало"}–{id_to or "конец"})')
+
+		rate = await self._rate_service.get_usd_rub_rate()
+		logger.info(f'Текущий курс USD/RUB: {rate}')
+		tariff_engine = await self._load_tariff_engine()
+
+		last_id = id_from - 1 if id_from is not None else 0
 		updated_count = 0
 
-		# Рассчитываем стоимость и обновляем временную метку
-		for parcel in parcels:
-			parcel.delivery_price = (
-				# формула расчета стоимости
-				(parcel.weight * 0.5 + parcel.content_value_usd * 0.01) * rate)
-			parcel.updated_at = datetime.datetime.now()
-			updated_count += 1
+		while True:
+			rows = await self._parcel_repo.get_unpriced_pricing_rows(
+				after_id=last_id,
+				limit=chunk_size,
+				id_to=id_to,
+				skip_locked=skip_locked,
+			)
+			if not rows:
+				break
+
+			prices = self._price_rows(rows, rate, tariff_engine)
+			chunk_updated = await self._parcel_repo.set_delivery_prices(prices)
+			last_id = rows[-1][0]
+			await self._parcel_repo.remove_from_pricing_outbox(
+				[row[0] for row in rows])
+			# Фиксируем порцию отдельной транзакцией
+			await self._commit_chunk()
+			updated_count += chunk_updated
+			REPRICED_PARCELS.labels('chunked').inc(chunk_updated)
+			logger.info(
+				f'Порция обработана: {len(rows)} посылок, '
+				f'последний id={last_id}')
+
+			if len(rows) < chunk_size:
+				break
 
 		logger.info(f'Обновление завершено. Обновлено посылок: {updated_count}')
+		return updated_count
+
+	async def update_in_db(
+		self,
+		batch_size: int | None = None,
+		chunk_size: int = 1000,
+	) -> int:
+		"""
+        Обновление стоимости доставки на стороне БД без загрузки посылок
+        в приложение (set-based UPDATE).
+
+        Без batch_size выполняется один UPDATE на весь бэклог. С batch_size
+        бэклог обрабатывается диапазонами ID, каждый диапазон фиксируется
+        отдельной транзакцией.
+
+        Формула в SQL поддерживает только тариф по умолчанию: если заданы
+        индивидуальные тарифы, выполняется порционный пересчёт.
+
+        :param batch_size: Ширина диапазона ID в одном UPDATE (опционально)
+        :param chunk_size: Размер порции для порционного пересчёта
+        :return: Количество обновлённых посылок
+        """
+		tariff_engine = await self._load_tariff_engine()
+		if not tariff_engine.is_default:
+			logger.warning(
+				'Заданы индивидуальные тарифы — расчёт в БД недоступен, '
+				'используется порционный пересчёт')
+			return await self.update_in_chunks(chunk_size=chunk_size)
+
+		logger.info(
+			f'Запуск обновления стоимости доставки в БД '
+			f'(размер пакета: {batch_size or "без ограничения"})')
+
+		rate = await self._rate_service.get_usd_rub_rate()
+		logger.info(f'Текущий курс USD/RUB: {rate}')
+
+		if batch_size is None:
+			updated_count = await self._parcel_repo.reprice_unpriced(rate=rate)
+			await self._commit_chunk()
+			REPRICED_PARCELS.labels('sql').inc(updated_count)
+			logger.info(
+				f'Обновление завершено. Обновлено посылок: {updated_count}')
+			return updated_count
+
+		min_id, max_id = await self._parcel_repo.get_unpriced_id_bounds()
+		if min_id is None:
+			logger.info('Посылок без цены доставки не найдено')
+			return 0
+
+		updated_count = 0
+		for id_from in range(min_id, max_id + 1, batch_size):
+			batch_updated = await self._parcel_repo.reprice_unpriced(
+				rate=rate,
+				id_from=id_from,
+				id_to=id_from + batch_size - 1,
+			)
+			await self._commit_chunk()
+			updated_count += batch_updated
+			REPRICED_PARCELS.labels('sql').inc(batch_updated)
+
+		logger.info(f'Обновление завершено. Обновлено посылок: {updated_count}')
+		return updated_count
+
+	async def requeue_unpriced(self, chunk_size: int) -> int:
+		"""
+        Страховочная сверка таблицы посылок с outbox: ставит в очередь
+        расчёта посылки без стоимости доставки, которых в ней нет
+        (созданные в обход ParcelService или удалённые из outbox после
+        сбоя расчёта).
+
+        Таблица просматривается keyset-пагинацией по id, каждая порция
+        фиксируется отдельной транзакцией.
+
+        :param chunk_size: Количество посылок в одной порции
+        :return: Количество посылок, заново поставленных в очередь
+        """
+		last_id = 0
+		requeued_count = 0
+
+		while True:
+			parcel_ids = await self._parcel_repo.get_unpriced_ids(
+				after_id=last_id,
+				limit=chunk_size,
+			)
+			if not parcel_ids:
+				break
+			requeued_count += await self._parcel_repo.enqueue_for_pricing(
+				parcel_ids)
+			await self._parcel_repo.commit_chunk()
+			last_id = parcel_ids[-1]
+			if len(parcel_ids) < chunk_size:
+				break
+
+		if requeued_count:
+			logger.warning(
+				f'Найдены посылки без цены вне очереди расчёта: '
+				f'{requeued_count}, поставлены в очередь')
+		return requeued_count
+
+	async def price_parcels(self, parcel_ids: list[int]) -> int:
+		"""
+        Рассчитывает стоимость доставки для конкретных посылок из outbox
+        и удаляет их из outbox одной транзакцией.
+
+        Посылки, которым цена уже назначена (например, периодической
+        задачей), только удаляются из outbox.
+
+        :param parcel_ids: ID посылок
+        :return: Количество обновлённых посылок
+        """
+		if not parcel_ids:
+			return 0
+		updated_count = 0
+		rows = await self._parcel_repo.get_pricing_rows_by_ids(parcel_ids)
+		if rows:
+			rate = await self._rate_service.get_usd_rub_rate()
+			tariff_engine = await self._load_tariff_engine()
+			prices = self._price_rows(rows, rate, tariff_engine)
+			updated_count = await self._parcel_repo.set_delivery_prices(prices)
+		await self._parcel_repo.remove_from_pricing_outbox(parcel_ids)
+		await self._commit_chunk()
+		REPRICED_PARCELS.labels('stream').inc(updated_count)
+		return updated_count
+
+	async def _commit_chunk(self) -> None:
+		"""
+        Фиксирует порцию и сбрасывает кеш сводок сессий, посылки которых
+        получили цену в этой порции.
+        """
+		await self._parcel_repo.commit_chunk()
+		if self._summary_cache is None:
+			return
+		session_ids = self._parcel_repo.pop_repriced_sessions()
+		if session_ids:
+			await self._summary_cache.invalidate(session_ids)
+
+	async def _load_tariff_engine(self) -> TariffEngine:
+		"""
+        Загружает тарифы из БД и строит по ним TariffEngine.
+        """
+		if self._tariff_repo is None:
+			return TariffEngine()
+		tariffs = await self._tariff_repo.get_all_tariffs()
+		return TariffEngine(tariffs)
+
+	@staticmethod
+	def _price_rows(
+		rows: list[tuple[int, float, float, int, int | None]],
+		rate: float,
+		tariff_engine: TariffEngine,
+	) -> dict[int, float]:
+		"""
+        Раскладывает порцию строк в колоночные массивы и рассчитывает
+        стоимость доставки одним векторным вызовом.
+
+        :return: Словарь {ID посылки: стоимость доставки}
+        """
+		ids, weights, values, type_ids, company_ids = zip(*rows)
+		prices = tariff_engine.price(
+			weights=np.array(weights, dtype=np.float64),
+			values=np.array(values, dtype=np.float64),
+			type_ids=np.array(type_ids, dtype=np.int64),
+			company_ids=np.array(
+				[company_id or 0 for company_id in company_ids],
+				dtype=np.int64,
+			),
+			rate=rate,
+		)
+		return dict(zip(ids, prices.tolist()))
@@ -0,0 +1,147 @@
+import numpy as np
+
+from app.applications.dataclasses.dataclasses import Tariff
+from app.utils.constants import PricingConstants
+
+# Ключ «любой тип» / «любая компания» в таблице поиска тарифов
+ANY = 0
+
+
+class TariffEngine:
+	"""
+	Векторизованный расчёт стоимости доставки по тарифам.
+
+	Тарифы раскладываются в плотные массивы NumPy, после чего пакет посылок
+	рассчитывается одним вызовом price() над колоночными массивами веса,
+	стоимости содержимого, type_id и company_id.
+
+	Приоритет выбора тарифа для посылки:
+	(компания, тип) → (компания, любой тип) → (любая компания, тип)
+	→ общий тариф из БД → тариф по умолчанию из PricingConstants.
+	"""
+
+	def __init__(self, tariffs: list[Tariff] | None = None):
+		"""
+		:param tariffs: Тарифы из БД (без них используется только тариф
+			по умолчанию)
+		"""
+		tariffs = list(tariffs or [])
+		default = Tariff(
+			weight_coefficient=PricingConstants.WEIGHT_COEFFICIENT.value,
+			value_coefficient=PricingConstants.VALUE_COEFFICIENT.value,
+		)
+		# Индекс 0 всегда занимает тариф по умолчанию
+		all_tariffs = [default, *tariffs]
+		max_brackets = 1 + max(
+			(len(tariff.weight_brackets) for tariff in all_tariffs), default=0)
+
+		count = len(all_tariffs)
+		self._value_coefficients = np.empty(count, dtype=np.float64)
+		self._min_charges = np.empty(count, dtype=np.float64)
+		# Нижние границы весовых диапазонов, недостающие заполняются +inf
+		self._thresholds = np.full((count, max_brackets), np.inf)
+		self._weight_coefficients = np.zeros((count, max_brackets))
+		self._lookup: dict[tuple[int, int], int] = {}
+
+		for index, tariff in enumerate(all_tariffs):
+			self._value_coefficients[index] = tariff.value_coefficient
+			self._min_charges[index] = tariff.min_charge_usd
+			brackets = sorted(
+				tariff.weight_brackets, key=lambda bracket: bracket.weight_from)
+			self._thresholds[index, 0] = 0.0
+			self._weight_coefficients[index, 0] = tariff.weight_coefficient
+			for position, bracket in enumerate(brackets, start=1):
+				self._thresholds[index, position] = bracket.weight_from
+				self._weight_coefficients[index, position] = (
+					bracket.weight_coefficient)
+			if index:
+				key = (tariff.company_id or ANY, tariff.parcel_type_id or ANY)
+				self._lookup[key] = index
+
+	@property
+	def is_default(self) -> bool:
+		"""
+		True, если индивидуальные тарифы не заданы и действует только
+		тариф по умолчанию.
+		"""
+		return not self._lookup
+
+	def resolve(
+		self,
+		type_ids: np.ndarray,
+		company_ids: np.ndarray,
+	) -> np.ndarray:
+		"""
+		Возвращает индекс тарифа для каждой посылки.
+
+		Поиск по словарю выполняется только для уникальных пар
+		(company_id, type_id), результат разворачивается на весь пакет.
+
+		:param type_ids: Массив ID типов посылок
+		:param company_ids: Массив ID компаний (0 — компания не привязана)
+		:return: Массив индексов тарифов
+		"""
+		if self.is_default:
+			return np.zeros(len(type_ids), dtype=np.intp)
+
+		# Пара (company_id, type_id) упаковывается в один int64-ключ,
+		# чтобы np.unique работал по одномерному массиву
+		keys = (company_ids.astype(np.int64) << 32) | type_ids.astype(np.int64)
+		unique_keys, inverse = np.unique(keys, return_inverse=True)
+		resolved = np.fromiter(
+			(
+				self._resolve_one(int(key) >> 32, int(key) & 0xFFFFFFFF)
+				for key in unique_keys
+			),
+			dtype=np.intp,
+			count=len(unique_keys),
+		)
+		return resolved[inverse.reshape(-1)]
+
+	def price(
+		self,
+		weights: np.ndarray,
+		values: np.ndarray,
+		type_ids: np.ndarray,
+		company_ids: np.ndarray,
+		rate: float,
+	) -> np.ndarray:
+		"""
+		Рассчитывает стоимость доставки для пакета посылок.
+
+		:param weights: Массив весов в кг
+		:param values: Массив стоимостей содержимого в USD
+		:param type_ids: Массив ID типов посылок
+		:param company_ids: Массив ID компаний (0 — компания не привязана)
+		:param rate: Курс USD→RUB
+		:return: Массив стоимостей доставки в рублях
+		"""
+		weights = np.asarray(weights, dtype=np.float64)
+		values = np.asarray(values, dtype=np.float64)
+		indexes = self.resolve(
+			np.asarray(type_ids, dtype=np.int64),
+			np.asarray(company_ids, dtype=np.int64),
+		)
+
+		# Номер весового диапазона: последний порог, не превышающий вес
+		brackets = (self._thresholds[indexes] <= weights[:, None]).sum(axis=1)
+		weight_coefficients = self._weight_coefficients[indexes, brackets - 1]
+
+		base = weights * weight_coefficients + values * (
+			self._value_coefficients[indexes])
+		return np.maximum(base, self._min_charges[indexes]) * rate
+
+	def _resolve_one(self, company_id: int, type_id: int) -> int:
+		"""
+		Подбирает тариф для пары (company_id, type_id) согласно приоритету.
+		"""
+		for key in (
+			(company_id, type_id),
+			(company_id, ANY),
+			(ANY, type_id),
+			(ANY, ANY),
+		):
+			index = self._lookup.get(key)
+			if index is not None:
+				return index
+		return 0
@@ -5,12 +5,23 @@ from datetime import datetime, timezone
 
 from fastapi.middleware.cors import CORSMiddleware
 
-from fastapi import FastAPI, status
+from fastapi import FastAPI, Request, Response, status
+from fastapi.responses import ORJSONResponse
 
 from app.adapters.http_api.controllers.parcels_router import parcel_router
 from app.adapters.http_api.controllers.tasks_router import tasks_router
 from app.adapters.http_api.controllers.company_router import company_router
+from app.adapters.database.engine import dispose_engines, get_pool_stats
+from app.applications.services.errors.errors import NotFoundError
+from app.adapters.http_api.settings import (
+	create_redis_connection,
+	get_redis,
+	preload_reference_cache,
+)
 from app.logging_config import setup_logging
+from app.utils.metrics import MetricsMiddleware, render_metrics
+from app.utils.profiling import ProfilingMiddleware
+from app.utils.reference_cache import reference_cache
 
 # Настройка логирования
 setup_logging()
@@ -20,8 +31,17 @@ logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+	try:
+		await preload_reference_cache()
+	except Exception as e:
+		# Кеш будет загружен при первом запросе
+		logger.warning(f'Не удалось загрузить справочники при старте: {e}')
+	reference_cache.start(create_redis_connection())
 	logger.info('Сервис доставки запущен')
 	yield
+	await reference_cache.stop()
+	await get_redis().aclose()
+	await dispose_engines()
 	logger.info('Сервис доставки остановлен')
 
 
@@ -37,13 +57,28 @@ app.include_router(parcel_router, prefix='/parcels', tags=['parcels'])
 app.include_router(tasks_router, prefix='/tasks', tags=['tasks'])
 app.include_router(company_router, prefix='/company', tags=['company'])
 
+
+@app.exception_handler(NotFoundError)
+async def not_found_handler(request: Request, exc: NotFoundError):
+	"""
+	Отвечает 404 на ошибки поиска сущностей в сервисах.
+	"""
+	return ORJSONResponse(
+		status_code=status.HTTP_404_NOT_FOUND,
+		content={'detail': exc.message},
+	)
+
 app.add_middleware(
 	CORSMiddleware,
 	allow_origins=['*'],
 	allow_credentials=True,
 	allow_methods=['*'],
 	allow_headers=['*'],
+	expose_headers=['X-Next-Cursor'],
 )
+app.add_middleware(ProfilingMiddleware)
+# Добавляется последним, чтобы учитывать полное время обработки запроса
+app.add_middleware(MetricsMiddleware)
 
 
 @app.get(
@@ -64,3 +99,37 @@ async def root():
 		'server_time_utc': datetime.now(timezone.utc).isoformat(),
 		'environment': 'production'
 	}
+
+
+@app.get(
+	'/db/pool',
+	summary='Статистика пулов соединений с БД',
+	description='Текущее состояние пулов соединений этого процесса: занятые '
+	            'и свободные соединения, overflow, число и длительность '
+	            'ожиданий свободного соединения.',
+	status_code=200,
+	tags=['service']
+)
+async def db_pool_stats():
+	"""
+	Возвращает статистику пулов соединений процесса по имени движка.
+	"""
+	return get_pool_stats()
+
+
+@app.get(
+	'/metrics',
+	summary='Метрики Prometheus',
+	description='Метрики процесса в текстовом формате Prometheus: '
+	            'длительность запросов по маршрутам, SQL-запросы на запрос, '
+	            'пулы соединений, кеши курсов валют.',
+	status_code=200,
+	tags=['service']
+)
+async def metrics():
+	"""
+	Возвращает метрики процесса в текстовом формате Prometheus.
+	"""
+	body, content_type = render_metrics()
+	# content_type уже содержит charset, Response не должен его дописывать
+	return Response(content=body, headers={'Content-Type': content_type})
@@ -1,7 +1,136 @@
+import atexit
 import logging
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
 
-def setup_logging():
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s"
-    )
+from pythonjsonlogger import jsonlogger
+
+from app.utils.metrics import LOG_RECORDS_DROPPED
+from app.utils.settings import LoggingSettings
+
+TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+JSON_FORMAT = "%(asctime)s %(levelname)s %(name)s %(message)s"
+
+_listener: QueueListener | None = None
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Неблокирующий QueueHandler: кладёт запись в ограниченную очередь
+    без форматирования, а при переполнении очереди отбрасывает её
+    и увеличивает счётчик log_records_dropped_total.
+
+    Форматирование (подстановка аргументов, JSON, traceback) и запись
+    в поток вывода выполняются в потоке QueueListener, а не в цикле
+    событий.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Очередь не покидает процесс: запись передаётся как есть,
+        # без стандартного форматирования в вызывающем потоке
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+class _BlockingSentinelListener(QueueListener):
+    """
+    QueueListener, который при остановке ждёт места в заполненной очереди
+    для служебной записи, а не падает с queue.Full.
+    """
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает долю rate записей уровня INFO и ниже от логгеров с заданным
+    префиксом имени. Записи WARNING и выше пропускаются всегда.
+    """
+
+    def __init__(self, rates: dict[str, float]):
+        """
+        :param rates: Доля пропускаемых записей по префиксу имени логгера
+        """
+        super().__init__()
+        # Длинные префиксы проверяются первыми
+        self._rates = sorted(
+            rates.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        for prefix, rate in self._rates:
+            if record.name == prefix or record.name.startswith(prefix + '.'):
+                return random.random() < rate
+        return True
+
+
+def parse_sampling(value: str) -> dict[str, float]:
+    """
+    Разбирает настройку LOG_SAMPLING вида 'logger.a=0.1,logger.b=0.01'.
+
+    :param value: Значение настройки
+    :return: Доля пропускаемых записей по имени логгера
+    """
+    rates = {}
+    for item in value.split(','):
+        if item.strip():
+            name, rate = item.split('=')
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+def setup_logging(settings: LoggingSettings | None = None) -> None:
+    """
+    Настраивает корневой логгер: записи через ограниченную очередь
+    передаются в фоновый поток, который форматирует их (JSON или текст)
+    и пишет в stderr. Повторный вызов ничего не делает.
+
+    :param settings: Настройки логирования (по умолчанию из окружения)
+    """
+    global _listener
+    if _listener is not None:
+        return
+    settings = settings or LoggingSettings()
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    if settings.format == 'json':
+        stream_handler.setFormatter(jsonlogger.JsonFormatter(JSON_FORMAT))
+    else:
+        stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    queue_handler = DroppingQueueHandler(
+        queue.Queue(maxsize=settings.queue_size))
+    rates = parse_sampling(settings.sampling)
+    if rates:
+        queue_handler.addFilter(SamplingFilter(rates))
+
+    root = logging.getLogger()
+    root.setLevel(settings.level)
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+
+    _listener = _BlockingSentinelListener(
+        queue_handler.queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """
+    Дописывает записи из очереди и останавливает фоновый поток.
+    """
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
@@ -1,2 +1,8 @@
 from .celery_app import celery_app
-from .price_tasks import update_delivery_prices
\ No newline at end of file
+from .price_tasks import (
+    price_id_range,
+    requeue_unpriced_parcels,
+    summarize_repricing,
+    update_delivery_prices,
+)
+from .rate_tasks import prefetch_rates
\ No newline at end of file
@@ -1,7 +1,29 @@
+import inspect
 import logging
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from celery import Celery
-from celery.signals import worker_ready, task_prerun, task_postrun, task_failure
+from celery.signals import (
+	worker_ready,
+	worker_process_init,
+	worker_shutdown,
+	task_prerun,
+	task_postrun,
+	task_failure,
+)
+from celery_aio_pool import AsyncIOPool
+
+from app.tasks.resources import init_worker_resources, shutdown_worker_resources
+from app.utils.metrics import CELERY_TASK_DURATION, start_metrics_server
+from app.utils.profiling import Profiler, StackSampler
+from app.utils.settings import (
+	MetricsSettings,
+	PricingSettings,
+	ProfilingSettings,
+	RateSettings,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -12,7 +34,7 @@ celery_app = Celery(
 	'delivery_service',
 	broker=broker,
 	backend=backend,
-	include=['app.tasks.price_tasks'],
+	include=['app.tasks.price_tasks', 'app.tasks.rate_tasks'],
 )
 
 celery_app.conf.worker_pool = os.getenv(
@@ -21,27 +43,76 @@ celery_app.conf.worker_pool = os.getenv(
 )
 
 celery_app.conf.beat_schedule = {
-	'update_delivery_prices_every_5_minutes': {
+	# Новые посылки рассчитывает потребитель потока (pricing_consumer),
+	# полный пересчёт остаётся редкой страховкой
+	'update_delivery_prices_safety_scan': {
 		'task': 'app.tasks.price_tasks.update_delivery_prices',
-		'schedule': 300.0,
+		'schedule': float(PricingSettings().scan_interval_seconds),
+	},
+	# Посылки без цены, которых нет в outbox; просматривает всю таблицу
+	# посылок, поэтому запускается реже страховочного пересчёта
+	'requeue_unpriced_parcels': {
+		'task': 'app.tasks.price_tasks.requeue_unpriced_parcels',
+		'schedule': float(PricingSettings().requeue_interval_seconds),
+	},
+	'prefetch_rates': {
+		'task': 'app.tasks.rate_tasks.prefetch_rates',
+		'schedule': float(RateSettings().prefetch_interval_seconds),
 	},
 }
 celery_app.conf.timezone = 'UTC'
 celery_app.conf.enable_utc = True
 
+# Время запуска выполняемых задач по task_id, для метрики длительности
+_task_started: dict[str, float] = {}
+
+profiling_settings = ProfilingSettings()
+task_profiler = Profiler(profiling_settings, profiling_settings.task_sample_rate)
+# Профили выполняемых задач по task_id
+_task_profiles: dict[str, StackSampler] = {}
+# Остановка сэмплера и запись профиля выполняются в отдельном потоке,
+# чтобы не блокировать цикл событий воркера
+_profile_writer = ThreadPoolExecutor(
+	max_workers=1, thread_name_prefix='task-profile-writer')
+
+
+@worker_process_init.connect
+def on_worker_process_init(**kwargs):
+	# AsyncIOPool отправляет сигнал до запуска своего цикла событий:
+	# ресурсы создаются здесь, а соединения открываются уже на цикле
+	init_worker_resources()
+	start_metrics_server(MetricsSettings().exporter_port)
+
 
 @worker_ready.connect
 def on_worker_ready(sender, **kwargs):
 	logger.info('Celery worker is ready')
 
 
+@worker_shutdown.connect
+def on_worker_shutdown(sender, **kwargs):
+	pool = AsyncIOPool.singleton
+	shutdown_worker_resources(pool.loop if pool is not None else None)
+	# Дописываем профили завершённых задач
+	_profile_writer.shutdown(wait=True)
+
+
 @task_prerun.connect
 def on_task_start(task_id, task, *args, **kwargs):
+	_task_started[task_id] = time.perf_counter()
+	_start_task_profile(task_id, task)
 	logger.info(f'Задача запущена: {task.name} [task_id={task_id}]')
 
 
 @task_postrun.connect
-def on_task_finish(task_id, task, retval, **kwargs):
+def on_task_finish(task_id, task, retval, state=None, **kwargs):
+	sampler = _task_profiles.pop(task_id, None)
+	if sampler is not None:
+		_profile_writer.submit(task_profiler.finish, sampler, task.name)
+	started = _task_started.pop(task_id, None)
+	if started is not None:
+		CELERY_TASK_DURATION.labels(task.name, state or 'UNKNOWN').observe(
+			time.perf_counter() - started)
 	logger.info(f'Задача завершена: {task.name} [task_id={task_id}]')
 
 
@@ -49,3 +120,19 @@ def on_task_finish(task_id, task, retval, **kwargs):
 def on_task_failure(task_id, exception, traceback, task, **kwargs):
 	logger.error(
 		f'Ошибка в задаче {task.name} [task_id={task_id}]: {exception}')
+
+
+def _start_task_profile(task_id: str, task) -> None:
+	"""
+	Запускает профилирование задачи, если она попала в выборку.
+
+	Сигналы AsyncIOPool отправляются из служебного потока, а async-задачи
+	выполняются на цикле событий пула, поэтому профилируется поток цикла.
+	Синхронные задачи не профилируются.
+	"""
+	pool = AsyncIOPool.singleton
+	if pool is None or not inspect.iscoroutinefunction(task.run):
+		return
+	sampler = task_profiler.start(thread_id=pool.loop_runner.ident)
+	if sampler is not None:
+		_task_profiles[task_id] = sampler
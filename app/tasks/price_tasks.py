@@ -1,47 +1,197 @@
-import asyncio
 import logging
 
+from celery import chord
+
 from app.tasks.celery_app import celery_app
+from app.adapters.database.engine import get_pool_stats
 from app.adapters.database.repositories.parcel_repo import ParcelRepo
+from app.adapters.database.repositories.tariff_repo import TariffRepo
 from app.applications.services.price_update_service import PriceUpdateService
-from app.tasks.settings import get_celery_redis, get_celery_db_session
-from app.utils.rate import RateService
+from app.tasks.resources import get_celery_db_session, get_worker_resources
+from app.tasks.settings import pricing_settings
+from app.utils.metrics import PRICING_BACKLOG, track_task_queries
 
 logger = logging.getLogger(__name__)
 
 
 @celery_app.task(name='app.tasks.price_tasks.update_delivery_prices')
-def update_delivery_prices():
+async def update_delivery_prices() -> int:
     """
     Точка входа для задачи Celery.
-    Запускает асинхронную функцию обновления стоимости доставки.
+    Выполняется на долгоживущем цикле событий AsyncIOPool и использует
+    ресурсы процесса воркера (пул соединений с БД, Redis, HTTP-клиент).
+
+    В режиме PRICING_ENGINE=fanout задача только делит бэклог на диапазоны
+    ID и запускает их пересчёт параллельно (см. price_id_range).
+
+    :return: Количество обновлённых посылок (0 при ошибке и в режиме
+        fanout — итог считает summarize_repricing)
     """
     logger.info('Running update_delivery_prices task...')
     try:
-        asyncio.run(_update_delivery_prices_async())
-        logger.info('Celery: задача update_delivery_prices успешно завершена')
+        with track_task_queries('update_delivery_prices'):
+            updated_count = await _update_delivery_prices_async()
+        logger.info(
+            f'Celery: задача update_delivery_prices успешно завершена, '
+            f'обновлено посылок: {updated_count}')
+        return updated_count
     except Exception as e:
         logger.exception(f'Ошибка в задаче update_delivery_prices: {e}')
+        return 0
 
 
-async def _update_delivery_prices_async():
+async def _update_delivery_prices_async() -> int:
     """
     Асинхронное обновление стоимости доставки для посылок без цены.
     Включает:
-    - подключение к Redis
-    - получение курса USD/RUB
-    - перебор всех сессий базы Celery и обновление цен
-    """
-    redis = get_celery_redis()
-    rate_svc = RateService(
-        redis,
-        cbr_url='https://www.cbr-xml-daily.ru/daily_json.js',
-        ttl_seconds=300,
-    )
-
-    async for session in get_celery_db_session():
-        repo = ParcelRepo(session=session)
-        updater = PriceUpdateService(parcel_repo=repo, rate_service=rate_svc)
-        await updater.update_all()
-
-    await redis.close()
+    - получение курса USD/RUB через сервис курсов воркера
+    - обновление цен выбранным движком (PRICING_ENGINE)
+
+    :return: Количество обновлённых посылок
+    """
+    rate_svc = get_worker_resources().rate_service
+
+    updated_count = 0
+    try:
+        async for session in get_celery_db_session():
+            repo = ParcelRepo(session=session)
+            updater = PriceUpdateService(
+                parcel_repo=repo,
+                rate_service=rate_svc,
+                tariff_repo=TariffRepo(session=session),
+                summary_cache=get_worker_resources().summary_cache,
+            )
+            PRICING_BACKLOG.set(await repo.count_pricing_backlog())
+            if pricing_settings.engine == 'fanout':
+                await _dispatch_fanout(repo)
+            elif pricing_settings.engine == 'sql':
+                updated_count = await updater.update_in_db(
+                    batch_size=pricing_settings.sql_batch_size,
+                    chunk_size=pricing_settings.chunk_size,
+                )
+            else:
+                updated_count = await updater.update_in_chunks(
+                    chunk_size=pricing_settings.chunk_size,
+                )
+    finally:
+        logger.info(f'Пул соединений после пересчёта: {get_pool_stats()}')
+    return updated_count
+
+
+@celery_app.task(name='app.tasks.price_tasks.requeue_unpriced_parcels')
+async def requeue_unpriced_parcels() -> int:
+    """
+    Редкая страховочная сверка: ставит в очередь расчёта посылки без цены,
+    которых нет в parcel_pricing_outbox, и сразу рассчитывает очередь.
+
+    :return: Количество посылок, заново поставленных в очередь
+        (0 при ошибке)
+    """
+    logger.info('Running requeue_unpriced_parcels task...')
+    try:
+        with track_task_queries('requeue_unpriced_parcels'):
+            requeued_count = 0
+            async for session in get_celery_db_session():
+                updater = PriceUpdateService(
+                    parcel_repo=ParcelRepo(session=session),
+                    rate_service=get_worker_resources().rate_service,
+                )
+                requeued_count = await updater.requeue_unpriced(
+                    chunk_size=pricing_settings.chunk_size,
+                )
+            if requeued_count:
+                await _update_delivery_prices_async()
+        return requeued_count
+    except Exception as e:
+        logger.exception(f'Ошибка в задаче requeue_unpriced_parcels: {e}')
+        return 0
+
+
+def partition_id_range(
+    min_id: int,
+    max_id: int,
+    partition_size: int,
+) -> list[tuple[int, int]]:
+    """
+    Делит диапазон ID на непересекающиеся диапазоны фиксированной ширины.
+
+    :param min_id: Минимальный ID
+    :param max_id: Максимальный ID
+    :param partition_size: Ширина одного диапазона
+    :return: Список диапазонов (id_from, id_to) включительно
+    """
+    return [
+        (id_from, min(id_from + partition_size - 1, max_id))
+        for id_from in range(min_id, max_id + 1, partition_size)
+    ]
+
+
+async def _dispatch_fanout(repo: ParcelRepo) -> int:
+    """
+    Запускает параллельный пересчёт: диапазоны ID бэклога отправляются
+    группой подзадач price_id_range, итог собирает summarize_repricing.
+
+    :param repo: Репозиторий посылок
+    :return: Количество запущенных подзадач
+    """
+    min_id, max_id = await repo.get_unpriced_id_bounds()
+    if min_id is None:
+        logger.info('Посылок без цены доставки не найдено')
+        return 0
+
+    partitions = partition_id_range(
+        min_id, max_id, pricing_settings.fanout_partition_size)
+    chord(
+        price_id_range.s(id_from, id_to) for id_from, id_to in partitions
+    )(summarize_repricing.s())
+    logger.info(
+        f'Запущен параллельный пересчёт: {len(partitions)} подзадач '
+        f'для ID {min_id}–{max_id}')
+    return len(partitions)
+
+
+@celery_app.task(name='app.tasks.price_tasks.price_id_range')
+async def price_id_range(id_from: int, id_to: int) -> int:
+    """
+    Подзадача параллельного пересчёта: рассчитывает стоимость доставки
+    посылок из диапазона ID.
+
+    Порции захватываются SELECT ... FOR UPDATE SKIP LOCKED, поэтому
+    пересекающиеся запуски (повторная доставка задачи, потребитель потока)
+    не рассчитывают одни и те же посылки.
+
+    :param id_from: Нижняя граница ID включительно
+    :param id_to: Верхняя граница ID включительно
+    :return: Количество обновлённых посылок
+    """
+    updated_count = 0
+    with track_task_queries('price_id_range'):
+        async for session in get_celery_db_session():
+            updater = PriceUpdateService(
+                parcel_repo=ParcelRepo(session=session),
+                rate_service=get_worker_resources().rate_service,
+                tariff_repo=TariffRepo(session=session),
+                summary_cache=get_worker_resources().summary_cache,
+            )
+            updated_count = await updater.update_in_chunks(
+                chunk_size=pricing_settings.chunk_size,
+                id_from=id_from,
+                id_to=id_to,
+                skip_locked=True,
+            )
+    return updated_count
+
+
+@celery_app.task(name='app.tasks.price_tasks.summarize_repricing')
+def summarize_repricing(results: list[int]) -> int:
+    """
+    Завершение параллельного пересчёта: суммирует результаты подзадач.
+
+    :param results: Количество обновлённых посылок по подзадачам
+    :return: Общее количество обновлённых посылок
+    """
+    updated_count = sum(results)
+    logger.info(
+        f'Параллельный пересчёт завершён: {len(results)} подзадач, '
+        f'обновлено посылок: {updated_count}')
+    return updated_count
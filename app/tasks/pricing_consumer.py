@@ -0,0 +1,190 @@
+"""
+Потребитель потока новых посылок: рассчитывает стоимость доставки
+микропакетами в течение секунды после создания посылки.
+
+Запуск:
+    python -m app.tasks.pricing_consumer
+"""
+import asyncio
+import datetime
+import logging
+import os
+import signal
+import socket
+import time
+
+from app.adapters.database.repositories.parcel_repo import ParcelRepo
+from app.adapters.database.repositories.tariff_repo import TariffRepo
+from app.applications.services.price_update_service import PriceUpdateService
+from app.logging_config import setup_logging
+from app.tasks.resources import (
+    WorkerResources,
+    close_worker_resources,
+    init_worker_resources,
+)
+from app.tasks.settings import metrics_settings, pricing_settings
+from app.utils.metrics import PRICING_BACKLOG, start_metrics_server
+from app.utils.pricing_stream import PricingStream
+from app.utils.settings import PricingSettings
+
+logger = logging.getLogger(__name__)
+
+# Пауза после ошибки, чтобы не крутить цикл при недоступной БД/Redis
+ERROR_BACKOFF_SECONDS = 1.0
+
+
+class PricingConsumer:
+    """
+    Читает ID посылок из потока Redis и рассчитывает их стоимость
+    микропакетами.
+
+    Работает следующим образом:
+    1. Блокирующе читает сообщения группы (не дольше stream_block_ms),
+       объединяя все пришедшие ID в один пакет.
+    2. Рассчитывает стоимость пакета порциями по chunk_size и удаляет
+       посылки из outbox той же транзакцией, затем подтверждает сообщения.
+    3. Раз в outbox_sweep_interval_seconds обновляет метрику размера
+       очереди и сверяет outbox: посылки, стоящие
+       в нём дольше outbox_grace_seconds (оповещение потеряно или упал
+       потребитель), рассчитываются без сообщения.
+    """
+
+    def __init__(
+        self,
+        resources: WorkerResources,
+        stream: PricingStream,
+        settings: PricingSettings,
+        name: str,
+    ):
+        """
+        :param resources: Ресурсы процесса (пул БД, сервис курсов)
+        :param stream: Поток оповещений о новых посылках
+        :param settings: Настройки пересчёта стоимости
+        :param name: Имя потребителя в группе
+        """
+        self._resources = resources
+        self._stream = stream
+        self._settings = settings
+        self._name = name
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """
+        Обрабатывает поток, пока не установлен stop.
+
+        :param stop: Событие остановки потребителя
+        """
+        await self._stream.ensure_group()
+        logger.info(f'Потребитель {self._name} запущен')
+        next_sweep = 0.0
+
+        while not stop.is_set():
+            try:
+                if time.monotonic() >= next_sweep:
+                    await self.sweep()
+                    next_sweep = (
+                        time.monotonic()
+                        + self._settings.outbox_sweep_interval_seconds)
+
+                message_ids, parcel_ids = await self._stream.read(
+                    consumer=self._name,
+                    count=self._settings.stream_read_count,
+                    block_ms=self._settings.stream_block_ms,
+                )
+                if parcel_ids:
+                    updated_count = await self.price(parcel_ids)
+                    logger.info(
+                        f'Рассчитана стоимость доставки: {updated_count} '
+                        f'из {len(parcel_ids)} посылок')
+                await self._stream.ack(message_ids)
+            except Exception:
+                logger.exception('Ошибка в потребителе потока посылок')
+                await asyncio.sleep(ERROR_BACKOFF_SECONDS)
+
+        logger.info(f'Потребитель {self._name} остановлен')
+
+    async def price(self, parcel_ids: list[int]) -> int:
+        """
+        Рассчитывает стоимость доставки для посылок порциями.
+
+        :param parcel_ids: ID посылок (возможны повторы)
+        :return: Количество обновлённых посылок
+        """
+        parcel_ids = sorted(set(parcel_ids))
+        chunk_size = self._settings.chunk_size
+        updated_count = 0
+        for start in range(0, len(parcel_ids), chunk_size):
+            async with self._resources.session_factory() as session:
+                updater = PriceUpdateService(
+                    parcel_repo=ParcelRepo(session=session),
+                    rate_service=self._resources.rate_service,
+                    tariff_repo=TariffRepo(session=session),
+                    summary_cache=self._resources.summary_cache,
+                )
+                updated_count += await updater.price_parcels(
+                    parcel_ids[start:start + chunk_size])
+        return updated_count
+
+    async def sweep(self) -> int:
+        """
+        Рассчитывает посылки, застрявшие в outbox, и подтверждает
+        зависшие сообщения остановленных потребителей.
+
+        :return: Количество обновлённых посылок
+        """
+        await self._stream.ack_stale(consumer=self._name)
+
+        older_than = datetime.datetime.now() - datetime.timedelta(
+            seconds=self._settings.outbox_grace_seconds)
+        async with self._resources.session_factory() as session:
+            PRICING_BACKLOG.set(
+                await ParcelRepo(session=session).count_pricing_backlog())
+
+        updated_count = 0
+        while True:
+            async with self._resources.session_factory() as session:
+                parcel_ids = await ParcelRepo(
+                    session=session).get_stale_outbox_ids(
+                    older_than=older_than,
+                    limit=self._settings.chunk_size,
+                )
+            if not parcel_ids:
+                break
+            updated_count += await self.price(parcel_ids)
+            if len(parcel_ids) < self._settings.chunk_size:
+                break
+
+        if updated_count:
+            logger.warning(
+                f'Сверка outbox: рассчитано посылок без оповещения: '
+                f'{updated_count}')
+        return updated_count
+
+
+async def _main() -> None:
+    resources = init_worker_resources()
+    consumer = PricingConsumer(
+        resources=resources,
+        stream=PricingStream(resources.redis),
+        settings=pricing_settings,
+        name=f'{socket.gethostname()}-{os.getpid()}',
+    )
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    try:
+        await consumer.run(stop)
+    finally:
+        await close_worker_resources()
+
+
+def main() -> None:
+    setup_logging()
+    start_metrics_server(metrics_settings.exporter_port)
+    asyncio.run(_main())
+
+
+if __name__ == '__main__':
+    main()
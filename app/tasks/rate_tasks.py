@@ -0,0 +1,42 @@
+import logging
+
+from celery.utils.time import get_exponential_backoff_interval
+
+from app.tasks.celery_app import celery_app
+from app.tasks.resources import get_worker_resources
+
+logger = logging.getLogger(__name__)
+
+# Экспоненциальная задержка повторов: 5, 10, 20, ... секунд, не более 300
+RETRY_BACKOFF_SECONDS = 5
+RETRY_BACKOFF_MAX_SECONDS = 300
+
+
+@celery_app.task(
+    bind=True,
+    name='app.tasks.rate_tasks.prefetch_rates',
+    max_retries=6,
+)
+async def prefetch_rates(self) -> str:
+    """
+    Периодическая задача Celery: обновляет снимок курсов ЦБ в Redis
+    до истечения его TTL, чтобы пересчёт цен не ждал внешний API.
+
+    При ошибке задача повторяется с экспоненциальной задержкой и jitter.
+    Повтор запрашивается явно: autoretry_for Celery оборачивает только
+    синхронный вызов и не видит исключений корутины.
+
+    :return: Дата публикации полученного снимка
+    """
+    try:
+        snapshot = await get_worker_resources().rate_service.refresh_now()
+    except Exception as e:
+        countdown = get_exponential_backoff_interval(
+            factor=RETRY_BACKOFF_SECONDS,
+            retries=self.request.retries,
+            maximum=RETRY_BACKOFF_MAX_SECONDS,
+            full_jitter=True,
+        )
+        raise self.retry(exc=e, countdown=countdown)
+    logger.info(f'Курсы ЦБ обновлены заранее: снимок на {snapshot.date}')
+    return snapshot.date
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+from typing import AsyncGenerator
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.adapters.database.engine import create_engine, create_session_factory
+from app.tasks.settings import (
+    create_rate_service,
+    db_settings,
+    get_celery_redis,
+    summary_settings,
+)
+from app.utils.summary_cache import ParcelSummaryCache
+
+logger = logging.getLogger(__name__)
+
+# Сколько секунд ждать закрытия ресурсов при остановке воркера
+SHUTDOWN_TIMEOUT_SECONDS = 10
+
+
+class WorkerResources:
+    """
+    Долгоживущие ресурсы процесса Celery-воркера: движок БД с пулом
+    соединений, клиент Redis, сервис курсов с собственным HTTP-клиентом
+    и кеш сводок сессий.
+
+    Создаются один раз на процесс (в worker_process_init) и используются
+    всеми задачами, выполняемыми на цикле событий AsyncIOPool.
+    Клиенты открывают соединения лениво, при первом запросе, поэтому
+    создавать их можно до запуска цикла событий.
+    """
+
+    def __init__(self):
+        self.engine = create_engine('celery', db_settings)
+        self.session_factory = create_session_factory(self.engine)
+        self.redis = get_celery_redis()
+        self.rate_service = create_rate_service(self.redis)
+        self.summary_cache = ParcelSummaryCache(
+            self.redis, summary_settings.cache_ttl_seconds)
+
+    async def aclose(self) -> None:
+        """
+        Закрывает HTTP-клиент, подключение к Redis и пул соединений с БД.
+        """
+        await self.rate_service.aclose()
+        await self.redis.aclose()
+        await self.engine.dispose()
+
+
+_resources: WorkerResources | None = None
+
+
+def init_worker_resources() -> WorkerResources:
+    """
+    Создаёт ресурсы процесса воркера, если они ещё не созданы.
+
+    :return: WorkerResources текущего процесса
+    """
+    global _resources
+    if _resources is None:
+        _resources = WorkerResources()
+        logger.info('Ресурсы воркера созданы')
+    return _resources
+
+
+def get_worker_resources() -> WorkerResources:
+    """
+    Возвращает ресурсы процесса воркера, создавая их при первом обращении
+    (если задача запущена вне воркера, где worker_process_init не вызывался).
+    """
+    return _resources or init_worker_resources()
+
+
+async def close_worker_resources() -> None:
+    """
+    Закрывает ресурсы процесса воркера. Должна выполняться на том же
+    цикле событий, на котором ресурсы использовались.
+    """
+    global _resources
+    if _resources is None:
+        return
+    resources, _resources = _resources, None
+    await resources.aclose()
+    logger.info('Ресурсы воркера закрыты')
+
+
+def shutdown_worker_resources(loop: asyncio.AbstractEventLoop | None) -> None:
+    """
+    Синхронно закрывает ресурсы воркера на цикле событий пула задач.
+
+    :param loop: Цикл событий AsyncIOPool (None — пул не запускался)
+    """
+    if _resources is None:
+        return
+    if loop is None or not loop.is_running():
+        logger.warning(
+            'Цикл событий воркера остановлен, ресурсы закрываются вместе '
+            'с процессом')
+        return
+    future = asyncio.run_coroutine_threadsafe(close_worker_resources(), loop)
+    try:
+        future.result(timeout=SHUTDOWN_TIMEOUT_SECONDS)
+    except Exception:
+        logger.exception('Ошибка при закрытии ресурсов воркера')
+
+
+async def get_celery_db_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Асинхронный генератор сессий базы данных для задач Celery.
+
+    Используется в фоновом режиме, чтобы открыть транзакцию, выполнить работу
+    и закрыть сессию. Соединения берутся из пула процесса воркера.
+
+    Yields:
+        AsyncSession: Асинхронная сессия SQLAlchemy.
+    """
+    async with get_worker_resources().session_factory() as session:
+        try:
+            yield session
+            await session.commit()
+        except:
+            await session.rollback()
+            raise
@@ -1,40 +1,21 @@
-from sqlalchemy.ext.asyncio import (
-    create_async_engine,
-    async_sessionmaker,
-    AsyncSession,
-)
 from redis.asyncio import Redis
-from typing import AsyncGenerator
 
 from app.adapters.database.settings import MySQLSettings
-from app.utils.settings import RateSettings
+from app.utils.rate import RateService
+from app.utils.settings import (
+    MetricsSettings,
+    PricingSettings,
+    RateSettings,
+    SummarySettings,
+)
 
 # Загружаем настройки
 db_settings = MySQLSettings()
 redis_settings = RateSettings()
+pricing_settings = PricingSettings()
+metrics_settings = MetricsSettings()
+summary_settings = SummarySettings()
 
-# Создаём асинхронный SQLAlchemy-движок
-engine = create_async_engine(db_settings.DATABASE_URL, future=True, echo=False)
-# Создаём фабрику сессий
-async_session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
-
-async def get_celery_db_session() -> AsyncGenerator[AsyncSession, None]:
-    """
-    Асинхронный генератор сессий базы данных для задач Celery.
-
-    Используется в фоновом режиме, чтобы открыть транзакцию, выполнить работу
-    и закрыть сессию.
-
-    Yields:
-        AsyncSession: Асинхронная сессия SQLAlchemy.
-    """
-    async with async_session_factory() as session:
-        try:
-            yield session
-            await session.commit()
-        except:
-            await session.rollback()
-            raise
 
 def get_celery_redis() -> Redis:
     """
@@ -49,3 +30,22 @@ def get_celery_redis() -> Redis:
         db=redis_settings.redis_db,
         decode_responses=True,
     )
+
+
+def create_rate_service(redis: Redis) -> RateService:
+    """
+    Создаёт сервис курсов валют для Celery-задач по настройкам RateSettings.
+
+    Аргументы:
+        redis (Redis): Асинхронный Redis-клиент.
+
+    Возвращает:
+        RateService: Сервис курсов с собственным HTTP-клиентом.
+    """
+    return RateService(
+        redis,
+        cbr_url=redis_settings.cbr_url,
+        ttl_seconds=redis_settings.ttl_seconds,
+        local_ttl_seconds=redis_settings.local_ttl_seconds,
+        max_stale_seconds=redis_settings.max_stale_seconds,
+    )
@@ -1,7 +1,12 @@
 import pytest
-from httpx import AsyncClient
+from httpx import ASGITransport, AsyncClient
 from fastapi import status
+from sqlalchemy import select
 
+from app.adapters.database.repositories.parcel_repo import ParcelRepo
+from app.adapters.database.tables import company_stats
+from app.adapters.http_api.settings import DB
+from app.composites.http_api import app
 
 
 @pytest.mark.asyncio
@@ -44,3 +49,212 @@ async def test_get_parcel_by_id(test_client: AsyncClient):
     data = response.json()
     assert data['parcel_id'] == parcel_id
     assert data['name'] == 'Box'
+
+
+@pytest.mark.asyncio
+async def test_create_parcels_bulk(test_client: AsyncClient):
+    parcel = {'weight': 1.0, 'type_id': 1, 'content_value_usd': 10.0}
+    response = await test_client.post(
+        '/parcels/bulk',
+        json=[
+            {'name': 'Bulk A', **parcel},
+            {'name': 'Bulk B', **parcel},
+            {'name': 'Bulk A', **parcel},
+        ]
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    parcel_ids = response.json()['parcel_ids']
+    assert len(parcel_ids) == 3
+    assert parcel_ids[0] == parcel_ids[2] != parcel_ids[1]
+
+
+@pytest.mark.asyncio
+async def test_create_parcels_bulk_names_follow_collation(
+    test_client: AsyncClient,
+):
+    parcel = {'weight': 1.0, 'type_id': 1, 'content_value_usd': 10.0}
+    response = await test_client.post('/parcels/bulk', json=[
+        {'name': name, **parcel} for name in ['Box', 'box ', 'BOX']
+    ])
+    assert response.status_code == status.HTTP_201_CREATED
+    parcel_ids = response.json()['parcel_ids']
+    assert len(set(parcel_ids)) == 1
+
+    # Совпадение с уже сохранённой посылкой без учёта регистра
+    response = await test_client.post(
+        '/parcels/bulk', json=[{'name': 'bOx', **parcel}])
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.json()['parcel_ids'] == parcel_ids[:1]
+
+
+@pytest.mark.asyncio
+async def test_parcels_summary(test_client: AsyncClient):
+    response = await test_client.get('/parcels/summary')
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()['total']['parcel_count'] == 0
+
+    # Создание посылки сбрасывает закешированную сводку сессии
+    await test_client.post('/parcels/', json={
+        'name': 'Summary A',
+        'weight': 2.0,
+        'type_id': 1,
+        'content_value_usd': 10.0,
+    })
+    response = await test_client.get('/parcels/summary')
+    summary = response.json()
+    assert summary['total']['parcel_count'] == 1
+    assert summary['types'][0]['type_id'] == 1
+    assert summary['types'][0]['total_weight'] == 2.0
+
+
+@pytest.mark.asyncio
+async def test_company_parcels_and_stats(test_client: AsyncClient):
+    company_id = (await test_client.post(
+        '/company/', json={'name': 'Stats Co'})).json()['id']
+    parcel_ids = []
+    for name, weight in (('Stats A', 1.5), ('Stats B', 2.5)):
+        response = await test_client.post('/parcels/', json={
+            'name': name,
+            'weight': weight,
+            'type_id': 1,
+            'content_value_usd': 10.0,
+        })
+        parcel_ids.append(response.json()['parcel_id'])
+    for parcel_id in parcel_ids:
+        response = await test_client.post('/parcels/bind_company', json={
+            'parcel_id': parcel_id,
+            'company_id': company_id,
+        })
+        assert response.status_code == status.HTTP_200_OK
+
+    response = await test_client.get(f'/company/{company_id}/stats')
+    assert response.status_code == status.HTTP_200_OK
+    stats = response.json()
+    assert stats['parcel_count'] == 2
+    assert stats['total_weight'] == 4.0
+
+    response = await test_client.get(
+        f'/company/{company_id}/parcels', params={'limit': 1})
+    assert response.status_code == status.HTTP_200_OK
+    assert [item['parcel_id'] for item in response.json()] == [parcel_ids[1]]
+    response = await test_client.get(
+        f'/company/{company_id}/parcels',
+        params={'limit': 1, 'cursor': response.headers['X-Next-Cursor']})
+    assert [item['parcel_id'] for item in response.json()] == [parcel_ids[0]]
+
+    response = await test_client.get('/company/999999999/stats')
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_company_parcels_scoped_to_session(test_client: AsyncClient):
+    company_id = (await test_client.post(
+        '/company/', json={'name': 'Scoped Co'})).json()['id']
+    parcel_id = (await test_client.post('/parcels/', json={
+        'name': 'Scoped A',
+        'weight': 1.0,
+        'type_id': 1,
+        'content_value_usd': 10.0,
+    })).json()['parcel_id']
+    await test_client.post('/parcels/bind_company', json={
+        'parcel_id': parcel_id,
+        'company_id': company_id,
+    })
+
+    # Клиент с другой cookie сессии не видит чужие посылки компании
+    transport = ASGITransport(app=app)
+    async with AsyncClient(
+        transport=transport, base_url='http://test') as other_client:
+        response = await other_client.get(f'/company/{company_id}/parcels')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == []
+
+        response = await other_client.get(
+            f'/company/{company_id}/parcels', params={'all_sessions': 'true'})
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    response = await test_client.get(f'/company/{company_id}/parcels')
+    assert [item['parcel_id'] for item in response.json()] == [parcel_id]
+
+
+@pytest.mark.asyncio
+async def test_company_stats_accumulate_without_drift(test_client: AsyncClient):
+    company_id = (await test_client.post(
+        '/company/', json={'name': 'Drift Co'})).json()['id']
+
+    # Каждое приращение — отдельный upsert, как при привязке по одной
+    # посылке; сумма выходит за точность FLOAT одинарной точности
+    async with DB.async_session_factory() as session:
+        repo = ParcelRepo(session)
+        for _ in range(1000):
+            await repo.add_company_prices([(company_id, 1234.57)])
+        total = (await session.execute(
+            select(company_stats.c.total_delivery_price)
+            .where(company_stats.c.company_id == company_id)
+        )).scalar_one()
+        await session.rollback()
+
+    assert total == pytest.approx(1_234_570.0, abs=0.01)
+
+
+@pytest.mark.asyncio
+async def test_bind_company_bulk(test_client: AsyncClient):
+    company_id = (await test_client.post(
+        '/company/', json={'name': 'Bulk Bind Co'})).json()['id']
+    response = await test_client.post('/parcels/bulk', json=[
+        {
+            'name': f'Bulk Bind {index}',
+            'weight': 1.0,
+            'type_id': 1,
+            'content_value_usd': 10.0,
+        }
+        for index in range(3)
+    ])
+    parcel_ids = response.json()['parcel_ids']
+    await test_client.post('/parcels/bind_company', json={
+        'parcel_id': parcel_ids[0],
+        'company_id': company_id,
+    })
+
+    response = await test_client.post('/parcels/bind_company/bulk', json={
+        'company_id': company_id,
+        'parcel_ids': [*parcel_ids, 999999999],
+    })
+    assert response.status_code == status.HTTP_200_OK
+    assert [item['status'] for item in response.json()] == [
+        'already_bound', 'bound', 'bound', 'missing']
+
+    stats = (await test_client.get(f'/company/{company_id}/stats')).json()
+    assert stats['parcel_count'] == 3
+    summary = (await test_client.get('/parcels/summary')).json()
+    assert summary['total']['bound_count'] == 3
+
+
+@pytest.mark.asyncio
+async def test_bind_company_bulk_unknown_company(test_client: AsyncClient):
+    response = await test_client.post('/parcels/bind_company/bulk', json={
+        'company_id': 999999999,
+        'parcel_ids': [1, 2],
+    })
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response.json() == {'detail': 'Company 999999999 not found'}
+
+
+@pytest.mark.asyncio
+async def test_export_sets_session_cookie():
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url='http://test',
+    ) as client:
+        response = await client.get('/parcels/export')
+        assert response.status_code == status.HTTP_200_OK
+        assert 'session_id' in response.cookies
+
+        # Клиент остаётся в выданной выгрузкой сессии
+        await client.post('/parcels/', json={
+            'name': 'Export Cookie',
+            'weight': 1.0,
+            'type_id': 1,
+            'content_value_usd': 10.0,
+        })
+        response = await client.get('/parcels/export')
+        assert 'Export Cookie' in response.text
@@ -0,0 +1,26 @@
+import pytest
+from httpx import AsyncClient
+
+# Бюджеты SQL-запросов эндпоинтов при прогретом кеше справочников
+PARCEL = {'name': 'Budget', 'weight': 1.0, 'type_id': 1, 'content_value_usd': 10.0}
+
+
+@pytest.mark.asyncio
+async def test_parcel_endpoints_query_budget(test_client: AsyncClient, query_budget):
+    # Прогрев: сессия пользователя, кеш справочников, соединение с БД
+    response = await test_client.post('/parcels/', json=PARCEL)
+    parcel_id = response.json()['parcel_id']
+
+    with query_budget(0):
+        await test_client.get('/parcels/types')
+    with query_budget(1):
+        await test_client.get('/parcels/')
+    with query_budget(1):
+        await test_client.get(f'/parcels/{parcel_id}')
+    with query_budget(2):
+        await test_client.post('/parcels/', json=PARCEL)
+    with query_budget(3):
+        await test_client.post(
+            '/parcels/bulk',
+            json=[{**PARCEL, 'name': f'Budget {index}'} for index in range(10)],
+        )
@@ -1,4 +1,6 @@
 import asyncio
+from contextlib import contextmanager
+
 import pytest
 import pytest_asyncio
 from unittest.mock import AsyncMock, MagicMock
@@ -6,8 +8,13 @@ from datetime import datetime
 from httpx import AsyncClient, ASGITransport
 
 from app.composites.http_api import app
+from app.adapters.database.query_tracking import track_queries
 from app.adapters.database.repositories.parcel_repo import ParcelRepo
-from app.applications.dataclasses.dataclasses import Parcel, ParcelType
+from app.applications.dataclasses.dataclasses import (
+    Parcel,
+    ParcelRow,
+    ParcelType,
+)
 
 # Один event loop на всё тестирование
 @pytest.fixture(scope='session')
@@ -23,6 +30,22 @@ async def test_client() -> AsyncClient:
     async with AsyncClient(transport=transport, base_url='http://test') as client:
         yield client
 
+# Бюджет SQL-запросов: тест падает, если блок выполнил больше запросов
+@pytest.fixture
+def query_budget():
+    @contextmanager
+    def _query_budget(max_queries: int):
+        with track_queries('query_budget') as usage:
+            yield usage
+        statements = '\n'.join(
+            f'{count} x {statement}'
+            for statement, count in usage.statements.most_common())
+        assert usage.queries <= max_queries, (
+            f'Выполнено {usage.queries} SQL-запросов при бюджете '
+            f'{max_queries}:\n{statements}')
+
+    return _query_budget
+
 # Моки
 @pytest.fixture
 def mock_session_execute():
@@ -52,6 +75,18 @@ def parcel_instance():
         updated_at=datetime.now()
     )
 
+@pytest.fixture
+def parcel_row():
+    return ParcelRow(
+        id=1,
+        name='Box',
+        weight=1.0,
+        type_id=1,
+        content_value_usd=100.0,
+        delivery_price=None,
+        created_at=datetime(2024, 5, 1, 12, 30, 15),
+    )
+
 @pytest.fixture
 def parcel_type_instance():
     return ParcelType(
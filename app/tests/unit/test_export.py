@@ -0,0 +1,124 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from sqlalchemy import insert
+
+from app.adapters.database.engine import create_engine, create_session_factory
+from app.adapters.database.repositories.parcel_repo import ParcelRepo
+from app.adapters.database.settings import MySQLSettings
+from app.adapters.database.tables import company, metadata, parcel_types, parcels
+from app.adapters.http_api.settings import authorize_export
+from app.applications.services.parcel_services import ParcelService
+from app.utils.settings import ExportSettings
+
+
+@pytest_asyncio.fixture
+async def export_session():
+    engine = create_engine(
+        'unit-test-export',
+        MySQLSettings(DATABASE_URL='sqlite+aiosqlite:///:memory:'),
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(metadata.create_all)
+        await conn.execute(insert(parcel_types), [{'name': 'одежда'}])
+        await conn.execute(insert(company), [{'name': 'Почта'}])
+        await conn.execute(insert(parcels), [
+            {
+                'session_id': 'abc' if index < 7 else 'other',
+                'name': f'parcel-{index}',
+                'weight': 1.0 + index,
+                'type_id': 1,
+                'content_value_usd': 10.0,
+                'delivery_price': 100.0 if index % 2 else None,
+                'company_id': 1 if index == 3 else None,
+                'created_at': datetime(2024, 5, 1, 12, 0, index),
+            }
+            for index in range(10)
+        ])
+    try:
+        async with create_session_factory(engine)() as session:
+            yield session
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_stream_by_filters_yields_batches(export_session):
+    repo = ParcelRepo(export_session)
+
+    batches = [
+        batch async for batch in repo.stream_by_filters(
+            'abc', None, None, batch_size=3)
+    ]
+
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    assert [row.id for batch in batches for row in batch] == list(range(1, 8))
+
+    priced = [
+        row.id
+        for batch in [
+            batch async for batch in repo.stream_by_filters(None, 1, True)
+        ]
+        for row in batch
+    ]
+    assert priced == [2, 4, 6, 8, 10]
+
+    bound = [
+        batch async for batch in repo.stream_by_filters(
+            'abc', None, None, company_id=1)
+    ]
+    assert [row.name for batch in bound for row in batch] == ['parcel-3']
+
+
+@pytest.mark.asyncio
+async def test_export_parcels_formats(export_session):
+    service = ParcelService(parcel_repo=ParcelRepo(export_session))
+
+    ndjson = b''.join([
+        chunk async for chunk in service.export_parcels(
+            'abc', None, False, None, 'ndjson', batch_size=2)
+    ])
+    rows = [json.loads(line) for line in ndjson.splitlines()]
+    assert [row['id'] for row in rows] == [1, 3, 5, 7]
+    assert rows[0] == {
+        'id': 1,
+        'session_id': 'abc',
+        'name': 'parcel-0',
+        'weight': 1.0,
+        'type_id': 1,
+        'content_value_usd': 10.0,
+        'delivery_price': None,
+        'company_id': None,
+        'created_at': '2024-05-01T12:00:00',
+    }
+
+    chunks = [
+        chunk async for chunk in service.export_parcels(
+            'abc', None, True, None, 'csv', batch_size=2)
+    ]
+    # Заголовок отдаётся отдельным фрагментом до первой порции строк
+    assert chunks[0].decode().startswith('id,session_id,name')
+    reader = list(csv.DictReader(io.StringIO(b''.join(chunks).decode())))
+    assert [row['id'] for row in reader] == ['2', '4', '6']
+    assert reader[1]['company_id'] == '1'
+    assert reader[0]['company_id'] == ''
+
+
+def test_authorize_export():
+    settings = ExportSettings(EXPORT_TOKEN='secret')
+
+    assert authorize_export(False, None, settings) is False
+    assert authorize_export(True, 'secret', settings) is True
+    for token, export_settings in (
+        ('wrong', settings),
+        (None, settings),
+        ('', ExportSettings(EXPORT_TOKEN='')),
+    ):
+        with pytest.raises(HTTPException) as error:
+            authorize_export(True, token, export_settings)
+        assert error.value.status_code == 403
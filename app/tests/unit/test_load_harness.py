@@ -0,0 +1,43 @@
+import httpx
+import pytest
+
+from benchmarks.load.harness import Scenario, compare, run_scenario
+
+
+def test_compare_flags_regressions():
+    baseline = {
+        'list': {'errors': 0, 'rps': 100.0, 'p95_ms': 10.0, 'p99_ms': 20.0},
+        'types': {'errors': 0, 'rps': 500.0, 'p95_ms': 2.0, 'p99_ms': 3.0},
+    }
+    current = {
+        'list': {'errors': 0, 'rps': 80.0, 'p95_ms': 12.0, 'p99_ms': 21.0},
+        'types': {'errors': 0, 'rps': 520.0, 'p95_ms': 2.1, 'p99_ms': 3.1},
+        'detail': {'errors': 0, 'rps': 1.0, 'p95_ms': 1.0, 'p99_ms': 1.0},
+    }
+
+    regressions = compare(current, baseline, tolerance=0.15)
+
+    assert regressions == [
+        'list: p95_ms 12.0 (было 10.0)',
+        'list: rps 80.0 (было 100.0)',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_run_scenario_counts_unexpected_status_as_error():
+    def handler(request: httpx.Request) -> httpx.Response:
+        index = int(request.url.params['i'])
+        return httpx.Response(500 if index % 10 == 0 else 200)
+
+    async def request(client: httpx.AsyncClient, index: int) -> httpx.Response:
+        return await client.get('/', params={'i': index})
+
+    transport = httpx.MockTransport(handler)
+    async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+        result = await run_scenario(
+            client, Scenario('ping', request), requests=50, concurrency=5, warmup=5)
+
+    summary = result.summary()
+    assert summary['requests'] == 50
+    assert summary['errors'] == 5
+    assert summary['p50_ms'] <= summary['p95_ms'] <= summary['p99_ms']
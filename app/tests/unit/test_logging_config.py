@@ -0,0 +1,58 @@
+import logging
+import queue
+
+from app.logging_config import (
+    DroppingQueueHandler,
+    SamplingFilter,
+    parse_sampling,
+)
+from app.utils.metrics import LOG_RECORDS_DROPPED
+
+
+def _record(name: str, level: int = logging.INFO) -> logging.LogRecord:
+    return logging.LogRecord(
+        name, level, __file__, 1, 'Посылка %s', (1,), None)
+
+
+def test_handler_does_not_format_record():
+    handler = DroppingQueueHandler(queue.Queue(maxsize=10))
+    record = _record('app')
+
+    handler.handle(record)
+
+    queued = handler.queue.get_nowait()
+    assert queued is record
+    # Подстановка аргументов откладывается до потока QueueListener
+    assert queued.msg == 'Посылка %s'
+    assert queued.args == (1,)
+
+
+def test_handler_drops_records_when_queue_is_full():
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+    dropped = LOG_RECORDS_DROPPED._value.get()
+
+    for _ in range(3):
+        handler.handle(_record('app'))
+
+    assert handler.queue.qsize() == 1
+    assert LOG_RECORDS_DROPPED._value.get() == dropped + 2
+
+
+def test_sampling_filter(monkeypatch):
+    sampling = SamplingFilter({'app.http': 0.1, 'app.http.parcels': 1.0})
+    monkeypatch.setattr('app.logging_config.random.random', lambda: 0.5)
+
+    assert not sampling.filter(_record('app.http'))
+    assert not sampling.filter(_record('app.http.companies'))
+    # Более длинный префикс имеет приоритет
+    assert sampling.filter(_record('app.http.parcels'))
+    assert sampling.filter(_record('app.httpx'))
+    assert sampling.filter(_record('app.http', logging.WARNING))
+
+
+def test_parse_sampling():
+    assert parse_sampling('') == {}
+    assert parse_sampling('app.http=0.1, app.utils.rate=0.01') == {
+        'app.http': 0.1,
+        'app.utils.rate': 0.01,
+    }
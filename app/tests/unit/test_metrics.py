@@ -0,0 +1,64 @@
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+
+from app.adapters.database.engine import create_engine
+from app.adapters.database.query_tracking import record_query
+from app.adapters.database.settings import MySQLSettings
+from app.utils.metrics import MetricsMiddleware
+
+
+def _sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.mark.asyncio
+async def test_metrics_middleware_labels_route_template():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get('/items/{item_id}')
+    async def get_item(item_id: int):
+        record_query('SELECT 1', (), False, 0.01, 0)
+        record_query('SELECT 2', (), False, 0.02, 0)
+        return {'id': item_id}
+
+    route = '/items/{item_id}'
+    requests_before = _sample(
+        'http_request_duration_seconds_count',
+        method='GET', route=route, status='200')
+    queries_before = _sample('http_request_db_queries_sum', route=route)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url='http://test') as client:
+        assert (await client.get('/items/1')).status_code == 200
+        assert (await client.get('/items/2')).status_code == 200
+        assert (await client.get('/missing')).status_code == 404
+
+    assert _sample(
+        'http_request_duration_seconds_count',
+        method='GET', route=route, status='200') == requests_before + 2
+    assert _sample(
+        'http_request_db_queries_sum', route=route) == queries_before + 4
+    assert _sample(
+        'http_request_duration_seconds_count',
+        method='GET', route='unmatched', status='404') >= 1
+
+
+@pytest.mark.asyncio
+async def test_engine_counts_queries():
+    engine = create_engine(
+        'unit-test-metrics',
+        MySQLSettings(DATABASE_URL='sqlite+aiosqlite:///:memory:'),
+    )
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text('SELECT 1'))
+            await conn.execute(text('SELECT 2'))
+    finally:
+        await engine.dispose()
+
+    assert _sample(
+        'db_query_duration_seconds_count', engine='unit-test-metrics') == 2
@@ -0,0 +1,20 @@
+from datetime import datetime
+
+import pytest
+
+from app.utils.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2025, 1, 2, 3, 4, 5, 678901)
+
+    cursor = encode_cursor(created_at, 42)
+
+    assert '=' not in cursor
+    assert decode_cursor(cursor) == [created_at.isoformat(), 42]
+
+
+@pytest.mark.parametrize('cursor', ['not-base64!', 'bm90LWpzb24', 'e30'])
+def test_decode_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
@@ -1,15 +1,27 @@
+from unittest.mock import MagicMock
+
 import pytest
+from sqlalchemy.dialects import mysql
+from sqlalchemy.schema import CreateTable
 from app.adapters.database.repositories.parcel_repo import ParcelRepo
+from app.adapters.database.tables import company_stats
 
 
 @pytest.mark.asyncio
-async def test_get_by_id_and_session(mock_session_execute, parcel_instance):
-    fake_session, set_result = mock_session_execute
-    set_result('first', parcel_instance)
+async def test_get_by_id_and_session(mock_session_execute, parcel_row):
+    fake_session, _ = mock_session_execute
+    fake_session.execute.return_value = MagicMock(
+        first=MagicMock(return_value=parcel_row))
     repo = ParcelRepo(fake_session)
 
     result = await repo.get_by_id_and_session(1, 'abc')
-    assert result == parcel_instance
+    assert result == parcel_row
+
+    stmt = fake_session.execute.call_args.args[0]
+    assert [column.name for column in stmt.selected_columns] == [
+        'id', 'name', 'weight', 'type_id', 'content_value_usd',
+        'delivery_price', 'created_at',
+    ]
 
 
 @pytest.mark.asyncio
@@ -33,13 +45,32 @@ async def test_get_all_types(mock_session_execute, parcel_type_instance):
 
 
 @pytest.mark.asyncio
-async def test_list_by_filters(mock_session_execute, parcel_instance):
+async def test_list_by_filters(mock_session_execute, parcel_row):
+    fake_session, _ = mock_session_execute
+    fake_session.execute.return_value = MagicMock(
+        all=MagicMock(return_value=[parcel_row]))
+    repo = ParcelRepo(fake_session)
+
+    result = await repo.list_by_filters('abc', None, None, 10, 0)
+    assert result == [parcel_row]
+
+
+@pytest.mark.asyncio
+async def test_list_by_filters_after_cursor(
+    mock_session_execute, parcel_instance
+):
     fake_session, set_result = mock_session_execute
     set_result('all', [parcel_instance])
     repo = ParcelRepo(fake_session)
 
-    result = await repo.list_by_filters('abc', None, None, 10, 0)
-    assert result == [parcel_instance]
+    await repo.list_by_filters(
+        'abc', None, None, 10, 0, after=(parcel_instance.created_at, 5))
+
+    stmt = fake_session.execute.call_args.args[0]
+    compiled = str(stmt.compile(dialect=mysql.dialect()))
+    assert 'parcels.created_at < %s OR parcels.created_at = %s ' \
+           'AND parcels.id < %s' in compiled
+    assert 'ORDER BY parcels.created_at DESC, parcels.id DESC' in compiled
 
 
 @pytest.mark.asyncio
@@ -58,3 +89,290 @@ async def test_get_unpriced_parcels(mock_session_execute, parcel_instance):
     result = await repo.get_unpriced_parcels()
 
     assert result == [parcel_instance]
+
+
+@pytest.mark.asyncio
+async def test_get_unpriced_pricing_rows(mock_session_execute):
+    fake_session, _ = mock_session_execute
+    rows = [(1, 1.0, 100.0, 1, None)]
+    fake_session.execute.return_value = MagicMock(all=MagicMock(return_value=rows))
+
+    repo = ParcelRepo(fake_session)
+    result = await repo.get_unpriced_pricing_rows(after_id=0, limit=10)
+
+    assert result == rows
+    stmt = fake_session.execute.call_args.args[0]
+    assert 'parcel_pricing_outbox.parcel_id >' in str(stmt)
+    assert 'ORDER BY parcel_pricing_outbox.parcel_id' in str(stmt)
+    assert 'delivery_price' not in str(stmt.whereclause)
+
+
+@pytest.mark.asyncio
+async def test_get_unpriced_pricing_rows_skip_locked(mock_session_execute):
+    fake_session, _ = mock_session_execute
+    fake_session.execute.return_value = MagicMock(all=MagicMock(return_value=[]))
+
+    repo = ParcelRepo(fake_session)
+    await repo.get_unpriced_pricing_rows(
+        after_id=0, limit=10, id_to=100, skip_locked=True)
+
+    stmt = fake_session.execute.call_args.args[0]
+    compiled = str(stmt.compile(dialect=mysql.dialect()))
+    assert 'parcel_pricing_outbox.parcel_id <= %s' in compiled
+    assert compiled.endswith('FOR UPDATE SKIP LOCKED')
+
+
+@pytest.mark.asyncio
+async def test_set_delivery_prices(mock_session_execute):
+    fake_session, _ = mock_session_execute
+    fake_session.execute.side_effect = [
+        # Посылка 3 уже с ценой и не блокируется
+        MagicMock(all=MagicMock(
+            return_value=[(1, None, 'abc'), (2, 5, 'def')])),
+        MagicMock(rowcount=2),
+        MagicMock(),
+    ]
+
+    repo = ParcelRepo(fake_session)
+    result = await repo.set_delivery_prices({1: 10.0, 2: 20.0, 3: 30.0})
+
+    assert result == 2
+    assert repo.pop_repriced_sessions() == {'abc', 'def'}
+    assert repo.pop_repriced_sessions() == set()
+    lock_stmt, update_stmt, stats_stmt = (
+        call.args[0] for call in fake_session.execute.call_args_list)
+    assert str(lock_stmt.compile(dialect=mysql.dialect())).endswith(
+        'FOR UPDATE')
+    compiled = update_stmt.compile(dialect=mysql.dialect())
+    assert 'CASE parcels.id' in str(compiled)
+    assert 30.0 not in compiled.params.values()
+    compiled = stats_stmt.compile(dialect=mysql.dialect())
+    assert 'ON DUPLICATE KEY UPDATE' in str(compiled)
+    assert 'priced_count = (company_stats.priced_count + ' in str(compiled)
+    assert compiled.params['company_id_m0'] == 5
+    assert compiled.params['total_delivery_price_m0'] == 20.0
+
+
+@pytest.mark.asyncio
+async def test_set_delivery_prices_all_priced(mock_session_execute):
+    fake_session, _ = mock_session_execute
+    fake_session.execute.return_value = MagicMock(
+        all=MagicMock(return_value=[]))
+
+    repo = ParcelRepo(fake_session)
+
+    assert await repo.set_delivery_prices({1: 10.0}) == 0
+    assert fake_session.execute.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_bind_company_to_parcel(mock_session_execute):
+    fake_session, _ = mock_session_execute
+    fake_session.execute.side_effect = [
+        MagicMock(rowcount=1),
+        MagicMock(one=MagicMock(return_value=('abc', 2.5, 300.0))),
+        MagicMock(),
+    ]
+
+    repo = ParcelRepo(fake_session)
+
+    assert await repo.bind_company_to_parcel(
+        parcel_id=1, company_id=4) == 'abc'
+    stats_stmt = fake_session.execute.call_args.args[0]
+    compiled = stats_stmt.compile(dialect=mysql.dialect())
+    assert str(compiled).startswith('INSERT INTO company_stats')
+    assert {
+        name: compiled.params[f'{name}_m0']
+        for name in ('company_id', 'parcel_count', 'total_weight',
+                     'priced_count', 'total_delivery_price')
+    } == {
+        'company_id': 4,
+        'parcel_count': 1,
+        'total_weight': 2.5,
+        'priced_count': 1,
+        'total_delivery_price': 300.0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_bind_company_to_parcel_already_bound(mock_session_execute):
+    fake_session, _ = mock_session_execute
+    fake_session.execute.return_value = MagicMock(rowcount=0)
+
+    repo = ParcelRepo(fake_session)
+
+    assert await repo.bind_company_to_parcel(
+        parcel_id=1, company_id=4) is None
+    assert fake_session.execute.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_bind_company_to_parcels(mock_session_execute):
+    fake_session, _ = mock_session_execute
+    fake_session.execute.side_effect = [
+        # Порция [1, 2, 3]: посылка 2 уже привязана
+        MagicMock(all=MagicMock(return_value=[
+            (1, None, 'abc', 1.5, 100.0),
+            (2, 7, 'abc', 2.0, None),
+            (3, None, 'def', 2.5, None),
+        ])),
+        MagicMock(rowcount=2),
+        # Порция [4, 5]: посылки 4 нет
+        MagicMock(all=MagicMock(return_value=[(5, None, 'def', 1.0, 50.0)])),
+        MagicMock(rowcount=1),
+        MagicMock(),
+    ]
+
+    repo = ParcelRepo(fake_session)
+    result = await repo.bind_company_to_parcels(
+        parcel_ids=[5, 1, 2, 3, 4, 1], company_id=4, chunk_size=3)
+
+    assert result.bound == [1, 3, 5]
+    assert result.already_bound == [2]
+    assert result.missing == [4]
+    assert result.session_ids == {'abc', 'def'}
+    lock_stmt, update_stmt, *_, stats_stmt = (
+        call.args[0] for call in fake_session.execute.call_args_list)
+    assert str(lock_stmt.compile(dialect=mysql.dialect())).endswith(
+        'FOR UPDATE')
+    compiled = update_stmt.compile(
+        dialect=mysql.dialect(), compile_kwargs={'literal_binds': True})
+    assert 'parcels.id IN (1, 3)' in str(compiled)
+    assert 'parcels.company_id IS NULL' in str(compiled)
+    compiled = stats_stmt.compile(dialect=mysql.dialect())
+    assert {
+        name: compiled.params[f'{name}_m0']
+        for name in ('company_id', 'parcel_count', 'total_weight',
+                     'priced_count', 'total_delivery_price')
+    } == {
+        'company_id': 4,
+        'parcel_count': 3,
+        'total_weight': 5.0,
+        'priced_count': 2,
+        'total_delivery_price': 150.0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_bind_company_to_parcels_nothing_to_bind(mock_session_execute):
+    fake_session, _ = mock_session_execute
+    fake_session.execute.return_value = MagicMock(
+        all=MagicMock(return_value=[(1, 7, 'abc', 1.0, None)]))
+
+    repo = ParcelRepo(fake_session)
+    result = await repo.bind_company_to_parcels(
+        parcel_ids=[1, 2], company_id=4, chunk_size=1000)
+
+    assert (result.bound, result.already_bound, result.missing) == (
+        [], [1], [2])
+    assert fake_session.execute.await_count == 1
+
+
+def test_company_stats_sums_are_double_precision():
+    # Агрегаты пополняются приращениями: FLOAT одинарной точности
+    # накапливал бы ошибку округления
+    ddl = str(CreateTable(company_stats).compile(dialect=mysql.dialect()))
+    assert 'total_weight FLOAT(53) NOT NULL' in ddl
+    assert 'total_delivery_price FLOAT(53) NOT NULL' in ddl
+
+
+@pytest.mark.asyncio
+async def test_reprice_unpriced(mock_session_execute):
+    fake_session, _ = mock_session_execute
+    fake_session.execute.side_effect = [
+        MagicMock(all=MagicMock(return_value=[
+            (None, 'abc', 2, 100.0),
+            (3, 'abc', 1, 50.0),
+            (3, 'def', 2, 70.0),
+        ])),
+        MagicMock(rowcount=3),
+        MagicMock(),
+        MagicMock(),
+    ]
+
+    repo = ParcelRepo(fake_session)
+    result = await repo.reprice_unpriced(rate=90.0, id_from=1, id_to=100)
+
+    assert result == 3
+    assert repo.pop_repriced_sessions() == {'abc', 'def'}
+    totals_stmt, update_stmt, stats_stmt, dequeue_stmt = (
+        call.args[0] for call in fake_session.execute.call_args_list)
+    compiled = str(totals_stmt.compile(dialect=mysql.dialect()))
+    assert 'GROUP BY parcels.company_id, parcels.session_id' in compiled
+    assert compiled.endswith('FOR UPDATE')
+    compiled = stats_stmt.compile(dialect=mysql.dialect())
+    assert compiled.params['company_id_m0'] == 3
+    assert compiled.params['priced_count_m0'] == 3
+    assert compiled.params['total_delivery_price_m0'] == 120.0
+    assert 'company_id_m1' not in compiled.params
+    compiled = str(update_stmt.compile(dialect=mysql.dialect()))
+    assert compiled.startswith(
+        'UPDATE parcels, parcel_pricing_outbox SET parcels.delivery_price=')
+    assert 'parcel_pricing_outbox.parcel_id <= %s' in compiled
+    compiled = str(dequeue_stmt.compile(dialect=mysql.dialect()))
+    assert compiled.startswith('DELETE FROM parcel_pricing_outbox USING')
+    assert 'parcels.delivery_price IS NOT NULL' in compiled
+
+
+@pytest.mark.asyncio
+async def test_get_or_create_parcel(mock_session_execute):
+    fake_session, _ = mock_session_execute
+    fake_session.execute.return_value = MagicMock(lastrowid=7)
+
+    repo = ParcelRepo(fake_session)
+    result = await repo.get_or_create_parcel('Box', 1.0, 1, 10.0, 'abc')
+
+    assert result == 7
+    stmt = fake_session.execute.call_args.args[0]
+    assert 'ON DUPLICATE KEY UPDATE id = last_insert_id(parcels.id)' in str(
+        stmt.compile(dialect=mysql.dialect()))
+
+
+@pytest.mark.asyncio
+async def test_get_or_create_parcels(mock_session_execute):
+    fake_session, _ = mock_session_execute
+    fake_session.execute.side_effect = [
+        MagicMock(),
+        MagicMock(all=MagicMock(return_value=[('A', 1), ('B', 2)])),
+    ]
+    parcels_data = [
+        {'name': name, 'weight': 1.0, 'type_id': 1, 'content_value_usd': 5.0}
+        for name in ('A', 'B')
+    ]
+
+    repo = ParcelRepo(fake_session)
+    result = await repo.get_or_create_parcels('abc', parcels_data)
+
+    assert result == {'A': 1, 'B': 2}
+    insert_stmt = fake_session.execute.call_args_list[0].args[0]
+    compiled = str(insert_stmt.compile(dialect=mysql.dialect()))
+    assert compiled.count('(%s, %s, %s, %s, %s, %s, %s)') == 2
+
+
+@pytest.mark.asyncio
+async def test_get_unpriced_ids(mock_session_execute):
+    fake_session, _ = mock_session_execute
+    fake_session.execute.return_value = MagicMock(
+        scalars=MagicMock(return_value=MagicMock(all=MagicMock(
+            return_value=[3, 4]))))
+
+    repo = ParcelRepo(fake_session)
+    result = await repo.get_unpriced_ids(after_id=2, limit=10)
+
+    assert result == [3, 4]
+    stmt = fake_session.execute.call_args.args[0]
+    assert 'parcel_pricing_outbox' not in str(stmt)
+    assert 'parcels.delivery_price IS NULL' in str(stmt)
+    assert 'ORDER BY parcels.id' in str(stmt)
+
+
+@pytest.mark.asyncio
+async def test_enqueue_for_pricing_ignores_duplicates(mock_session_execute):
+    fake_session, _ = mock_session_execute
+    repo = ParcelRepo(fake_session)
+
+    await repo.enqueue_for_pricing([1, 2])
+
+    stmt = fake_session.execute.await_args.args[0]
+    compiled = str(stmt.compile(dialect=mysql.dialect()))
+    assert compiled.startswith('INSERT IGNORE INTO parcel_pricing_outbox')
@@ -0,0 +1,6 @@
+from app.tasks.price_tasks import partition_id_range
+
+
+def test_partition_id_range():
+    assert partition_id_range(1, 25, 10) == [(1, 10), (11, 20), (21, 25)]
+    assert partition_id_range(5, 5, 10) == [(5, 5)]
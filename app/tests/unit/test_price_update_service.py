@@ -0,0 +1,159 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.applications.dataclasses.dataclasses import Tariff
+from app.applications.services.price_update_service import PriceUpdateService
+
+
+@pytest.mark.asyncio
+async def test_update_in_chunks_commits_each_chunk():
+    repo = AsyncMock()
+    repo.get_unpriced_pricing_rows.side_effect = [
+        [(1, 1.0, 100.0, 1, None), (2, 2.0, 100.0, 1, None)],
+        [(3, 1.0, 100.0, 2, 5)],
+    ]
+    repo.set_delivery_prices.side_effect = lambda prices: len(prices)
+    rate_service = AsyncMock()
+    rate_service.get_usd_rub_rate.return_value = 100.0
+
+    updater = PriceUpdateService(parcel_repo=repo, rate_service=rate_service)
+    updated = await updater.update_in_chunks(chunk_size=2)
+
+    assert updated == 3
+    assert repo.commit_chunk.await_count == 2
+    assert [
+        call.args[0] for call in repo.remove_from_pricing_outbox.await_args_list
+    ] == [[1, 2], [3]]
+    assert repo.get_unpriced_pricing_rows.await_args_list[1].kwargs == {
+        'after_id': 2,
+        'limit': 2,
+        'id_to': None,
+        'skip_locked': False,
+    }
+    # (1.0 * 0.5 + 100.0 * 0.01) * 100.0
+    last_prices = repo.set_delivery_prices.await_args.args[0]
+    assert last_prices == {3: pytest.approx(150.0)}
+
+
+@pytest.mark.asyncio
+async def test_update_in_db_batches_by_id_range():
+    repo = AsyncMock()
+    repo.get_unpriced_id_bounds.return_value = (1, 25)
+    repo.reprice_unpriced.side_effect = [10, 10, 5]
+    rate_service = AsyncMock()
+    rate_service.get_usd_rub_rate.return_value = 100.0
+
+    updater = PriceUpdateService(parcel_repo=repo, rate_service=rate_service)
+    updated = await updater.update_in_db(batch_size=10)
+
+    assert updated == 25
+    assert [call.kwargs for call in repo.reprice_unpriced.await_args_list] == [
+        {'rate': 100.0, 'id_from': 1, 'id_to': 10},
+        {'rate': 100.0, 'id_from': 11, 'id_to': 20},
+        {'rate': 100.0, 'id_from': 21, 'id_to': 30},
+    ]
+    assert repo.commit_chunk.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_update_in_db_falls_back_with_custom_tariffs():
+    repo = AsyncMock()
+    repo.get_unpriced_pricing_rows.return_value = []
+    tariff_repo = AsyncMock()
+    tariff_repo.get_all_tariffs.return_value = [
+        Tariff(weight_coefficient=1.0, value_coefficient=0.0, parcel_type_id=1),
+    ]
+    rate_service = AsyncMock()
+    rate_service.get_usd_rub_rate.return_value = 100.0
+
+    updater = PriceUpdateService(
+        parcel_repo=repo,
+        rate_service=rate_service,
+        tariff_repo=tariff_repo,
+    )
+    assert await updater.update_in_db(batch_size=10) == 0
+    repo.reprice_unpriced.assert_not_awaited()
+    repo.get_unpriced_pricing_rows.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_price_parcels_prices_and_clears_outbox():
+    repo = AsyncMock()
+    repo.get_pricing_rows_by_ids.return_value = [(7, 1.0, 100.0, 1, None)]
+    repo.set_delivery_prices.side_effect = lambda prices: len(prices)
+    rate_service = AsyncMock()
+    rate_service.get_usd_rub_rate.return_value = 100.0
+
+    updater = PriceUpdateService(parcel_repo=repo, rate_service=rate_service)
+    updated = await updater.price_parcels([7, 8])
+
+    assert updated == 1
+    assert repo.set_delivery_prices.await_args.args[0] == {
+        7: pytest.approx(150.0)}
+    # Уже рассчитанная посылка 8 тоже удаляется из outbox
+    repo.remove_from_pricing_outbox.assert_awaited_once_with([7, 8])
+    repo.commit_chunk.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_update_in_chunks_id_range_skip_locked():
+    repo = AsyncMock()
+    repo.get_unpriced_pricing_rows.side_effect = [[(10, 1.0, 100.0, 1, None)], []]
+    repo.set_delivery_prices.side_effect = lambda prices: len(prices)
+    rate_service = AsyncMock()
+    rate_service.get_usd_rub_rate.return_value = 100.0
+
+    updater = PriceUpdateService(parcel_repo=repo, rate_service=rate_service)
+    updated = await updater.update_in_chunks(
+        chunk_size=2, id_from=10, id_to=19, skip_locked=True)
+
+    assert updated == 1
+    assert repo.get_unpriced_pricing_rows.await_args_list[0].kwargs == {
+        'after_id': 9,
+        'limit': 2,
+        'id_to': 19,
+        'skip_locked': True,
+    }
+
+
+@pytest.mark.asyncio
+async def test_unpriced_parcel_without_outbox_row_gets_priced():
+    prices = {1: None, 2: 150.0, 3: None, 4: None}
+    outbox = {1}
+
+    def enqueue(parcel_ids):
+        queued = set(parcel_ids) - outbox
+        outbox.update(queued)
+        return len(queued)
+
+    def set_delivery_prices(new_prices):
+        prices.update(new_prices)
+        return len(new_prices)
+
+    repo = AsyncMock()
+    repo.get_unpriced_ids.side_effect = lambda after_id, limit: [
+        parcel_id for parcel_id, price in sorted(prices.items())
+        if price is None and parcel_id > after_id
+    ][:limit]
+    repo.enqueue_for_pricing.side_effect = enqueue
+    repo.get_unpriced_pricing_rows.side_effect = (
+        lambda after_id, limit, id_to, skip_locked: [
+            (parcel_id, 1.0, 100.0, 1, None)
+            for parcel_id in sorted(outbox) if parcel_id > after_id
+        ][:limit])
+    repo.set_delivery_prices.side_effect = set_delivery_prices
+    repo.remove_from_pricing_outbox.side_effect = outbox.difference_update
+    rate_service = AsyncMock()
+    rate_service.get_usd_rub_rate.return_value = 100.0
+    updater = PriceUpdateService(parcel_repo=repo, rate_service=rate_service)
+
+    # Посылок 3 и 4 нет в outbox: пересчёт по очереди их не видит
+    assert await updater.requeue_unpriced(chunk_size=2) == 2
+    assert repo.get_unpriced_ids.await_args_list[1].kwargs == {
+        'after_id': 3, 'limit': 2}
+    assert await updater.update_in_chunks(chunk_size=2) == 3
+
+    assert None not in prices.values()
+    assert outbox == set()
+
@@ -0,0 +1,59 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.applications.services.parcel_services import ParcelService
+from app.tasks.pricing_consumer import PricingConsumer
+from app.utils.settings import PricingSettings
+
+
+@pytest.mark.asyncio
+async def test_consumer_prices_batch_then_acks():
+    stop = asyncio.Event()
+    stream = AsyncMock()
+
+    async def read(**kwargs):
+        stop.set()
+        return ['1-0', '1-1'], [5, 3, 5]
+
+    stream.read.side_effect = read
+    consumer = PricingConsumer(
+        resources=MagicMock(),
+        stream=stream,
+        settings=PricingSettings(),
+        name='test',
+    )
+    consumer.price = AsyncMock(return_value=2)
+    consumer.sweep = AsyncMock(return_value=0)
+
+    await consumer.run(stop)
+
+    stream.ensure_group.assert_awaited_once()
+    consumer.sweep.assert_awaited_once()
+    consumer.price.assert_awaited_once_with([5, 3, 5])
+    stream.ack.assert_awaited_once_with(['1-0', '1-1'])
+
+
+@pytest.mark.asyncio
+async def test_create_parcel_enqueues_and_publishes_after_commit():
+    repo = AsyncMock()
+    repo.get_or_create_parcel.return_value = 42
+    callbacks = []
+    repo.after_commit = callbacks.append
+    stream = AsyncMock()
+    service = ParcelService(parcel_repo=repo, pricing_stream=stream)
+
+    parcel_id = await service.create_parcel(
+        name='Box',
+        weight=1.0,
+        type_id=1,
+        content_value_usd=10.0,
+        session_id='abc',
+    )
+
+    assert parcel_id == 42
+    repo.enqueue_for_pricing.assert_awaited_once_with([42])
+    stream.publish.assert_not_awaited()
+    await callbacks[0]()
+    stream.publish.assert_awaited_once_with([42])
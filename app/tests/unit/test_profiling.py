@@ -0,0 +1,134 @@
+import collections
+import importlib
+import os
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.utils.profiling import ProfileStore, ProfilingMiddleware, Profiler
+from app.utils.settings import ProfilingSettings
+
+
+def _busy_loop(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_profiler_samples_current_thread(tmp_path):
+    settings = ProfilingSettings(
+        PROFILING_OUTPUT_DIR=str(tmp_path), PROFILING_INTERVAL_MS=1)
+    profiler = Profiler(settings, sample_rate=0.0)
+
+    assert profiler.start() is None
+
+    sampler = profiler.start(forced=True)
+    # Пока профиль выполняется, второй не запускается
+    assert profiler.start(forced=True) is None
+    _busy_loop(0.05)
+    path = profiler.finish(sampler, 'unit test')
+
+    assert path.name.endswith('-unit_test.collapsed')
+    lines = path.read_text().splitlines()
+    assert lines
+    assert any('_busy_loop' in line for line in lines)
+    stack, count = lines[0].rsplit(' ', 1)
+    assert int(count) > 0
+    assert profiler.start(forced=True) is not None
+
+
+def test_profile_store_prunes_oldest(tmp_path):
+    store = ProfileStore(str(tmp_path), max_files=2, max_bytes=1024 * 1024)
+    paths = []
+    for index in range(3):
+        path = store.save(f'task-{index}', collections.Counter({'a;b': 1}))
+        os.utime(path, (index, index))
+        paths.append(path)
+
+    remaining = sorted(tmp_path.iterdir())
+    assert len(remaining) == 2
+    assert paths[0] not in remaining
+
+
+@pytest.mark.asyncio
+async def test_profiling_middleware_trusted_header(tmp_path):
+    settings = ProfilingSettings(
+        PROFILING_OUTPUT_DIR=str(tmp_path),
+        PROFILING_TOKEN='secret',
+        PROFILING_INTERVAL_MS=1,
+    )
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, settings=settings)
+
+    @app.get('/items/{item_id}')
+    async def get_item(item_id: int):
+        _busy_loop(0.02)
+        return {'id': item_id}
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url='http://test') as client:
+        await client.get('/items/1', headers={'X-Profile': 'wrong'})
+        assert list(tmp_path.iterdir()) == []
+
+        await client.get('/items/1', headers={'X-Profile': 'secret'})
+
+    [profile] = tmp_path.iterdir()
+    assert profile.name.endswith('-GET_items_item_id.collapsed')
+
+
+@pytest.mark.asyncio
+async def test_profiling_middleware_finishes_off_loop(tmp_path, monkeypatch):
+    settings = ProfilingSettings(
+        PROFILING_OUTPUT_DIR=str(tmp_path),
+        PROFILING_TOKEN='secret',
+        PROFILING_INTERVAL_MS=1,
+    )
+    finish_threads = []
+    original_finish = Profiler.finish
+
+    def finish(self, sampler, label):
+        finish_threads.append(threading.get_ident())
+        return original_finish(self, sampler, label)
+
+    monkeypatch.setattr(Profiler, 'finish', finish)
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, settings=settings)
+
+    @app.get('/items')
+    async def get_items():
+        return []
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url='http://test') as client:
+        await client.get('/items', headers={'X-Profile': 'secret'})
+
+    # Остановка сэмплера и запись профиля не блокируют цикл событий
+    assert finish_threads and finish_threads[0] != threading.get_ident()
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_task_profile_finishes_off_signal_thread(tmp_path, monkeypatch):
+    celery_module = importlib.import_module('app.tasks.celery_app')
+    settings = ProfilingSettings(
+        PROFILING_OUTPUT_DIR=str(tmp_path), PROFILING_INTERVAL_MS=1)
+    profiler = Profiler(settings, sample_rate=1.0)
+    finish_threads = []
+    original_finish = Profiler.finish
+
+    def finish(self, sampler, label):
+        finish_threads.append(threading.get_ident())
+        return original_finish(self, sampler, label)
+
+    monkeypatch.setattr(Profiler, 'finish', finish)
+    monkeypatch.setattr(celery_module, 'task_profiler', profiler)
+    celery_module._task_profiles['task-1'] = profiler.start()
+    task = type('Task', (), {'name': 'app.tasks.sample'})()
+
+    celery_module.on_task_finish('task-1', task, retval=None, state='SUCCESS')
+    celery_module._profile_writer.submit(lambda: None).result(timeout=5)
+
+    assert finish_threads and finish_threads[0] != threading.get_ident()
+    assert len(list(tmp_path.iterdir())) == 1
@@ -0,0 +1,90 @@
+import logging
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.adapters.database.engine import create_engine
+from app.adapters.database.query_tracking import (
+    N_PLUS_ONE_THRESHOLD,
+    parameters_shape,
+    record_query,
+    track_queries,
+)
+from app.adapters.database.settings import MySQLSettings
+
+
+def test_nested_scopes_merge_into_parent():
+    with track_queries('outer') as outer:
+        record_query('SELECT 1', (), False, 0.1, 0)
+        with track_queries('inner') as inner:
+            record_query('SELECT 2', (), False, 0.2, 0)
+            record_query('SELECT 2', (), False, 0.2, 0)
+
+    assert inner.queries == 2
+    assert outer.queries == 3
+    assert outer.statements['SELECT 2'] == 2
+    assert outer.seconds == pytest.approx(0.5)
+
+
+def test_n_plus_one_warning(caplog):
+    with caplog.at_level(logging.WARNING):
+        with track_queries('GET /parcels/', detect_n_plus_one=True):
+            for _ in range(N_PLUS_ONE_THRESHOLD):
+                record_query('SELECT * FROM t WHERE id = %s', (1,), False, 0, 0)
+
+    assert 'Возможный N+1 [GET /parcels/]' in caplog.text
+
+
+def test_slow_query_logs_parameter_types_only(caplog):
+    with caplog.at_level(logging.WARNING):
+        record_query(
+            'SELECT * FROM parcels WHERE name = %s', ('secret',), False, 2.0, 0.5)
+
+    assert 'Медленный запрос 2.000s' in caplog.text
+    assert 'параметры: (str)' in caplog.text
+    assert 'secret' not in caplog.text
+
+
+def test_parameters_shape():
+    assert parameters_shape({'id': 1, 'name': 'a'}) == '{id: int, name: str}'
+    assert parameters_shape([(1, 'a'), (2, 'b')], executemany=True) == '2 x (int, str)'
+
+
+@pytest.mark.asyncio
+async def test_engine_records_queries_in_scope():
+    engine = create_engine(
+        'unit-test-tracking',
+        MySQLSettings(DATABASE_URL='sqlite+aiosqlite:///:memory:'),
+    )
+    try:
+        async with engine.connect() as conn:
+            with track_queries('task') as usage:
+                await conn.execute(text('SELECT 1'))
+                await conn.execute(text('SELECT 1'))
+    finally:
+        await engine.dispose()
+
+    assert usage.queries == 2
+    assert usage.statements['SELECT 1'] == 2
+
+
+@pytest.mark.asyncio
+async def test_engine_failed_query_leaves_no_state():
+    engine = create_engine(
+        'unit-test-tracking-errors',
+        MySQLSettings(DATABASE_URL='sqlite+aiosqlite:///:memory:'),
+    )
+    try:
+        async with engine.connect() as conn:
+            with track_queries('task') as usage:
+                with pytest.raises(OperationalError):
+                    await conn.execute(text('SELECT * FROM missing_table'))
+                await conn.execute(text('SELECT 1'))
+            raw_connection = await conn.get_raw_connection()
+            assert 'query_started' not in raw_connection.info
+    finally:
+        await engine.dispose()
+
+    assert usage.queries == 1
+    assert usage.statements['SELECT 1'] == 1
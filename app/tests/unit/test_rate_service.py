@@ -0,0 +1,139 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.utils.rate import RATES_KEY, RateService, RateSnapshot, _LocalSnapshot
+
+CBR_RESPONSE = {
+    'Date': '2026-10-18T11:30:00+03:00',
+    'Valute': {
+        'USD': {'CharCode': 'USD', 'Nominal': 1, 'Value': 90.0},
+        'JPY': {'CharCode': 'JPY', 'Nominal': 100, 'Value': 60.0},
+    },
+}
+
+
+def make_service(redis_value=None) -> RateService:
+    redis = AsyncMock()
+    redis.get.return_value = redis_value
+    pipe = MagicMock(execute=AsyncMock())
+    redis.pipeline = MagicMock(return_value=MagicMock(
+        __aenter__=AsyncMock(return_value=pipe),
+        __aexit__=AsyncMock(return_value=False),
+    ))
+    return RateService(
+        redis,
+        cbr_url='http://cbr.test',
+        local_ttl_seconds=60,
+        http_client=AsyncMock(),
+    )
+
+
+def test_snapshot_from_cbr_is_per_unit():
+    snapshot = RateSnapshot.from_cbr(CBR_RESPONSE)
+
+    assert snapshot.date == CBR_RESPONSE['Date']
+    assert snapshot.get('USD') == 90.0
+    assert snapshot.get('JPY') == pytest.approx(0.6)
+    assert RateSnapshot.from_json(snapshot.to_json()) == snapshot
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_fetch_once():
+    service = make_service()
+    calls = 0
+
+    async def fake_fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return RateSnapshot.from_cbr(CBR_RESPONSE)
+
+    service._fetch_from_cbr = fake_fetch
+    rates = await asyncio.gather(*(service.get_usd_rub_rate() for _ in range(10)))
+
+    assert rates == [90.0] * 10
+    assert calls == 1
+    pipe = service._redis.pipeline.return_value.__aenter__.return_value
+    pipe.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_local_hit_skips_redis():
+    raw = RateSnapshot.from_cbr(CBR_RESPONSE).to_json()
+    service = make_service(redis_value=raw)
+
+    assert await service.get_usd_rub_rate() == 90.0
+    assert await service.get_rate('JPY') == pytest.approx(0.6)
+    service._redis.get.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_stale_value_served_while_revalidating():
+    service = make_service()
+    service._local[RATES_KEY] = _LocalSnapshot(
+        value=RateSnapshot(date='old', rates={'USD': 80.0}),
+        stored_at=time.monotonic() - 120,
+    )
+    service._fetch_from_cbr = AsyncMock(
+        return_value=RateSnapshot.from_cbr(CBR_RESPONSE))
+
+    assert await service.get_usd_rub_rate() == 80.0
+    await service._refresh_tasks[RATES_KEY]
+    assert await service.get_usd_rub_rate() == 90.0
+
+
+@pytest.mark.asyncio
+async def test_cbr_failure_falls_back_to_last_good():
+    last_good = RateSnapshot(date='yesterday', rates={'USD': 85.0}).to_json()
+    service = make_service()
+    service._redis.get.side_effect = [None, last_good]
+    service._fetch_from_cbr = AsyncMock(side_effect=RuntimeError('timeout'))
+
+    snapshot = await service.get_snapshot()
+
+    assert snapshot.stale is True
+    assert snapshot.get('USD') == 85.0
+
+
+@pytest.mark.asyncio
+async def test_stale_rate_is_reported(caplog):
+    last_good = RateSnapshot(date='yesterday', rates={'USD': 85.0}).to_json()
+    service = make_service()
+    service._redis.get.side_effect = [None, last_good]
+    service._fetch_from_cbr = AsyncMock(side_effect=RuntimeError('timeout'))
+    labels = {'currency': 'USD'}
+    before = REGISTRY.get_sample_value('rate_stale_uses_total', labels) or 0.0
+
+    assert await service.get_usd_rub_rate() == 85.0
+    # Устаревший снимок отдаётся из памяти процесса до local_ttl_seconds
+    assert await service.get_usd_rub_rate() == 85.0
+
+    assert REGISTRY.get_sample_value(
+        'rate_stale_uses_total', labels) == before + 2
+    assert 'устаревшего снимка на yesterday' in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_fresh_rate_is_not_reported():
+    raw = RateSnapshot.from_cbr(CBR_RESPONSE).to_json()
+    service = make_service(redis_value=raw)
+    labels = {'currency': 'USD'}
+    before = REGISTRY.get_sample_value('rate_stale_uses_total', labels) or 0.0
+
+    assert await service.get_usd_rub_rate() == 90.0
+    assert (
+        REGISTRY.get_sample_value('rate_stale_uses_total', labels) or 0.0
+    ) == before
+
+
+@pytest.mark.asyncio
+async def test_cbr_failure_without_last_good_raises():
+    service = make_service()
+    service._fetch_from_cbr = AsyncMock(side_effect=RuntimeError('timeout'))
+
+    with pytest.raises(RuntimeError):
+        await service.get_usd_rub_rate()
@@ -0,0 +1,60 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.applications.dataclasses.dataclasses import Company, ParcelType
+from app.applications.services.company_service import CompanyService
+from app.utils.reference_cache import ReferenceDataCache
+
+PARCEL_TYPES = [ParcelType(id=1, name='Одежда'), ParcelType(id=2, name='Разное')]
+COMPANIES = [Company(id=1, name='DHL')]
+
+
+@pytest.mark.asyncio
+async def test_ensure_loaded_queries_once():
+    cache = ReferenceDataCache()
+    loader = AsyncMock(return_value=(PARCEL_TYPES, COMPANIES))
+
+    await cache.ensure_loaded(loader)
+    await cache.ensure_loaded(loader)
+
+    loader.assert_awaited_once()
+    assert cache.get_type_names() == {1: 'Одежда', 2: 'Разное'}
+    assert cache.get_companies() == COMPANIES
+
+
+@pytest.mark.asyncio
+async def test_invalidate_during_load_discards_result():
+    cache = ReferenceDataCache()
+
+    async def loader():
+        cache.invalidate()
+        return PARCEL_TYPES, COMPANIES
+
+    await cache.ensure_loaded(loader)
+
+    assert not cache.is_loaded
+
+
+@pytest.mark.asyncio
+async def test_create_company_publishes_version_after_commit():
+    cache = ReferenceDataCache()
+    cache.load(PARCEL_TYPES, COMPANIES)
+    cache._redis = AsyncMock()
+    cache._redis.incr.return_value = 7
+    company_repo = AsyncMock()
+    callbacks = []
+    company_repo.after_commit = callbacks.append
+    service = CompanyService(company_repo=company_repo, reference_cache=cache)
+
+    await service.create_company('UPS')
+    assert cache.is_loaded
+    cache._redis.publish.assert_not_awaited()
+
+    await callbacks[0]()
+    assert not cache.is_loaded
+    cache._redis.publish.assert_awaited_once()
+    # Собственное оповещение, пришедшее через pub/sub, не сбрасывает кеш
+    cache.load(PARCEL_TYPES, COMPANIES)
+    cache._on_version(7)
+    assert cache.is_loaded
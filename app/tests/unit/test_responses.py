@@ -0,0 +1,95 @@
+import pytest
+from fastapi import Depends, FastAPI, Response
+from fastapi.responses import StreamingResponse
+from httpx import ASGITransport, AsyncClient
+
+from app.adapters.http_api.responses import (
+    copy_response_headers,
+    fast_json_response,
+)
+from app.adapters.http_api.schemas.schemas import (
+    ParcelDetailResponse,
+    ParcelListResponse,
+)
+from app.applications.services.parcel_services import parcel_view
+
+
+def _set_session_cookie(response: Response) -> None:
+    response.set_cookie('session_id', 'abc', httponly=True)
+
+
+def _make_app(rows) -> FastAPI:
+    app = FastAPI()
+
+    @app.get('/parcels', response_model=list[ParcelListResponse],
+             dependencies=[Depends(_set_session_cookie)])
+    async def list_parcels(response: Response):
+        response.headers['X-Next-Cursor'] = 'next'
+        return fast_json_response(
+            [parcel_view(row, 'Одежда') for row in rows],
+            response,
+        )
+
+    return app
+
+
+@pytest.mark.asyncio
+async def test_fast_response_matches_response_model(parcel_row):
+    priced = parcel_row._replace(id=2, delivery_price=1520.5)
+    app = _make_app([parcel_row, priced])
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url='http://test',
+    ) as client:
+        response = await client.get('/parcels')
+
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/json'
+    assert response.headers['x-next-cursor'] == 'next'
+    assert response.cookies['session_id'] == 'abc'
+    # Тело совпадает с тем, что FastAPI отдал бы через response_model
+    expected = [
+        ParcelListResponse.model_validate(item).model_dump(mode='json')
+        for item in response.json()
+    ]
+    assert response.json() == expected
+    assert expected[0]['delivery_price'] == 'Не рассчитано'
+    assert expected[0]['created_at'] == '2024-05-01T12:30:15'
+    assert expected[1]['delivery_price'] == 1520.5
+
+    detail = parcel_view(priced, 'Одежда')
+    assert ParcelDetailResponse.model_validate(detail).delivery_price == 1520.5
+
+
+def test_fast_response_keeps_openapi_schema(parcel_row):
+    schema = _make_app([parcel_row]).openapi()
+
+    response_schema = (
+        schema['paths']['/parcels']['get']['responses']['200']
+        ['content']['application/json']['schema'])
+    assert response_schema['items'] == {
+        '$ref': '#/components/schemas/ParcelListResponse'}
+
+
+@pytest.mark.asyncio
+async def test_streaming_response_keeps_dependency_headers():
+    app = FastAPI()
+
+    @app.get('/export', dependencies=[Depends(_set_session_cookie)])
+    async def export(response: Response):
+        async def rows():
+            yield b'{}\n'
+
+        return copy_response_headers(
+            StreamingResponse(rows(), media_type='application/x-ndjson'),
+            response,
+        )
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url='http://test',
+    ) as client:
+        response = await client.get('/export')
+
+    assert response.cookies['session_id'] == 'abc'
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    assert response.text == '{}\n'
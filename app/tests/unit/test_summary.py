@@ -0,0 +1,260 @@
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+import pytest_asyncio
+from fakeredis import aioredis
+from sqlalchemy import insert
+
+from app.adapters.database.engine import create_engine, create_session_factory
+from app.adapters.database.hooks import run_after_commit
+from app.adapters.database.repositories.parcel_repo import ParcelRepo
+from app.adapters.database.settings import MySQLSettings
+from app.adapters.database.tables import company, metadata, parcel_types, parcels
+from app.applications.dataclasses.dataclasses import BulkBindResult, Company
+from app.applications.services.errors.errors import CompanyNotFoundError
+from app.applications.services.parcel_services import ParcelService
+from app.applications.services.price_update_service import PriceUpdateService
+from app.utils.reference_cache import ReferenceDataCache
+from app.utils.summary_cache import ParcelSummaryCache
+
+
+@pytest_asyncio.fixture
+async def summary_session():
+    engine = create_engine(
+        'unit-test-summary',
+        MySQLSettings(DATABASE_URL='sqlite+aiosqlite:///:memory:'),
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(metadata.create_all)
+        await conn.execute(
+            insert(parcel_types), [{'name': 'одежда'}, {'name': 'разное'}])
+        await conn.execute(insert(company), [{'name': 'Почта'}])
+        await conn.execute(insert(parcels), [
+            {
+                'session_id': 'abc' if index < 5 else 'other',
+                'name': f'parcel-{index}',
+                'weight': 1.0 + index,
+                'type_id': 1 if index < 3 else 2,
+                'content_value_usd': 10.0,
+                'delivery_price': 100.0 if index % 2 else None,
+                'company_id': 1 if index == 0 else None,
+                'created_at': datetime(2024, 5, 1, 12, 0, index),
+            }
+            for index in range(7)
+        ])
+    try:
+        async with create_session_factory(engine)() as session:
+            yield session
+    finally:
+        await engine.dispose()
+
+
+@pytest.fixture
+def summary_cache():
+    return ParcelSummaryCache(aioredis.FakeRedis(), ttl_seconds=30)
+
+
+@pytest.mark.asyncio
+async def test_summarize_by_type(summary_session):
+    rows = await ParcelRepo(summary_session).summarize_by_type('abc')
+
+    assert [tuple(row) for row in rows] == [
+        (1, 3, 1, 1, 6.0, 100.0),
+        (2, 2, 1, 0, 9.0, 100.0),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_get_summary_is_cached(summary_session, summary_cache):
+    repo = ParcelRepo(summary_session)
+    service = ParcelService(parcel_repo=repo, summary_cache=summary_cache)
+
+    summary = await service.get_summary('abc')
+
+    assert summary['types'][0] == {
+        'type_id': 1,
+        'type_name': 'одежда',
+        'parcel_count': 3,
+        'priced_count': 1,
+        'bound_count': 1,
+        'total_weight': 6.0,
+        'total_delivery_price': 100.0,
+    }
+    assert summary['total'] == {
+        'parcel_count': 5,
+        'priced_count': 2,
+        'bound_count': 1,
+        'total_weight': 15.0,
+        'total_delivery_price': 200.0,
+    }
+
+    repo.summarize_by_type = AsyncMock()
+    assert await service.get_summary('abc') == summary
+    repo.summarize_by_type.assert_not_awaited()
+
+    await summary_cache.invalidate(['abc'])
+    assert (await summary_cache.get('abc'))[0] is None
+
+
+@pytest.mark.asyncio
+async def test_summary_not_cached_after_concurrent_invalidation(
+    summary_session, summary_cache,
+):
+    repo = ParcelRepo(summary_session)
+    service = ParcelService(parcel_repo=repo, summary_cache=summary_cache)
+    summarize_by_type = repo.summarize_by_type
+
+    # Посылки сессии меняются и кеш сбрасывается, пока сводка
+    # читается из БД
+    async def summarize_during_commit(session_id):
+        rows = await summarize_by_type(session_id)
+        await summary_cache.invalidate([session_id])
+        return rows
+
+    repo.summarize_by_type = summarize_during_commit
+    await service.get_summary('abc')
+    assert (await summary_cache.get('abc'))[0] is None
+
+    repo.summarize_by_type = summarize_by_type
+    summary = await service.get_summary('abc')
+    assert (await summary_cache.get('abc'))[0] == summary
+
+
+@pytest.mark.asyncio
+async def test_get_summary_empty_session(summary_session):
+    service = ParcelService(parcel_repo=ParcelRepo(summary_session))
+
+    assert await service.get_summary('missing') == {
+        'types': [],
+        'total': {
+            'parcel_count': 0,
+            'priced_count': 0,
+            'bound_count': 0,
+            'total_weight': 0,
+            'total_delivery_price': 0,
+        },
+    }
+
+
+@pytest.mark.asyncio
+async def test_create_parcels_bulk_names_follow_collation():
+    repo = AsyncMock()
+    repo.after_commit = MagicMock()
+    # MySQL возвращает название в том виде, в каком оно сохранено
+    repo.get_or_create_parcels.return_value = {'Box': 7}
+    service = ParcelService(parcel_repo=repo)
+    parcel = {'weight': 1.0, 'type_id': 1, 'content_value_usd': 10.0}
+
+    parcel_ids = await service.create_parcels_bulk(
+        parcels=[
+            {'name': name, **parcel} for name in ['Box', 'box ', 'BOX']],
+        session_id='abc',
+    )
+
+    assert parcel_ids == [7, 7, 7]
+    parcels_data = repo.get_or_create_parcels.await_args.kwargs['parcels_data']
+    assert [item['name'] for item in parcels_data] == ['Box']
+
+
+@pytest.mark.asyncio
+async def test_bind_invalidates_summary_after_commit(summary_cache):
+    await summary_cache.set('abc', {'types': [], 'total': {}}, None)
+    session = MagicMock(info={})
+    repo = ParcelRepo(session)
+    repo.bind_company_to_parcel = AsyncMock(return_value='abc')
+    service = ParcelService(parcel_repo=repo, summary_cache=summary_cache)
+
+    await service.bind_company_to_parcel(parcel_id=1, company_id=1)
+    assert (await summary_cache.get('abc'))[0] is not None
+
+    await run_after_commit(session)
+    assert (await summary_cache.get('abc'))[0] is None
+
+
+@pytest.mark.asyncio
+async def test_bulk_bind_outcomes_and_invalidation(summary_cache):
+    await summary_cache.set('abc', {'types': [], 'total': {}}, None)
+    session = MagicMock(info={})
+    repo = ParcelRepo(session)
+    repo.company_exists = AsyncMock(return_value=True)
+    repo.bind_company_to_parcels = AsyncMock(return_value=BulkBindResult(
+        bound=[1, 3], already_bound=[2], missing=[4], session_ids={'abc'}))
+    service = ParcelService(parcel_repo=repo, summary_cache=summary_cache)
+
+    results = await service.bind_company_to_parcels(
+        parcel_ids=[3, 2, 4, 3, 1], company_id=1)
+
+    assert results == [
+        {'parcel_id': 3, 'status': 'bound'},
+        {'parcel_id': 2, 'status': 'already_bound'},
+        {'parcel_id': 4, 'status': 'missing'},
+        {'parcel_id': 1, 'status': 'bound'},
+    ]
+    await run_after_commit(session)
+    assert (await summary_cache.get('abc'))[0] is None
+
+
+@pytest.mark.asyncio
+async def test_bulk_bind_unknown_company(summary_session):
+    repo = ParcelRepo(summary_session)
+    repo.bind_company_to_parcels = AsyncMock()
+    service = ParcelService(parcel_repo=repo)
+
+    with pytest.raises(CompanyNotFoundError):
+        await service.bind_company_to_parcels(
+            parcel_ids=[1, 2], company_id=999999999)
+    repo.bind_company_to_parcels.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_bulk_bind_company_checked_by_reference_cache():
+    cache = ReferenceDataCache()
+    cache.load([], [Company(id=1, name='Почта')])
+    repo = AsyncMock()
+    repo.company_exists.return_value = False
+    repo.bind_company_to_parcels.return_value = BulkBindResult(
+        bound=[1], already_bound=[], missing=[], session_ids=set())
+    service = ParcelService(parcel_repo=repo, reference_cache=cache)
+
+    await service.bind_company_to_parcels(parcel_ids=[1], company_id=1)
+    repo.company_exists.assert_not_awaited()
+
+    with pytest.raises(CompanyNotFoundError):
+        await service.bind_company_to_parcels(parcel_ids=[1], company_id=2)
+    repo.company_exists.assert_awaited_once_with(2)
+
+
+@pytest.mark.asyncio
+async def test_price_parcels_invalidates_summaries(summary_cache):
+    for session_id in ('abc', 'def', 'other'):
+        await summary_cache.set(session_id, {'types': [], 'total': {}}, None)
+    repo = AsyncMock()
+    repo.get_pricing_rows_by_ids.return_value = [(1, 1.0, 100.0, 1, None)]
+    repo.set_delivery_prices.return_value = 1
+    repo.pop_repriced_sessions = MagicMock(return_value={'abc', 'def'})
+    rate_service = AsyncMock()
+    rate_service.get_usd_rub_rate.return_value = 100.0
+
+    updater = PriceUpdateService(
+        parcel_repo=repo,
+        rate_service=rate_service,
+        summary_cache=summary_cache,
+    )
+    await updater.price_parcels([1])
+
+    repo.commit_chunk.assert_awaited_once()
+    assert (await summary_cache.get('abc'))[0] is None
+    assert (await summary_cache.get('def'))[0] is None
+    assert (await summary_cache.get('other'))[0] is not None
+
+
+@pytest.mark.asyncio
+async def test_summary_cache_disabled():
+    redis = AsyncMock()
+    cache = ParcelSummaryCache(redis, ttl_seconds=0)
+
+    await cache.set('abc', {'types': [], 'total': {}}, None)
+    assert await cache.get('abc') == (None, None)
+    await cache.invalidate(['abc'])
+    assert redis.mock_calls == []
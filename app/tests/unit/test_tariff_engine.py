@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from app.applications.dataclasses.dataclasses import Tariff, WeightBracket
+from app.applications.services.tariff_engine import TariffEngine
+
+
+def test_default_tariff_matches_legacy_formula():
+    engine = TariffEngine()
+    prices = engine.price(
+        weights=np.array([1.0, 2.5]),
+        values=np.array([100.0, 40.0]),
+        type_ids=np.array([1, 2]),
+        company_ids=np.array([0, 3]),
+        rate=90.0,
+    )
+
+    assert engine.is_default
+    assert prices.tolist() == pytest.approx([
+        (1.0 * 0.5 + 100.0 * 0.01) * 90.0,
+        (2.5 * 0.5 + 40.0 * 0.01) * 90.0,
+    ])
+
+
+def test_tariff_priority_brackets_and_min_charge():
+    engine = TariffEngine([
+        Tariff(
+            weight_coefficient=1.0,
+            value_coefficient=0.0,
+            parcel_type_id=1,
+            weight_brackets=[WeightBracket(weight_from=10.0,
+                                           weight_coefficient=0.5)],
+        ),
+        Tariff(weight_coefficient=2.0, value_coefficient=0.0, company_id=7),
+        Tariff(
+            weight_coefficient=3.0,
+            value_coefficient=0.0,
+            min_charge_usd=50.0,
+            parcel_type_id=1,
+            company_id=7,
+        ),
+    ])
+    prices = engine.price(
+        weights=np.array([2.0, 20.0, 2.0, 2.0, 2.0]),
+        values=np.zeros(5),
+        type_ids=np.array([1, 1, 2, 1, 3]),
+        company_ids=np.array([0, 0, 7, 7, 0]),
+        rate=1.0,
+    )
+
+    assert prices.tolist() == pytest.approx([
+        2.0,   # тариф типа 1
+        10.0,  # тариф типа 1, диапазон от 10 кг
+        4.0,   # тариф компании 7
+        50.0,  # тариф (компания 7, тип 1) с минимальной стоимостью
+        1.0,   # тариф по умолчанию
+    ])
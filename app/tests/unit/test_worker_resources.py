@@ -0,0 +1,18 @@
+import pytest
+
+from app.tasks import resources
+
+
+@pytest.mark.asyncio
+async def test_worker_resources_created_once_and_closed():
+    first = resources.init_worker_resources()
+    assert resources.init_worker_resources() is first
+    assert resources.get_worker_resources() is first
+    assert first.rate_service._redis is first.redis
+
+    await resources.close_worker_resources()
+
+    assert resources._resources is None
+    assert first.rate_service._http.is_closed
+    assert resources.get_worker_resources() is not first
+    await resources.close_worker_resources()
@@ -1 +1 @@
-from .constants import ParcelsConstants
+from .constants import ParcelsConstants, PricingConstants
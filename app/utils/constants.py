@@ -8,6 +8,24 @@ class ParcelsConstants(str, Enum):
 	NOT_MEANT = 'Не рассчитано'
 
 
+class BulkConstants(int, Enum):
+	"""
+	Ограничения пакетных операций.
+	"""
+	MAX_PARCELS = 1000  # посылок в одном запросе POST /parcels/bulk
+	MAX_BIND_PARCELS = 5000  # посылок в запросе POST /parcels/bind_company/bulk
+	BIND_CHUNK_SIZE = 1000  # ID в одном UPDATE пакетной привязки
+
+
+class PricingConstants(float, Enum):
+	"""
+	Коэффициенты формулы расчёта стоимости доставки:
+	(вес * WEIGHT_COEFFICIENT + стоимость содержимого * VALUE_COEFFICIENT) * курс
+	"""
+	WEIGHT_COEFFICIENT = 0.5
+	VALUE_COEFFICIENT = 0.01
+
+
 class CookiesConstants(Enum):
 	"""
 	Константы, используемые для работы с cookie в рамках пользовательской сессии.
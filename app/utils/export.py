@@ -0,0 +1,44 @@
+import csv
+import io
+from collections.abc import Iterable, Sequence
+
+import orjson
+
+# Форматы выгрузки: MIME-тип и расширение файла
+EXPORT_FORMATS = {
+	'ndjson': ('application/x-ndjson', 'ndjson'),
+	'csv': ('text/csv', 'csv'),
+}
+
+
+def encode_ndjson(fields: Sequence[str], rows: Iterable[Sequence]) -> bytes:
+	"""
+	Кодирует строки в NDJSON: по одному JSON-объекту на строку.
+
+	:param fields: Имена колонок
+	:param rows: Строки в порядке колонок
+	:return: Фрагмент ответа
+	"""
+	return b''.join(
+		orjson.dumps(dict(zip(fields, row))) + b'\n' for row in rows)
+
+
+def encode_csv(
+	fields: Sequence[str],
+	rows: Iterable[Sequence],
+	header: bool = False,
+) -> bytes:
+	"""
+	Кодирует строки в CSV; None записывается пустым значением.
+
+	:param fields: Имена колонок
+	:param rows: Строки в порядке колонок
+	:param header: Добавить строку заголовка
+	:return: Фрагмент ответа
+	"""
+	buffer = io.StringIO()
+	writer = csv.writer(buffer)
+	if header:
+		writer.writerow(fields)
+	writer.writerows(rows)
+	return buffer.getvalue().encode()
@@ -0,0 +1,167 @@
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import (
+	CONTENT_TYPE_LATEST,
+	Counter,
+	Gauge,
+	Histogram,
+	generate_latest,
+	start_http_server,
+)
+
+from app.adapters.database.query_tracking import QueryUsage, track_queries
+
+# Границы корзин для количества SQL-запросов на один HTTP-запрос
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+HTTP_REQUEST_DURATION = Histogram(
+	'http_request_duration_seconds',
+	'Длительность обработки HTTP-запроса',
+	['method', 'route', 'status'],
+)
+HTTP_REQUEST_DB_QUERIES = Histogram(
+	'http_request_db_queries',
+	'Количество SQL-запросов на один HTTP-запрос',
+	['route'],
+	buckets=QUERY_COUNT_BUCKETS,
+)
+HTTP_REQUEST_DB_SECONDS = Histogram(
+	'http_request_db_seconds',
+	'Суммарное время SQL-запросов на один HTTP-запрос',
+	['route'],
+)
+DB_QUERY_DURATION = Histogram(
+	'db_query_duration_seconds',
+	'Длительность SQL-запроса',
+	['engine'],
+)
+RATE_CACHE_LOOKUPS = Counter(
+	'rate_cache_lookups_total',
+	'Обращения к кешам курсов валют по уровню кеша и результату',
+	['layer', 'result'],
+)
+STALE_RATE_USES = Counter(
+	'rate_stale_uses_total',
+	'Курсы валют, отданные из последнего удачного снимка при недоступном ЦБ',
+	['currency'],
+)
+CBR_FETCH_DURATION = Histogram(
+	'cbr_fetch_duration_seconds',
+	'Длительность запроса курсов к API ЦБ РФ',
+	['outcome'],
+)
+REPRICED_PARCELS = Counter(
+	'repricing_parcels_total',
+	'Количество посылок, получивших стоимость доставки',
+	['source'],
+)
+PRICING_BACKLOG = Gauge(
+	'pricing_backlog_parcels',
+	'Количество посылок в очереди расчёта стоимости доставки',
+)
+LOG_RECORDS_DROPPED = Counter(
+	'log_records_dropped',
+	'Записи лога, отброшенные из-за переполнения очереди логирования',
+)
+CELERY_TASK_DURATION = Histogram(
+	'celery_task_duration_seconds',
+	'Длительность выполнения задачи Celery',
+	['task', 'state'],
+)
+CELERY_TASK_DB_QUERIES = Histogram(
+	'celery_task_db_queries',
+	'Количество SQL-запросов на одну задачу Celery',
+	['task'],
+	buckets=QUERY_COUNT_BUCKETS + (500, 1000, 5000),
+)
+CELERY_TASK_DB_SECONDS = Histogram(
+	'celery_task_db_seconds',
+	'Суммарное время SQL-запросов на одну задачу Celery',
+	['task'],
+)
+
+
+@contextmanager
+def track_task_queries(task_name: str) -> Iterator[QueryUsage]:
+	"""
+	Учитывает SQL-запросы задачи Celery в метриках задачи.
+
+	Области учёта задаются в теле async-задачи: сигналы Celery
+	отправляются из другого потока, чем выполняется задача.
+
+	:param task_name: Имя задачи
+	:return: QueryUsage задачи
+	"""
+	with track_queries(task_name) as usage:
+		try:
+			yield usage
+		finally:
+			CELERY_TASK_DB_QUERIES.labels(task_name).observe(usage.queries)
+			CELERY_TASK_DB_SECONDS.labels(task_name).observe(usage.seconds)
+
+
+class MetricsMiddleware:
+	"""
+	ASGI-middleware, собирающее длительность HTTP-запросов по шаблону
+	маршрута, а также количество и время SQL-запросов на запрос.
+	Повторяющиеся в запросе SQL-запросы (N+1) пишутся в лог.
+
+	Шаблон маршрута (/parcels/{parcel_id}) берётся из scope после
+	маршрутизации, поэтому число рядов метрик не зависит от значений
+	параметров пути. Запросы без маршрута учитываются как 'unmatched'.
+	"""
+
+	def __init__(self, app):
+		self.app = app
+
+	async def __call__(self, scope, receive, send):
+		if scope['type'] != 'http':
+			await self.app(scope, receive, send)
+			return
+
+		status_code = 500
+
+		async def send_with_status(message):
+			nonlocal status_code
+			if message['type'] == 'http.response.start':
+				status_code = message['status']
+			await send(message)
+
+		started = time.perf_counter()
+		label = f'{scope["method"]} {scope["path"]}'
+		with track_queries(label, detect_n_plus_one=True) as usage:
+			try:
+				await self.app(scope, receive, send_with_status)
+			finally:
+				duration = time.perf_counter() - started
+				route = scope.get('route')
+				route_path = route.path if route is not None else 'unmatched'
+				usage.label = f'{scope["method"]} {route_path}'
+				HTTP_REQUEST_DURATION.labels(
+					scope['method'], route_path, status_code).observe(duration)
+				HTTP_REQUEST_DB_QUERIES.labels(route_path).observe(
+					usage.queries)
+				HTTP_REQUEST_DB_SECONDS.labels(route_path).observe(
+					usage.seconds)
+
+
+def render_metrics() -> tuple[bytes, str]:
+	"""
+	Возвращает метрики процесса в текстовом формате Prometheus.
+
+	:return: Тело ответа и его Content-Type
+	"""
+	return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def start_metrics_server(port: int) -> None:
+	"""
+	Запускает HTTP-сервер /metrics в отдельном потоке (для процессов
+	без веб-приложения: Celery-воркер, потребитель потока).
+
+	:param port: Порт сервера (0 — не запускать)
+	"""
+	if port:
+		start_http_server(port)
@@ -0,0 +1,41 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any
+
+
+def encode_cursor(*values: Any) -> str:
+	"""
+	Кодирует значения ключа сортировки последней записи страницы
+	в непрозрачный курсор (base64url от JSON).
+
+	:param values: Значения ключа (datetime сериализуется в ISO-формат)
+	:return: Строка курсора
+	"""
+	raw = json.dumps(
+		[
+			value.isoformat() if isinstance(value, datetime) else value
+			for value in values
+		],
+		separators=(',', ':'),
+	)
+	return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> list:
+	"""
+	Раскодирует курсор, полученный от encode_cursor.
+
+	:param cursor: Строка курсора
+	:return: Список значений ключа сортировки
+	:raises ValueError: Если курсор повреждён
+	"""
+	padded = cursor + '=' * (-len(cursor) % 4)
+	try:
+		values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+	except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+		raise ValueError('Некорректный курсор') from e
+	if not isinstance(values, list):
+		raise ValueError('Некорректный курсор')
+	return values
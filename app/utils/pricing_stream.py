@@ -0,0 +1,129 @@
+import logging
+
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+logger = logging.getLogger(__name__)
+
+# Поток Redis с ID новых посылок, ожидающих расчёта стоимости доставки
+PRICING_STREAM_KEY = 'PARCEL_PRICING:stream'
+# Группа потребителей потока
+PRICING_GROUP = 'pricing'
+# Приблизительная максимальная длина потока (XADD MAXLEN ~)
+PRICING_STREAM_MAXLEN = 100_000
+# Через сколько миллисекунд неподтверждённое сообщение считается зависшим
+# (потребитель остановился между расчётом и подтверждением)
+STALE_MESSAGE_IDLE_MS = 60_000
+
+
+class PricingStream:
+	"""
+	Поток Redis с оповещениями о посылках, которым нужен расчёт стоимости.
+
+	Одно сообщение содержит ID всех посылок, созданных в одной транзакции.
+	Поток — быстрый путь доставки; источником истины остаётся outbox
+	в БД, поэтому потеря сообщения лишь откладывает расчёт до сверки
+	outbox потребителем.
+	"""
+
+	def __init__(self, redis: Redis):
+		"""
+		:param redis: Подключение к Redis (decode_responses=True)
+		"""
+		self._redis = redis
+
+	async def publish(self, parcel_ids: list[int]) -> None:
+		"""
+		Публикует ID посылок в поток.
+
+		:param parcel_ids: ID посылок
+		"""
+		if not parcel_ids:
+			return
+		await self._redis.xadd(
+			PRICING_STREAM_KEY,
+			{'ids': ','.join(map(str, parcel_ids))},
+			maxlen=PRICING_STREAM_MAXLEN,
+			approximate=True,
+		)
+
+	async def ensure_group(self) -> None:
+		"""
+		Создаёт группу потребителей (и сам поток), если их ещё нет.
+		"""
+		try:
+			await self._redis.xgroup_create(
+				PRICING_STREAM_KEY, PRICING_GROUP, id='0', mkstream=True)
+		except ResponseError as e:
+			if 'BUSYGROUP' not in str(e):
+				raise
+
+	async def read(
+		self,
+		consumer: str,
+		count: int,
+		block_ms: int,
+	) -> tuple[list[str], list[int]]:
+		"""
+		Читает новые сообщения группы, ожидая не дольше block_ms.
+
+		:param consumer: Имя потребителя в группе
+		:param count: Максимальное количество сообщений
+		:param block_ms: Время ожидания сообщений в миллисекундах
+		:return: ID сообщений и ID посылок из них
+		"""
+		response = await self._redis.xreadgroup(
+			PRICING_GROUP,
+			consumer,
+			{PRICING_STREAM_KEY: '>'},
+			count=count,
+			block=block_ms,
+		)
+		message_ids: list[str] = []
+		parcel_ids: list[int] = []
+		for _, messages in response or []:
+			for message_id, fields in messages:
+				message_ids.append(message_id)
+				parcel_ids.extend(
+					int(parcel_id)
+					for parcel_id in fields.get('ids', '').split(',')
+					if parcel_id
+				)
+		return message_ids, parcel_ids
+
+	async def ack(self, message_ids: list[str]) -> None:
+		"""
+		Подтверждает обработку сообщений и удаляет их из потока.
+
+		:param message_ids: ID сообщений
+		"""
+		if not message_ids:
+			return
+		async with self._redis.pipeline(transaction=False) as pipe:
+			pipe.xack(PRICING_STREAM_KEY, PRICING_GROUP, *message_ids)
+			pipe.xdel(PRICING_STREAM_KEY, *message_ids)
+			await pipe.execute()
+
+	async def ack_stale(self, consumer: str, count: int = 1000) -> int:
+		"""
+		Подтверждает сообщения, зависшие у остановленных потребителей,
+		чтобы они не копились в списке ожидания группы.
+
+		Сами посылки из таких сообщений рассчитываются сверкой outbox,
+		поэтому сообщения повторно не обрабатываются.
+
+		:param consumer: Имя потребителя, на которого забираются сообщения
+		:param count: Максимальное количество сообщений за вызов
+		:return: Количество подтверждённых сообщений
+		"""
+		# С justid=True redis-py возвращает только список ID сообщений
+		message_ids = await self._redis.xautoclaim(
+			PRICING_STREAM_KEY,
+			PRICING_GROUP,
+			consumer,
+			min_idle_time=STALE_MESSAGE_IDLE_MS,
+			count=count,
+			justid=True,
+		)
+		await self.ack(message_ids)
+		return len(message_ids)
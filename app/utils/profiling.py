@@ -0,0 +1,252 @@
+import asyncio
+import collections
+import datetime
+import hmac
+import logging
+import os
+import random
+import re
+import sys
+import threading
+from pathlib import Path
+
+from app.utils.settings import ProfilingSettings
+
+logger = logging.getLogger(__name__)
+
+# Расширение файлов профилей (формат collapsed stacks для flamegraph.pl,
+# speedscope, inferno)
+PROFILE_SUFFIX = '.collapsed'
+
+
+def _frame_name(frame) -> str:
+	code = frame.f_code
+	return (
+		f'{code.co_qualname} '
+		f'({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+	)
+
+
+def collapse_stack(frame) -> str:
+	"""
+	Сворачивает стек вызовов в строку формата collapsed stacks:
+	кадры от корня к вершине через ';'.
+
+	:param frame: Верхний кадр стека потока
+	:return: Свёрнутый стек
+	"""
+	names = []
+	while frame is not None:
+		names.append(_frame_name(frame))
+		frame = frame.f_back
+	return ';'.join(reversed(names)).replace('\n', ' ')
+
+
+class StackSampler:
+	"""
+	Статистический профилировщик одного потока: фоновый поток раз
+	в interval секунд снимает стек профилируемого потока через
+	sys._current_frames() и считает одинаковые стеки.
+
+	Профилируемый код не инструментируется, поэтому накладные расходы
+	определяются только частотой снятия стеков.
+	"""
+
+	def __init__(self, thread_id: int, interval: float):
+		"""
+		:param thread_id: Идентификатор профилируемого потока
+		:param interval: Интервал между снятиями стека, в секундах
+		"""
+		self._thread_id = thread_id
+		self._interval = interval
+		self._stop = threading.Event()
+		self._thread: threading.Thread | None = None
+		self.samples: collections.Counter[str] = collections.Counter()
+
+	def start(self) -> None:
+		self._thread = threading.Thread(
+			target=self._run, name='profiler-sampler', daemon=True)
+		self._thread.start()
+
+	def stop(self) -> collections.Counter[str]:
+		"""
+		Останавливает снятие стеков.
+
+		:return: Количество снятий по свёрнутым стекам
+		"""
+		self._stop.set()
+		if self._thread is not None:
+			self._thread.join()
+		return self.samples
+
+	def _run(self) -> None:
+		while not self._stop.wait(self._interval):
+			frame = sys._current_frames().get(self._thread_id)
+			if frame is not None:
+				self.samples[collapse_stack(frame)] += 1
+
+
+class ProfileStore:
+	"""
+	Каталог с файлами профилей, размер которого ограничен количеством
+	файлов и суммарным объёмом: при превышении удаляются самые старые.
+	"""
+
+	def __init__(self, directory: str, max_files: int, max_bytes: int):
+		"""
+		:param directory: Каталог для файлов профилей
+		:param max_files: Максимальное количество файлов
+		:param max_bytes: Максимальный суммарный размер файлов, в байтах
+		"""
+		self._directory = Path(directory)
+		self._max_files = max_files
+		self._max_bytes = max_bytes
+
+	def save(self, label: str, samples: collections.Counter[str]) -> Path:
+		"""
+		Записывает профиль в формате collapsed stacks и удаляет старые
+		профили сверх лимитов.
+
+		:param label: Метка профиля (маршрут, имя задачи)
+		:param samples: Количество снятий по свёрнутым стекам
+		:return: Путь к файлу профиля
+		"""
+		self._directory.mkdir(parents=True, exist_ok=True)
+		timestamp = datetime.datetime.now().strftime('%Y%m%dT%H%M%S%f')
+		safe_label = re.sub(r'[^A-Za-z0-9_.-]+', '_', label).strip('_')
+		path = self._directory / f'{timestamp}-{safe_label}{PROFILE_SUFFIX}'
+		path.write_text(''.join(
+			f'{stack} {count}\n' for stack, count in samples.most_common()))
+		self._prune()
+		return path
+
+	def _prune(self) -> None:
+		files = sorted(
+			self._directory.glob(f'*{PROFILE_SUFFIX}'),
+			key=lambda file: file.stat().st_mtime,
+		)
+		total_bytes = sum(file.stat().st_size for file in files)
+		while files and (
+			len(files) > self._max_files or total_bytes > self._max_bytes
+		):
+			oldest = files.pop(0)
+			total_bytes -= oldest.stat().st_size
+			oldest.unlink(missing_ok=True)
+
+
+class Profiler:
+	"""
+	Профилирование выборки запросов или задач.
+
+	Профилируется доля sample_rate вызовов, а также вызовы, явно
+	запрошенные доверенным токеном. Одновременно в процессе выполняется
+	не больше одного профиля: при асинхронной обработке в стеки потока
+	попадают и другие запросы, выполняемые в это время на том же цикле
+	событий, а ограничение держит накладные расходы предсказуемыми.
+	"""
+
+	def __init__(self, settings: ProfilingSettings, sample_rate: float):
+		"""
+		:param settings: Настройки профилирования
+		:param sample_rate: Доля профилируемых вызовов (0 — только по токену)
+		"""
+		self._settings = settings
+		self._sample_rate = sample_rate
+		self._interval = settings.interval_ms / 1000
+		self._store = ProfileStore(
+			settings.output_dir, settings.max_files, settings.max_bytes)
+		self._busy = threading.Lock()
+
+	def is_trusted(self, token: str | None) -> bool:
+		"""
+		Проверяет токен запроса профиля (пустой PROFILING_TOKEN отключает
+		профилирование по запросу).
+		"""
+		expected = self._settings.token
+		return bool(expected and token) and hmac.compare_digest(
+			token.encode(), expected.encode())
+
+	def start(
+		self,
+		thread_id: int | None = None,
+		forced: bool = False,
+	) -> StackSampler | None:
+		"""
+		Запускает профилирование, если вызов попал в выборку.
+
+		:param thread_id: Профилируемый поток (по умолчанию текущий)
+		:param forced: Профилировать вне зависимости от выборки
+		:return: StackSampler или None, если вызов не профилируется
+		"""
+		if not forced and (
+			self._sample_rate <= 0 or random.random() >= self._sample_rate
+		):
+			return None
+		if not self._busy.acquire(blocking=False):
+			return None
+		sampler = StackSampler(
+			thread_id or threading.get_ident(), self._interval)
+		sampler.start()
+		return sampler
+
+	def finish(self, sampler: StackSampler, label: str) -> Path | None:
+		"""
+		Останавливает профилирование и сохраняет профиль.
+
+		:param sampler: StackSampler, полученный от start()
+		:param label: Метка профиля (маршрут, имя задачи)
+		:return: Путь к файлу профиля или None, если сохранить не удалось
+		"""
+		try:
+			samples = sampler.stop()
+			path = self._store.save(label, samples)
+			logger.info(
+				f'Профиль {label} сохранён: {path} '
+				f'({sum(samples.values())} снимков стека)')
+			return path
+		except OSError as e:
+			logger.warning(f'Не удалось сохранить профиль {label}: {e}')
+			return None
+		finally:
+			self._busy.release()
+
+
+class ProfilingMiddleware:
+	"""
+	ASGI-middleware, профилирующее долю PROFILING_SAMPLE_RATE запросов
+	и запросы с заголовком PROFILING_HEADER, равным PROFILING_TOKEN.
+
+	Профили сохраняются в PROFILING_OUTPUT_DIR в формате collapsed stacks.
+	Остановка сэмплера и запись файла выполняются в отдельном потоке,
+	чтобы не задерживать другие запросы на цикле событий.
+	"""
+
+	def __init__(self, app, settings: ProfilingSettings | None = None):
+		self.app = app
+		settings = settings or ProfilingSettings()
+		self._header = settings.header.lower().encode()
+		self._profiler = Profiler(settings, settings.sample_rate)
+
+	async def __call__(self, scope, receive, send):
+		if scope['type'] != 'http':
+			await self.app(scope, receive, send)
+			return
+
+		token = next(
+			(value.decode('latin-1') for name, value in scope['headers']
+			 if name == self._header),
+			None,
+		)
+		sampler = self._profiler.start(forced=self._profiler.is_trusted(token))
+		if sampler is None:
+			await self.app(scope, receive, send)
+			return
+
+		try:
+			await self.app(scope, receive, send)
+		finally:
+			route = scope.get('route')
+			route_path = route.path if route is not None else scope['path']
+			await asyncio.to_thread(
+				self._profiler.finish, sampler,
+				f'{scope["method"]} {route_path}')
@@ -1,49 +1,301 @@
+import asyncio
+import dataclasses
+import json
 import logging
+import time
+from dataclasses import dataclass
 
 import httpx
 from redis.asyncio import Redis
 
+from app.utils.metrics import (
+	CBR_FETCH_DURATION,
+	RATE_CACHE_LOOKUPS,
+	STALE_RATE_USES,
+)
+
 logger = logging.getLogger(__name__)
 
+RATES_KEY = 'CBR_RATES'
+# Последний успешно полученный снимок, хранится без TTL
+LAST_GOOD_KEY = f'{RATES_KEY}:last_good'
+# Снимки по дате публикации хранятся дольше основного ключа
+SNAPSHOT_BY_DATE_TTL = 60 * 60 * 24 * 7
+
+
+@dataclass(frozen=True)
+class RateSnapshot:
+	"""
+	Снимок таблицы курсов ЦБ РФ на дату публикации.
+
+	rates содержит стоимость одной единицы валюты в рублях
+	(Value / Nominal из ответа ЦБ) по буквенному коду валюты.
+	stale=True означает, что ЦБ недоступен и отдан последний удачный снимок.
+	"""
+	date: str
+	rates: dict[str, float]
+	stale: bool = False
+
+	def get(self, currency: str) -> float:
+		"""
+		Возвращает курс валюты к рублю.
+
+		:param currency: Буквенный код валюты (USD, EUR, ...)
+		:raises KeyError: Если валюты нет в снимке
+		"""
+		if currency == 'RUB':
+			return 1.0
+		return self.rates[currency]
+
+	def to_json(self) -> str:
+		return json.dumps(
+			{'date': self.date, 'rates': self.rates}, separators=(',', ':'))
+
+	@classmethod
+	def from_json(cls, raw: str) -> 'RateSnapshot':
+		data = json.loads(raw)
+		return cls(date=data['date'], rates=data['rates'])
+
+	@classmethod
+	def from_cbr(cls, data: dict) -> 'RateSnapshot':
+		"""
+		Строит компактный снимок из полного JSON ЦБ, отбрасывая названия,
+		идентификаторы и предыдущие значения.
+		"""
+		return cls(
+			date=data['Date'],
+			rates={
+				code: float(valute['Value']) / float(valute['Nominal'])
+				for code, valute in data['Valute'].items()
+			},
+		)
+
+
+@dataclass(frozen=True)
+class _LocalSnapshot:
+	"""
+	Снимок курсов в памяти процесса и момент его получения
+	(по time.monotonic).
+	"""
+	value: RateSnapshot
+	stored_at: float
+
 
 class RateService:
 	"""
-    Сервис получения и кеширования валютного курса USD→RUB.
+    Сервис получения и кеширования валютных курсов ЦБ РФ.
 
     Работает следующим образом:
-    1. Пытается получить курс из Redis.
-    2. Если в кеше нет — делает запрос к API ЦБ РФ.
-    3. После получения сохраняет курс в Redis на заданное TTL-время.
+    1. Возвращает снимок курсов из памяти процесса, если он моложе
+       local_ttl_seconds.
+    2. Если снимок в памяти устарел, но моложе max_stale_seconds — возвращает
+       его сразу и обновляет в фоне (stale-while-revalidate).
+    3. Иначе пытается получить снимок из Redis.
+    4. Если в кеше нет — делает запрос к API ЦБ РФ и разбирает всю таблицу
+       валют в один компактный снимок.
+    5. Сохраняет снимок в Redis на заданное TTL-время, а также под ключом
+       с датой публикации ЦБ и как последний удачный снимок (без TTL).
+    6. Если ЦБ недоступен — отдаёт последний удачный снимок с признаком
+       stale вместо ошибки.
+
+    Обновление (шаги 3–5) выполняется не более чем одной корутиной на ключ
+    в рамках процесса (single-flight), остальные ждут её результата.
+
+    HTTP-клиент с пулом соединений живёт столько же, сколько сервис,
+    и закрывается через aclose().
     """
 
-	def __init__(self, redis: Redis, cbr_url: str, ttl_seconds: int = 300):
+	def __init__(
+		self,
+		redis: Redis,
+		cbr_url: str,
+		ttl_seconds: int = 300,
+		local_ttl_seconds: int = 60,
+		max_stale_seconds: int = 3600,
+		http_client: httpx.AsyncClient | None = None,
+	):
 		self._redis = redis
 		self._cbr_url = cbr_url
 		self._ttl = ttl_seconds
+		self._local_ttl = local_ttl_seconds
+		self._max_stale = max_stale_seconds
+		self._http = http_client or httpx.AsyncClient(
+			timeout=5.0,
+			limits=httpx.Limits(max_connections=4, max_keepalive_connections=2),
+		)
+		self._local: dict[str, _LocalSnapshot] = {}
+		self._locks: dict[str, asyncio.Lock] = {}
+		self._refresh_tasks: dict[str, asyncio.Task] = {}
+
+	async def aclose(self) -> None:
+		"""
+        Закрывает HTTP-клиент и отменяет незавершённые фоновые обновления.
+        """
+		for task in self._refresh_tasks.values():
+			task.cancel()
+		await self._http.aclose()
 
 	async def get_usd_rub_rate(self) -> float:
 		"""
-        Возвращает курс USD→RUB, сначала проверяя Redis,
+        Возвращает курс USD→RUB, сначала проверяя кеш процесса и Redis,
         а при отсутствии данных — запрашивает у API ЦБ.
         """
-		# Сначала пробуем взять значение из Redis-кеша
-		cached = await self._redis.get('USD_RUB')
+		return await self.get_rate('USD')
+
+	async def get_rate(self, currency: str) -> float:
+		"""
+        Возвращает курс валюты к рублю из текущего снимка.
+
+        Курс из устаревшего снимка (ЦБ недоступен) отдаётся с предупреждением
+        в логе и учитывается в метрике rate_stale_uses_total; вызывающим,
+        которым нужен сам признак, следует использовать get_snapshot().
+
+        :param currency: Буквенный код валюты (USD, EUR, ...)
+        """
+		snapshot = await self.get_snapshot()
+		rate = snapshot.get(currency)
+		if snapshot.stale:
+			STALE_RATE_USES.labels(currency).inc()
+			logger.warning(
+				f'Курс {currency}→RUB {rate} взят из устаревшего снимка '
+				f'на {snapshot.date}: ЦБ недоступен')
+		return rate
+
+	async def get_snapshot(self) -> RateSnapshot:
+		"""
+        Возвращает актуальный снимок таблицы курсов ЦБ.
+        """
+		entry = self._local.get(RATES_KEY)
+		if entry is not None:
+			age = time.monotonic() - entry.stored_at
+			if age < self._local_ttl:
+				RATE_CACHE_LOOKUPS.labels('local', 'hit').inc()
+				return entry.value
+			if age < self._max_stale:
+				# Снимок ещё пригоден: отдаём его и обновляем в фоне
+				RATE_CACHE_LOOKUPS.labels('local', 'stale').inc()
+				self._schedule_refresh(RATES_KEY)
+				return entry.value
+
+		RATE_CACHE_LOOKUPS.labels('local', 'miss').inc()
+		return await self._refresh(RATES_KEY)
+
+	def _schedule_refresh(self, key: str) -> None:
+		"""
+        Запускает фоновое обновление ключа, если оно ещё не выполняется.
+        """
+		task = self._refresh_tasks.get(key)
+		if task is not None and not task.done():
+			return
+		task = asyncio.create_task(self._refresh(key))
+		task.add_done_callback(self._on_refresh_done)
+		self._refresh_tasks[key] = task
+
+	@staticmethod
+	def _on_refresh_done(task: asyncio.Task) -> None:
+		if not task.cancelled() and task.exception() is not None:
+			logger.warning(
+				f'Фоновое обновление курса не удалось: {task.exception()}')
+
+	async def refresh_now(self) -> RateSnapshot:
+		"""
+        Принудительно запрашивает снимок у ЦБ и обновляет кеши.
+        Используется фоновым prefetch до истечения TTL.
+
+        :raises Exception: Если ЦБ недоступен
+        """
+		lock = self._locks.setdefault(RATES_KEY, asyncio.Lock())
+		async with lock:
+			snapshot = await self._fetch_from_cbr()
+			await self._store(RATES_KEY, snapshot)
+			self._local[RATES_KEY] = _LocalSnapshot(
+				value=snapshot, stored_at=time.monotonic())
+			return snapshot
+
+	async def _refresh(self, key: str) -> RateSnapshot:
+		"""
+        Обновляет снимок из Redis или API ЦБ под замком ключа (single-flight).
+        """
+		lock = self._locks.setdefault(key, asyncio.Lock())
+		async with lock:
+			# Пока ждали замок, снимок мог обновить другой вызов
+			entry = self._local.get(key)
+			if (entry is not None
+					and time.monotonic() - entry.stored_at < self._local_ttl):
+				return entry.value
+
+			# Сначала пробуем взять значение из Redis-кеша
+			cached = await self._redis.get(key)
+			if cached is not None:
+				RATE_CACHE_LOOKUPS.labels('redis', 'hit').inc()
+				snapshot = RateSnapshot.from_json(cached)
+			else:
+				RATE_CACHE_LOOKUPS.labels('redis', 'miss').inc()
+				try:
+					snapshot = await self._fetch_from_cbr()
+				except Exception as error:
+					snapshot = await self._last_good(entry, error)
+				else:
+					await self._store(key, snapshot)
+
+			self._local[key] = _LocalSnapshot(
+				value=snapshot, stored_at=time.monotonic())
+			return snapshot
+
+	async def _last_good(
+		self,
+		entry: _LocalSnapshot | None,
+		error: Exception,
+	) -> RateSnapshot:
+		"""
+        Возвращает последний удачный снимок с признаком stale: из Redis,
+        а если его там нет — из памяти процесса.
+
+        :raises Exception: Исходная ошибка ЦБ, если снимков нет нигде
+        """
+		cached = await self._redis.get(LAST_GOOD_KEY)
 		if cached is not None:
-			return float(cached)
+			snapshot = RateSnapshot.from_json(cached)
+		elif entry is not None:
+			snapshot = entry.value
+		else:
+			raise error
+		logger.warning(
+			f'ЦБ недоступен, используется последний удачный снимок '
+			f'курсов на {snapshot.date}')
+		return dataclasses.replace(snapshot, stale=True)
 
-		# Если в кеше нет, делаем HTTP-запрос к API ЦБ
+	async def _store(self, key: str, snapshot: RateSnapshot) -> None:
+		"""
+        Кладёт снимок в Redis: основной ключ с истечением ttl_seconds,
+        ключ с датой публикации ЦБ и последний удачный снимок.
+        """
+		raw = snapshot.to_json()
+		async with self._redis.pipeline(transaction=False) as pipe:
+			pipe.set(key, raw, ex=self._ttl)
+			pipe.set(f'{key}:{snapshot.date}', raw, ex=SNAPSHOT_BY_DATE_TTL)
+			pipe.set(LAST_GOOD_KEY, raw)
+			await pipe.execute()
+
+	async def _fetch_from_cbr(self) -> RateSnapshot:
+		"""
+        Запрашивает таблицу курсов у API ЦБ.
+        """
+		started = time.perf_counter()
 		try:
-			async with httpx.AsyncClient() as client:
-				resp = await client.get(self._cbr_url, timeout=5.0)
-				resp.raise_for_status()
-				data = resp.json()
+			resp = await self._http.get(self._cbr_url)
+			resp.raise_for_status()
+			data = resp.json()
 		except Exception as e:
+			CBR_FETCH_DURATION.labels('error').observe(
+				time.perf_counter() - started)
 			logger.exception(f'Ошибка при получении курса с {self._cbr_url}')
 			raise
+		CBR_FETCH_DURATION.labels('success').observe(
+			time.perf_counter() - started)
 
-		rate = float(data['Valute']['USD']['Value'])
-		logger.info(f'Курс USD→RUB получен от ЦБ: {rate}')
-
-		# Кладём в кеш с истечением ttl_seconds
-		await self._redis.set('USD_RUB', rate, ex=self._ttl)
-		return rate
+		snapshot = RateSnapshot.from_cbr(data)
+		logger.info(
+			f'Курсы ЦБ на {snapshot.date} получены: '
+			f'{len(snapshot.rates)} валют, USD→RUB {snapshot.get("USD")}')
+		return snapshot
@@ -0,0 +1,181 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from redis.asyncio import Redis
+
+from app.applications.dataclasses.dataclasses import Company, ParcelType
+
+logger = logging.getLogger(__name__)
+
+# Счётчик версии справочников, увеличивается при каждом изменении
+REFERENCE_VERSION_KEY = 'REFERENCE_DATA:version'
+# Канал pub/sub, в который публикуется новая версия справочников
+REFERENCE_CHANNEL = 'REFERENCE_DATA:invalidate'
+# Пауза перед повторной подпиской после обрыва соединения с Redis
+RESUBSCRIBE_DELAY_SECONDS = 1.0
+
+ReferenceLoader = Callable[
+	[], Awaitable[tuple[list[ParcelType], list[Company]]]]
+
+
+class ReferenceDataCache:
+	"""
+	Кеш справочников (типы посылок и транспортные компании) в памяти процесса.
+
+	Работает следующим образом:
+	1. Загружается при старте приложения, а если это не удалось
+	   (или кеш сброшен) — при первом обращении через ensure_loaded().
+	2. При создании компании процесс сбрасывает свой кеш, увеличивает
+	   версию справочников в Redis и публикует её в канал pub/sub.
+	3. Остальные процессы слушают канал и сбрасывают кеш при получении
+	   чужой версии, а также после переподключения к Redis, так как
+	   сообщения за время обрыва могли быть потеряны.
+
+	Загрузка выполняется одной корутиной; если во время загрузки кеш был
+	сброшен, результат не сохраняется и следующий запрос загрузит заново.
+	"""
+
+	def __init__(self):
+		self._parcel_types: dict[int, ParcelType] = {}
+		self._type_names: dict[int, str] = {}
+		self._companies: dict[int, Company] = {}
+		self._loaded = False
+		# Увеличивается при каждом сбросе, защищает от сохранения
+		# результата загрузки, начатой до сброса
+		self._generation = 0
+		self._published_version: int | None = None
+		self._lock = asyncio.Lock()
+		self._redis: Redis | None = None
+		self._listener: asyncio.Task | None = None
+
+	@property
+	def is_loaded(self) -> bool:
+		return self._loaded
+
+	def load(
+		self,
+		parcel_types: list[ParcelType],
+		companies: list[Company],
+	) -> None:
+		"""
+		Заменяет содержимое кеша.
+
+		:param parcel_types: Все типы посылок
+		:param companies: Все транспортные компании
+		"""
+		self._parcel_types = {
+			parcel_type.id: parcel_type for parcel_type in parcel_types}
+		self._type_names = {
+			parcel_type.id: parcel_type.name for parcel_type in parcel_types}
+		self._companies = {company.id: company for company in companies}
+		self._loaded = True
+
+	def invalidate(self) -> None:
+		"""
+		Сбрасывает кеш, следующее обращение загрузит справочники заново.
+		"""
+		self._generation += 1
+		self._loaded = False
+
+	async def ensure_loaded(self, loader: ReferenceLoader) -> None:
+		"""
+		Загружает справочники, если кеш пуст или сброшен.
+
+		:param loader: Корутина, возвращающая (типы посылок, компании) из БД
+		"""
+		if self._loaded:
+			return
+		async with self._lock:
+			if self._loaded:
+				return
+			generation = self._generation
+			parcel_types, companies = await loader()
+			if generation == self._generation:
+				self.load(parcel_types, companies)
+				logger.info(
+					f'Справочники загружены: типов посылок {len(parcel_types)}, '
+					f'компаний {len(companies)}')
+
+	def get_parcel_types(self) -> list[ParcelType]:
+		return sorted(self._parcel_types.values(), key=lambda item: item.id)
+
+	def get_companies(self) -> list[Company]:
+		return sorted(self._companies.values(), key=lambda item: item.id)
+
+	def has_company(self, company_id: int) -> bool:
+		return company_id in self._companies
+
+	def get_type_names(self) -> dict[int, str]:
+		"""
+		Возвращает названия типов посылок по их ID.
+		"""
+		return self._type_names
+
+	async def notify_changed(self) -> None:
+		"""
+		Сбрасывает кеш процесса и оповещает остальные процессы через Redis.
+		Вызывается после фиксации транзакции, изменившей справочники.
+		"""
+		self.invalidate()
+		if self._redis is None:
+			return
+		version = await self._redis.incr(REFERENCE_VERSION_KEY)
+		self._published_version = version
+		await self._redis.publish(REFERENCE_CHANNEL, version)
+
+	def start(self, redis: Redis) -> None:
+		"""
+		Запускает фоновое прослушивание канала сброса кеша.
+
+		:param redis: Подключение к Redis (decode_responses=True)
+		"""
+		self._redis = redis
+		self._listener = asyncio.create_task(self._listen())
+
+	async def stop(self) -> None:
+		"""
+		Останавливает прослушивание канала и закрывает подключение к Redis.
+		"""
+		if self._listener is not None:
+			self._listener.cancel()
+			try:
+				await self._listener
+			except asyncio.CancelledError:
+				pass
+			self._listener = None
+		if self._redis is not None:
+			await self._redis.aclose()
+			self._redis = None
+
+	async def _listen(self) -> None:
+		"""
+		Слушает канал сброса кеша, переподписываясь при обрыве соединения.
+		"""
+		resubscribe = False
+		while True:
+			try:
+				async with self._redis.pubsub() as pubsub:
+					await pubsub.subscribe(REFERENCE_CHANNEL)
+					if resubscribe:
+						# За время обрыва сообщения могли быть потеряны
+						self.invalidate()
+					resubscribe = True
+					async for message in pubsub.listen():
+						if message['type'] == 'message':
+							self._on_version(int(message['data']))
+			except asyncio.CancelledError:
+				raise
+			except Exception as e:
+				logger.warning(f'Подписка на сброс кеша справочников прервана: {e}')
+				await asyncio.sleep(RESUBSCRIBE_DELAY_SECONDS)
+
+	def _on_version(self, version: int) -> None:
+		# Собственное оповещение: кеш уже сброшен в notify_changed()
+		if version == self._published_version:
+			return
+		logger.info(f'Справочники изменены (версия {version}), кеш сброшен')
+		self.invalidate()
+
+
+reference_cache = ReferenceDataCache()
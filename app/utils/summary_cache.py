@@ -0,0 +1,125 @@
+import logging
+from collections.abc import Iterable
+
+import orjson
+from redis.asyncio import Redis
+from redis.exceptions import RedisError, WatchError
+
+logger = logging.getLogger(__name__)
+
+# Префикс ключа сводки посылок сессии
+SUMMARY_KEY_PREFIX = 'PARCEL_SUMMARY:'
+# Префикс ключа версии сводки: увеличивается при каждом сбросе
+SUMMARY_VERSION_KEY_PREFIX = 'PARCEL_SUMMARY_VERSION:'
+# Время жизни ключа версии: должно с запасом превышать время сборки
+# сводки, иначе версия может вернуться к прочитанному значению
+VERSION_TTL_SECONDS = 24 * 60 * 60
+# Сколько сессий сбрасывать одной транзакцией Redis
+INVALIDATE_BATCH_SIZE = 1000
+
+
+class ParcelSummaryCache:
+	"""
+	Кеш сводок посылок по сессиям (GET /parcels/summary) в Redis.
+
+	Сводка хранится готовым JSON-телом ответа с коротким TTL и удаляется
+	после коммита транзакций, меняющих посылки сессии. Сброс увеличивает
+	версию сессии, а сводка сохраняется, только если версия не изменилась
+	с момента промаха кеша: сводка, прочитанная из БД до параллельного
+	коммита, не попадает в кеш после его сброса.
+
+	Кеш не источник истины: ошибки Redis логируются, а сводка читается
+	из БД.
+	"""
+
+	def __init__(self, redis: Redis, ttl_seconds: int):
+		"""
+		:param redis: Подключение к Redis
+		:param ttl_seconds: Время жизни сводки (0 — кеш отключён)
+		"""
+		self._redis = redis
+		self._ttl_seconds = ttl_seconds
+
+	@staticmethod
+	def _key(session_id: str) -> str:
+		return SUMMARY_KEY_PREFIX + session_id
+
+	@staticmethod
+	def _version_key(session_id: str) -> str:
+		return SUMMARY_VERSION_KEY_PREFIX + session_id
+
+	async def get(self, session_id: str) -> tuple[dict | None, str | None]:
+		"""
+		Возвращает сводку сессии из кеша и текущую версию сессии.
+
+		:param session_id: Идентификатор сессии
+		:return: Сводка или None, если её нет в кеше, и версия, которую
+			нужно передать в set при заполнении кеша
+		"""
+		if not self._ttl_seconds:
+			return None, None
+		try:
+			cached, version = await self._redis.mget(
+				self._key(session_id), self._version_key(session_id))
+		except RedisError as e:
+			logger.warning('Кеш сводки недоступен: %s', e)
+			return None, None
+		summary = orjson.loads(cached) if cached is not None else None
+		return summary, version
+
+	async def set(
+		self,
+		session_id: str,
+		summary: dict,
+		version: str | None,
+	) -> None:
+		"""
+		Сохраняет сводку сессии на ttl_seconds, если с момента чтения
+		версии сводка не сбрасывалась (WATCH/MULTI по ключу версии).
+
+		:param session_id: Идентификатор сессии
+		:param summary: Сводка в форме ParcelSummaryResponse
+		:param version: Версия, полученная из get до чтения сводки из БД
+		"""
+		if not self._ttl_seconds:
+			return
+		version_key = self._version_key(session_id)
+		try:
+			async with self._redis.pipeline() as pipe:
+				await pipe.watch(version_key)
+				if await pipe.get(version_key) != version:
+					return
+				pipe.multi()
+				pipe.set(
+					self._key(session_id), orjson.dumps(summary),
+					ex=self._ttl_seconds)
+				await pipe.execute()
+		except WatchError:
+			# Сводку сбросили, пока она сохранялась
+			return
+		except RedisError as e:
+			logger.warning('Не удалось сохранить сводку в кеш: %s', e)
+
+	async def invalidate(self, session_ids: Iterable[str]) -> None:
+		"""
+		Удаляет сводки сессий из кеша и увеличивает их версии. Если Redis
+		недоступен, сводки устаревают не дольше чем на ttl_seconds.
+
+		:param session_ids: Идентификаторы сессий
+		"""
+		if not self._ttl_seconds:
+			return
+		session_ids = list(set(session_ids))
+		try:
+			for start in range(0, len(session_ids), INVALIDATE_BATCH_SIZE):
+				async with self._redis.pipeline() as pipe:
+					for session_id in session_ids[
+						start:start + INVALIDATE_BATCH_SIZE
+					]:
+						version_key = self._version_key(session_id)
+						pipe.incr(version_key)
+						pipe.expire(version_key, VERSION_TTL_SECONDS)
+						pipe.delete(self._key(session_id))
+					await pipe.execute()
+		except RedisError as e:
+			logger.warning('Не удалось сбросить кеш сводок: %s', e)
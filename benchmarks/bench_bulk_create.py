@@ -0,0 +1,64 @@
+"""
+Бенчмарк создания посылок: 1000 запросов POST /parcels против одного
+POST /parcels/bulk на 1000 посылок.
+
+Требует запущенного сервиса (docker-compose up):
+    python -m benchmarks.bench_bulk_create [base_url]
+"""
+import asyncio
+import sys
+import time
+from uuid import uuid4
+
+import httpx
+
+COUNT = 1000
+DEFAULT_BASE_URL = 'http://localhost:8000'
+
+
+def make_parcels(prefix: str) -> list[dict]:
+	return [
+		{
+			'name': f'{prefix}-{index}',
+			'weight': 1.0 + index % 10,
+			'type_id': 1 + index % 3,
+			'content_value_usd': 10.0 + index,
+		}
+		for index in range(COUNT)
+	]
+
+
+async def single_posts(client: httpx.AsyncClient) -> float:
+	parcels = make_parcels(f'single-{uuid4().hex[:8]}')
+	started = time.perf_counter()
+	for parcel in parcels:
+		response = await client.post('/parcels/', json=parcel)
+		response.raise_for_status()
+	return time.perf_counter() - started
+
+
+async def bulk_post(client: httpx.AsyncClient) -> float:
+	parcels = make_parcels(f'bulk-{uuid4().hex[:8]}')
+	started = time.perf_counter()
+	response = await client.post('/parcels/bulk', json=parcels)
+	response.raise_for_status()
+	return time.perf_counter() - started
+
+
+async def main(base_url: str) -> None:
+	async with httpx.AsyncClient(base_url=base_url, timeout=60.0) as client:
+		# Прогрев: получаем cookie сессии и открываем соединение
+		(await client.get('/parcels/types')).raise_for_status()
+
+		single_seconds = await single_posts(client)
+		bulk_seconds = await bulk_post(client)
+
+	print(f'{COUNT} x POST /parcels:      {single_seconds:8.3f} s '
+	      f'({COUNT / single_seconds:,.0f} parcels/s)')
+	print(f'1 x POST /parcels/bulk:   {bulk_seconds:8.3f} s '
+	      f'({COUNT / bulk_seconds:,.0f} parcels/s)')
+	print(f'speedup: {single_seconds / bulk_seconds:.1f}x')
+
+
+if __name__ == '__main__':
+	asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_BASE_URL))
@@ -0,0 +1,101 @@
+"""
+Бенчмарк сериализации страницы списка посылок: pydantic-модели, которые
+FastAPI повторно проверяет по response_model и кодирует стандартным json,
+против словарей из строк БД, которые кодирует orjson.
+
+Запуск:
+    python -m benchmarks.bench_response_serialization
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.adapters.http_api.schemas.schemas import ParcelListResponse
+from app.applications.dataclasses.dataclasses import ParcelRow
+from app.applications.services.parcel_services import parcel_view
+from app.utils.constants import ParcelsConstants
+
+PAGE_SIZES = (20, 100)
+ITERATIONS = 2000
+TYPE_NAMES = {1: 'одежда', 2: 'электроника', 3: 'разное'}
+
+
+def make_rows(size: int) -> list[ParcelRow]:
+	now = datetime(2024, 5, 1, 12, 0, 0)
+	return [
+		ParcelRow(
+			id=index,
+			name=f'parcel-{index}',
+			weight=1.0 + index % 30,
+			type_id=1 + index % 3,
+			content_value_usd=10.0 + index,
+			delivery_price=None if index % 2 else 100.0 + index,
+			created_at=now - timedelta(seconds=index),
+		)
+		for index in range(size)
+	]
+
+
+def legacy_models(rows: list[ParcelRow]) -> list[ParcelListResponse]:
+	"""
+	Прежняя сборка ответа в ParcelService.list_parcels.
+	"""
+	return [
+		ParcelListResponse(
+			parcel_id=row.id,
+			name=row.name,
+			weight=row.weight,
+			type_id=row.type_id,
+			type_name=TYPE_NAMES[row.type_id],
+			content_value_usd=row.content_value_usd,
+			delivery_price=(
+				row.delivery_price
+				if row.delivery_price is not None
+				else ParcelsConstants.NOT_MEANT.value
+			),
+			created_at=row.created_at,
+		)
+		for row in rows
+	]
+
+
+async def legacy_page(rows: list[ParcelRow], field) -> bytes:
+	# Сборка моделей, проверка и сериализация по response_model,
+	# кодирование стандартным json — как в FastAPI без fast_json_response
+	content = await serialize_response(
+		field=field, response_content=legacy_models(rows))
+	return JSONResponse(content).body
+
+
+async def fast_page(rows: list[ParcelRow], field) -> bytes:
+	return ORJSONResponse(
+		[parcel_view(row, TYPE_NAMES[row.type_id]) for row in rows]).body
+
+
+async def measure(page, rows: list[ParcelRow], field) -> float:
+	started = time.perf_counter()
+	for _ in range(ITERATIONS):
+		await page(rows, field)
+	return (time.perf_counter() - started) / ITERATIONS
+
+
+async def main() -> None:
+	field = create_response_field(
+		name='Response_list_parcels', type_=list[ParcelListResponse])
+
+	print(f'{"page":>6} {"legacy, мкс/стр":>17} {"fast, мкс/стр":>15} '
+	      f'{"ускорение":>10}')
+	for size in PAGE_SIZES:
+		rows = make_rows(size)
+		legacy = await measure(legacy_page, rows, field)
+		fast = await measure(fast_page, rows, field)
+		print(f'{size:>6} {legacy * 1e6:>17.1f} {fast * 1e6:>15.1f} '
+		      f'{legacy / fast:>9.1f}x')
+
+
+if __name__ == '__main__':
+	asyncio.run(main())
@@ -0,0 +1,101 @@
+"""
+Бенчмарк расчёта стоимости доставки: исходный цикл по объектам Parcel
+против векторизованного TariffEngine.
+
+Запуск:
+    python -m benchmarks.bench_tariff_pricing
+"""
+import time
+from datetime import datetime
+
+import numpy as np
+
+from app.applications.dataclasses.dataclasses import (
+	Parcel,
+	Tariff,
+	WeightBracket,
+)
+from app.applications.services.price_update_service import PriceUpdateService
+from app.applications.services.tariff_engine import TariffEngine
+
+SIZES = (10_000, 100_000, 1_000_000)
+RATE = 90.0
+
+
+def make_rows(size: int) -> list[tuple[int, float, float, int, int | None]]:
+	"""
+	Генерирует строки (id, weight, content_value_usd, type_id, company_id).
+	"""
+	rng = np.random.default_rng(42)
+	weights = rng.uniform(0.1, 30.0, size).tolist()
+	values = rng.uniform(1.0, 1000.0, size).tolist()
+	type_ids = rng.integers(1, 4, size).tolist()
+	company_ids = rng.integers(0, 6, size).tolist()
+	return [
+		(index, weights[index], values[index], type_ids[index],
+		 company_ids[index] or None)
+		for index in range(size)
+	]
+
+
+def legacy_loop(parcels: list[Parcel], rate: float) -> None:
+	"""
+	Исходный расчёт из PriceUpdateService.update_all.
+	"""
+	for parcel in parcels:
+		parcel.delivery_price = (
+			(parcel.weight * 0.5 + parcel.content_value_usd * 0.01) * rate)
+		parcel.updated_at = datetime.now()
+
+
+def measure(func, *args) -> float:
+	started = time.perf_counter()
+	func(*args)
+	return time.perf_counter() - started
+
+
+def main() -> None:
+	engine = TariffEngine([
+		Tariff(
+			weight_coefficient=0.6,
+			value_coefficient=0.01,
+			parcel_type_id=2,
+			weight_brackets=[WeightBracket(weight_from=10.0,
+			                               weight_coefficient=0.4)],
+		),
+		Tariff(weight_coefficient=0.45, value_coefficient=0.012,
+		       min_charge_usd=3.0, company_id=3),
+	])
+
+	# engine — только векторный вызов над готовыми колонками,
+	# rows→engine — вместе с разбором строк БД и сборкой словаря цен
+	print(f'{"parcels":>10} {"loop, rows/s":>15} {"engine, rows/s":>16} '
+	      f'{"rows→engine, rows/s":>21}')
+	for size in SIZES:
+		rows = make_rows(size)
+		now = datetime.now()
+		parcels = [
+			Parcel(
+				id=row[0], session_id='bench', name=str(row[0]),
+				weight=row[1], content_value_usd=row[2], type_id=row[3],
+				company_id=row[4], created_at=now, updated_at=now,
+			)
+			for row in rows
+		]
+
+		_, weights, values, type_ids, company_ids = map(np.array, zip(*(
+			(row[0], row[1], row[2], row[3], row[4] or 0) for row in rows)))
+
+		loop_seconds = measure(legacy_loop, parcels, RATE)
+		engine_seconds = measure(
+			engine.price, weights, values, type_ids, company_ids, RATE)
+		rows_seconds = measure(
+			PriceUpdateService._price_rows, rows, RATE, engine)
+
+		print(f'{size:>10} {size / loop_seconds:>15,.0f} '
+		      f'{size / engine_seconds:>16,.0f} '
+		      f'{size / rows_seconds:>21,.0f}')
+
+
+if __name__ == '__main__':
+	main()
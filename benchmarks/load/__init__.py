@@ -0,0 +1,4 @@
+"""
+Нагрузочные сценарии HTTP API: p50/p95/p99 и req/s по эндпоинтам
+со сравнением с базовым прогоном. Запуск: python -m benchmarks.load
+"""
@@ -0,0 +1,108 @@
+"""
+Нагрузочный прогон HTTP API в процессе (без сети и uvicorn).
+
+Приложение работает с БД из --database-url и fakeredis вместо Redis.
+Для MySQL база должна быть с применёнными миграциями; на SQLite схема
+создаётся автоматически, а сценарии с MySQL-специфичными запросами
+(create, bind_company, bind_company_bulk) пропускаются.
+
+    python -m benchmarks.load --output results.json
+    python -m benchmarks.load --save-baseline benchmarks/load/baseline.json
+    python -m benchmarks.load --baseline benchmarks/load/baseline.json
+
+С --baseline код возврата 1 означает регрессию относительно базового
+прогона.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+DEFAULT_DATABASE_URL = (
+	f'sqlite+aiosqlite:///{Path(tempfile.gettempdir()) / "delivery_load.db"}')
+
+
+def parse_args() -> argparse.Namespace:
+	parser = argparse.ArgumentParser(
+		prog='python -m benchmarks.load',
+		description='Нагрузочный прогон HTTP API',
+	)
+	parser.add_argument('--database-url', default=DEFAULT_DATABASE_URL)
+	parser.add_argument('--requests', type=int, default=500,
+	                    help='запросов на сценарий')
+	parser.add_argument('--concurrency', type=int, default=20)
+	parser.add_argument('--warmup', type=int, default=20)
+	parser.add_argument('--parcels', type=int, default=2000,
+	                    help='посылок в сессии прогона')
+	parser.add_argument('--seed', type=int, default=42)
+	parser.add_argument('--scenario', action='append',
+	                    help='запустить только указанные сценарии')
+	parser.add_argument('--output', type=Path, help='файл для результатов')
+	parser.add_argument('--baseline', type=Path,
+	                    help='сравнить с базовым прогоном')
+	parser.add_argument('--save-baseline', type=Path,
+	                    help='сохранить результаты как базовый прогон')
+	parser.add_argument('--tolerance', type=float, default=0.15,
+	                    help='допустимое ухудшение относительно базового')
+	return parser.parse_args()
+
+
+async def run(args: argparse.Namespace) -> dict[str, dict]:
+	# Движок приложения создаётся при импорте, поэтому импорт после
+	# установки DATABASE_URL
+	from benchmarks.load.environment import LoadEnvironment
+	from benchmarks.load.harness import run_scenario
+	from benchmarks.load.scenarios import build_scenarios
+
+	# Логи запросов не должны искажать замеры
+	logging.getLogger().setLevel(logging.WARNING)
+
+	# bind_company привязывает по одной новой посылке на запрос
+	parcel_count = max(args.parcels, args.requests + args.warmup)
+	results = {}
+	async with LoadEnvironment(parcel_count, args.seed) as environment:
+		async with environment.client() as client:
+			for scenario in build_scenarios(environment.data):
+				if args.scenario and scenario.name not in args.scenario:
+					continue
+				if scenario.requires_mysql and environment.is_sqlite:
+					print(f'{scenario.name}: пропущен на SQLite', file=sys.stderr)
+					continue
+				result = await run_scenario(
+					client, scenario, args.requests, args.concurrency,
+					args.warmup)
+				results[scenario.name] = result.summary()
+				print(f'{scenario.name}: {results[scenario.name]}',
+				      file=sys.stderr)
+	return results
+
+
+def main() -> int:
+	args = parse_args()
+	os.environ['DATABASE_URL'] = args.database_url
+	results = asyncio.run(run(args))
+
+	report = json.dumps(results, ensure_ascii=False, indent=2)
+	print(report)
+	if args.output:
+		args.output.write_text(report)
+	if args.save_baseline:
+		args.save_baseline.write_text(report)
+
+	if args.baseline:
+		from benchmarks.load.harness import compare
+
+		regressions = compare(
+			results, json.loads(args.baseline.read_text()), args.tolerance)
+		for regression in regressions:
+			print(f'РЕГРЕССИЯ {regression}', file=sys.stderr)
+		return 1 if regressions else 0
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
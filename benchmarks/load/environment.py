@@ -0,0 +1,136 @@
+"""
+Окружение нагрузочного прогона: ASGI-приложение в процессе, БД из
+DATABASE_URL (MySQL с применёнными миграциями или SQLite) и fakeredis
+вместо Redis.
+
+DATABASE_URL должен быть задан до импорта модуля: движок приложения
+создаётся при импорте app.composites.http_api.
+"""
+import datetime
+import random
+from dataclasses import dataclass
+from uuid import uuid4
+
+import httpx
+from fakeredis import aioredis
+from sqlalchemy import func, insert, select
+
+from app.adapters.database.engine import dispose_engines
+from app.adapters.database.tables import company, metadata, parcel_types, parcels
+from app.adapters.http_api.settings import (
+	DB,
+	get_pricing_stream,
+	get_summary_cache,
+	preload_reference_cache,
+)
+from app.composites.http_api import app
+from app.utils.constants import CookiesConstants
+from app.utils.pricing_stream import PricingStream
+from app.utils.reference_cache import reference_cache
+from app.utils.settings import SummarySettings
+from app.utils.summary_cache import ParcelSummaryCache
+
+# Типы посылок для пустой SQLite (в MySQL их создаёт миграция)
+SQLITE_PARCEL_TYPES = ('одежда', 'электроника', 'разное')
+
+
+@dataclass(frozen=True)
+class SeedData:
+	"""
+	Данные, созданные для прогона: сессия пользователя, ID типов посылок,
+	компании и посылок сессии.
+	"""
+	session_id: str
+	type_ids: list[int]
+	company_id: int
+	parcel_ids: list[int]
+
+
+class LoadEnvironment:
+	"""
+	Готовит БД и приложение к прогону и выдаёт HTTP-клиент сессии.
+
+	Используется как асинхронный контекстный менеджер.
+	"""
+
+	def __init__(self, parcel_count: int, seed: int):
+		"""
+		:param parcel_count: Количество посылок сессии
+		:param seed: Зерно генератора тестовых данных
+		"""
+		self._parcel_count = parcel_count
+		self._random = random.Random(seed)
+		self._redis = aioredis.FakeRedis(decode_responses=True)
+		self.is_sqlite = DB.engine.dialect.name == 'sqlite'
+		self.data: SeedData | None = None
+
+	async def __aenter__(self) -> 'LoadEnvironment':
+		self.data = await self._seed()
+		app.dependency_overrides[get_pricing_stream] = (
+			lambda: PricingStream(self._redis))
+		summary_cache = ParcelSummaryCache(
+			self._redis, SummarySettings().cache_ttl_seconds)
+		app.dependency_overrides[get_summary_cache] = lambda: summary_cache
+		await preload_reference_cache()
+		reference_cache.start(self._redis)
+		return self
+
+	async def __aexit__(self, *exc_info) -> None:
+		app.dependency_overrides.clear()
+		await reference_cache.stop()
+		await dispose_engines()
+
+	def client(self) -> httpx.AsyncClient:
+		"""
+		Создаёт HTTP-клиент к приложению с cookie сессии прогона.
+		"""
+		return httpx.AsyncClient(
+			transport=httpx.ASGITransport(app=app),
+			base_url='http://load',
+			cookies={CookiesConstants.SESSION_ID.value: self.data.session_id},
+			timeout=30.0,
+		)
+
+	async def _seed(self) -> SeedData:
+		session_id = f'load-{uuid4().hex}'
+		async with DB.engine.begin() as conn:
+			if self.is_sqlite:
+				await conn.run_sync(metadata.create_all)
+				if not (await conn.execute(
+					select(func.count()).select_from(parcel_types))).scalar_one():
+					await conn.execute(insert(parcel_types), [
+						{'name': name} for name in SQLITE_PARCEL_TYPES])
+
+			type_ids = list((await conn.execute(
+				select(parcel_types.c.id).order_by(parcel_types.c.id))).scalars())
+			company_id = (await conn.execute(
+				insert(company).values(name='load-test'))).inserted_primary_key[0]
+
+			now = datetime.datetime.now()
+			await conn.execute(insert(parcels), [
+				{
+					'session_id': session_id,
+					'name': f'parcel-{index}',
+					'weight': round(self._random.uniform(0.1, 30.0), 2),
+					'type_id': self._random.choice(type_ids),
+					'content_value_usd': round(self._random.uniform(1, 1000), 2),
+					# Половина посылок с рассчитанной стоимостью
+					'delivery_price': (
+						round(self._random.uniform(100, 5000), 2)
+						if index % 2 else None),
+					'created_at': now - datetime.timedelta(seconds=index),
+				}
+				for index in range(self._parcel_count)
+			])
+			parcel_ids = list((await conn.execute(
+				select(parcels.c.id)
+				.where(parcels.c.session_id == session_id)
+				.order_by(parcels.c.id)
+			)).scalars())
+
+		return SeedData(
+			session_id=session_id,
+			type_ids=type_ids,
+			company_id=company_id,
+			parcel_ids=parcel_ids,
+		)
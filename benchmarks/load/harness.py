@@ -0,0 +1,134 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+import httpx
+import numpy as np
+
+# Запрос сценария: (клиент, порядковый номер запроса) -> ответ
+RequestFactory = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+@dataclass(frozen=True)
+class Scenario:
+	"""
+	Сценарий нагрузки на один эндпоинт.
+
+	requires_mysql=True — сценарий использует MySQL-специфичные запросы
+	(INSERT ... ON DUPLICATE KEY UPDATE) и пропускается на SQLite.
+	"""
+	name: str
+	request: RequestFactory
+	expected_status: int = 200
+	requires_mysql: bool = False
+
+
+@dataclass
+class ScenarioResult:
+	"""
+	Замеры одного сценария: длительности успешных запросов в секундах,
+	количество ошибок и общее время прогона.
+	"""
+	name: str
+	latencies: list[float] = field(default_factory=list)
+	errors: int = 0
+	elapsed: float = 0.0
+
+	def summary(self) -> dict:
+		"""
+		:return: Количество запросов и ошибок, req/s, p50/p95/p99 в мс
+		"""
+		count = len(self.latencies) + self.errors
+		summary = {
+			'requests': count,
+			'errors': self.errors,
+			'rps': round(count / self.elapsed, 1) if self.elapsed else 0.0,
+		}
+		if self.latencies:
+			p50, p95, p99 = np.percentile(self.latencies, [50, 95, 99]) * 1000
+			summary.update(
+				p50_ms=round(float(p50), 2),
+				p95_ms=round(float(p95), 2),
+				p99_ms=round(float(p99), 2),
+			)
+		return summary
+
+
+async def run_scenario(
+	client: httpx.AsyncClient,
+	scenario: Scenario,
+	requests: int,
+	concurrency: int,
+	warmup: int = 10,
+) -> ScenarioResult:
+	"""
+	Выполняет requests запросов сценария в concurrency параллельных
+	воркеров после warmup непрогретых (не учитываемых) запросов.
+
+	:param client: HTTP-клиент
+	:param scenario: Сценарий
+	:param requests: Количество учитываемых запросов
+	:param concurrency: Количество параллельных воркеров
+	:param warmup: Количество прогревочных запросов
+	:return: ScenarioResult
+	"""
+	for index in range(warmup):
+		await scenario.request(client, index)
+
+	result = ScenarioResult(name=scenario.name)
+	counter = iter(range(warmup, warmup + requests))
+
+	async def worker() -> None:
+		for index in counter:
+			started = time.perf_counter()
+			try:
+				response = await scenario.request(client, index)
+			except httpx.HTTPError:
+				result.errors += 1
+				continue
+			if response.status_code != scenario.expected_status:
+				result.errors += 1
+				continue
+			result.latencies.append(time.perf_counter() - started)
+
+	started = time.perf_counter()
+	await asyncio.gather(*(worker() for _ in range(concurrency)))
+	result.elapsed = time.perf_counter() - started
+	return result
+
+
+def compare(
+	current: dict[str, dict],
+	baseline: dict[str, dict],
+	tolerance: float,
+) -> list[str]:
+	"""
+	Сравнивает результаты с сохранённым базовым прогоном.
+
+	Регрессией считается рост p95/p99 или падение req/s больше чем на
+	tolerance, а также появление ошибок.
+
+	:param current: Результаты текущего прогона по сценариям
+	:param baseline: Результаты базового прогона по сценариям
+	:param tolerance: Допустимое относительное ухудшение (0.15 — 15%)
+	:return: Описания регрессий
+	"""
+	regressions = []
+	for name, result in current.items():
+		base = baseline.get(name)
+		if base is None:
+			continue
+		if result['errors'] > base.get('errors', 0):
+			regressions.append(
+				f'{name}: ошибок {result["errors"]} (было {base.get("errors", 0)})')
+		for metric in ('p95_ms', 'p99_ms'):
+			if metric in result and metric in base and (
+				result[metric] > base[metric] * (1 + tolerance)
+			):
+				regressions.append(
+					f'{name}: {metric} {result[metric]} (было {base[metric]})')
+		if base.get('rps') and result['rps'] < base['rps'] * (1 - tolerance):
+			regressions.append(
+				f'{name}: rps {result["rps"]} (было {base["rps"]})')
+	return regressions
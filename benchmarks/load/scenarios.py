@@ -0,0 +1,99 @@
+from uuid import uuid4
+
+import httpx
+
+from benchmarks.load.environment import SeedData
+from benchmarks.load.harness import Scenario
+
+# Посылок в одном запросе сценария bind_company_bulk
+BULK_BIND_SIZE = 100
+
+
+def build_scenarios(data: SeedData) -> list[Scenario]:
+	"""
+	Сценарии нагрузки по эндпоинтам посылок.
+
+	Запросы детерминированы номером запроса, поэтому прогоны с одинаковыми
+	параметрами выполняют одну и ту же последовательность запросов.
+
+	:param data: Данные, созданные для прогона
+	:return: Список сценариев
+	"""
+	run_id = uuid4().hex[:8]
+	parcel_ids = data.parcel_ids
+	list_filters = [
+		{},
+		{'type_id': data.type_ids[0]},
+		{'has_delivery_cost': 'true'},
+		{'has_delivery_cost': 'false', 'limit': 50},
+	]
+
+	async def create(client: httpx.AsyncClient, index: int) -> httpx.Response:
+		return await client.post('/parcels/', json={
+			'name': f'load-{run_id}-{index}',
+			'weight': 1.0 + index % 10,
+			'type_id': data.type_ids[index % len(data.type_ids)],
+			'content_value_usd': 10.0 + index % 100,
+		})
+
+	async def list_parcels(
+		client: httpx.AsyncClient,
+		index: int,
+	) -> httpx.Response:
+		return await client.get(
+			'/parcels/', params=list_filters[index % len(list_filters)])
+
+	async def detail(client: httpx.AsyncClient, index: int) -> httpx.Response:
+		return await client.get(f'/parcels/{parcel_ids[index % len(parcel_ids)]}')
+
+	async def bind_company(
+		client: httpx.AsyncClient,
+		index: int,
+	) -> httpx.Response:
+		# Каждый запрос привязывает новую посылку: повторная привязка — 409
+		return await client.post('/parcels/bind_company', json={
+			'parcel_id': parcel_ids[index],
+			'company_id': data.company_id,
+		})
+
+	async def bind_company_bulk(
+		client: httpx.AsyncClient,
+		index: int,
+	) -> httpx.Response:
+		# Пакеты идут с конца списка посылок; повторно привязываемые
+		# посылки получают статус already_bound
+		start = -(index + 1) * BULK_BIND_SIZE % len(parcel_ids)
+		return await client.post('/parcels/bind_company/bulk', json={
+			'company_id': data.company_id,
+			'parcel_ids': parcel_ids[start:start + BULK_BIND_SIZE],
+		})
+
+	async def summary(client: httpx.AsyncClient, index: int) -> httpx.Response:
+		return await client.get('/parcels/summary')
+
+	async def types(client: httpx.AsyncClient, index: int) -> httpx.Response:
+		return await client.get('/parcels/types')
+
+	async def company_parcels(
+		client: httpx.AsyncClient,
+		index: int,
+	) -> httpx.Response:
+		return await client.get(f'/company/{data.company_id}/parcels')
+
+	async def company_stats(
+		client: httpx.AsyncClient,
+		index: int,
+	) -> httpx.Response:
+		return await client.get(f'/company/{data.company_id}/stats')
+
+	return [
+		Scenario('create', create, expected_status=201, requires_mysql=True),
+		Scenario('list', list_parcels),
+		Scenario('detail', detail),
+		Scenario('bind_company', bind_company, requires_mysql=True),
+		Scenario('bind_company_bulk', bind_company_bulk, requires_mysql=True),
+		Scenario('summary', summary),
+		Scenario('types', types),
+		Scenario('company_parcels', company_parcels),
+		Scenario('company_stats', company_stats),
+	]